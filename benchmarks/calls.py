@@ -0,0 +1,88 @@
+"""
+Measures memory allocated by a single lambda call
+on every engine and reports it per call.
+
+Lambdas taking from 1 to 3 arguments recurse `depth` times
+in non tail position, so everything allocated for a call stays
+alive until the deepest call takes a `tracemalloc` snapshot.
+Blocks and bytes traced between the start of the recursion
+and the snapshot are divided by the depth.
+
+Can be run as module:
+    $ python -m benchmarks.calls --depth 200
+"""
+import argparse
+import tracemalloc
+from typing import Tuple
+
+from pylisper.interpreter.engines import ENGINES
+from pylisper.interpreter.env import Env
+from pylisper.interpreter.objects import Symbol
+from pylisper.interpreter.std_env import STD_ENV
+from pylisper.reader import read
+
+ARITIES = (1, 2, 3)
+
+
+def _source(arity: int) -> str:
+    params = " ".join(f"a{i}" for i in range(1, arity))
+    return f"""
+    (define down
+        (lambda (n {params})
+            (cond
+                ((= n 0) (probe))
+                (#t (+ 0 (down (- n 1) {params}))))))
+    """
+
+
+def allocations(engine: str, arity: int, depth: int) -> Tuple[float, float]:
+    """
+    Returns the number of blocks and bytes allocated
+    per call of a lambda taking `arity` arguments.
+    """
+    snapshots = []
+
+    def probe():
+        if tracemalloc.is_tracing():
+            snapshots.append(tracemalloc.take_snapshot())
+        return 0
+
+    env = Env(STD_ENV)
+    env[Symbol("probe")] = probe
+    evaluator = ENGINES[engine](env)
+    evaluator.eval(read(_source(arity)))
+    args = " ".join(["0"] * (arity - 1))
+    call = read(f"(down {depth} {args})")
+    # warm up, so caches filled on the first call are not counted
+    evaluator.eval(read(f"(down 1 {args})"))
+    tracemalloc.start()
+    try:
+        start = tracemalloc.take_snapshot()
+        evaluator.eval(call)
+    finally:
+        tracemalloc.stop()
+    ignored = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    start = start.filter_traces(ignored)
+    end = snapshots[0].filter_traces(ignored)
+    diff = end.compare_to(start, "filename")
+    blocks = sum(stat.count_diff for stat in diff)
+    size = sum(stat.size_diff for stat in diff)
+    return blocks / depth, size / depth
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--depth", type=int, default=200)
+    argparser.add_argument("--engine", choices=ENGINES, action="append")
+    args = argparser.parse_args()
+    for engine in args.engine or ENGINES:
+        for arity in ARITIES:
+            blocks, size = allocations(engine, arity, args.depth)
+            print(
+                f"{engine:>9} arity {arity}:"
+                f" {blocks:.1f} blocks {size:.0f}B per call"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Measures memory taken by a quoted list read from source
+and reports how many bytes a single cons cell costs.
+
+Memory is traced with `tracemalloc` while the list is read,
+so the count includes the cells as well as the numbers
+they hold but not the source text itself.
+
+Can be run as module:
+    $ python -m benchmarks.memory --length 1000000
+"""
+import argparse
+import tracemalloc
+
+from pylisper.reader import read
+
+
+def cell_size(length: int) -> float:
+    """
+    Returns the number of bytes taken per cell
+    of a quoted list of `length` numbers.
+    """
+    source = "(quote (" + " ".join(map(str, range(length))) + "))"
+    tracemalloc.start()
+    try:
+        start, _ = tracemalloc.get_traced_memory()
+        form = read(source)
+        end, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del form
+    return (end - start) / length
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--length", type=int, default=1_000_000)
+    args = argparser.parse_args()
+    per_cell = cell_size(args.length)
+    total = per_cell * args.length / 2 ** 20
+    print(f"{args.length} cells: {total:.1f}MB ({per_cell:.1f}B per cell)")
+
+
+if __name__ == "__main__":
+    main()
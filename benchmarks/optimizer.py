@@ -0,0 +1,56 @@
+"""
+Runs a loop full of constant subexpressions on every engine
+with and without the optimizer and reports how long it took.
+
+Can be run as module:
+    $ python -m benchmarks.optimizer --iterations 100000
+"""
+import argparse
+import time
+
+from pylisper.interpreter.engines import ENGINES
+from pylisper.interpreter.env import Env
+from pylisper.interpreter.std_env import STD_ENV
+from pylisper.reader import read
+
+LOOP = """
+(define loop
+    (lambda (n acc)
+        (cond
+            ((= n 0) acc)
+            ((< (* 2 3) (+ 1 2)) (quote never))
+            (#t (begin
+                (begin (quote 1) (quote 2))
+                (loop (- n (quotient 10 10)) (+ acc (* 60 60 24))))))))
+"""
+
+
+def run(engine, iterations, optimize):
+    """
+    Returns time in seconds it took to run the loop
+    `iterations` times using the `engine`.
+    """
+    evaluator = ENGINES[engine](Env(STD_ENV), optimize=optimize)
+    evaluator.eval(read(LOOP))
+    call = read(f"(loop {iterations} 0)")
+    start = time.perf_counter()
+    evaluator.eval(call)
+    return time.perf_counter() - start
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--iterations", type=int, default=100_000)
+    argparser.add_argument("--engine", choices=ENGINES, action="append")
+    args = argparser.parse_args()
+    for engine in args.engine or ENGINES:
+        before = run(engine, args.iterations, optimize=False)
+        after = run(engine, args.iterations, optimize=True)
+        print(
+            f"{engine:>9}: {before:.2f}s before, {after:.2f}s after"
+            f" ({before / after:.1f}x faster)"
+        )
+
+
+if __name__ == "__main__":
+    main()
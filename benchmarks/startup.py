@@ -0,0 +1,62 @@
+"""
+Measures how long importing pylisper modules takes
+in a fresh interpreter and checks it against a budget.
+
+Import time is taken from `python -X importtime` output
+as the cumulative time of the measured module. The best
+of several runs is reported to reduce the noise.
+
+Can be run as module:
+    $ python -m benchmarks.startup --budget 50
+Exits with status `1` if any module exceeds the budget.
+"""
+import argparse
+import subprocess
+import sys
+
+MODULES = ["pylisper", "pylisper.reader", "pylisper.runner"]
+"""
+Modules measured by default.
+"""
+
+
+def import_time(module: str, runs: int = 5) -> float:
+    """
+    Returns the best cumulative import time of the `module`
+    in milliseconds out of `runs` fresh interpreters.
+    """
+    best = float("inf")
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            check=True,
+        )
+        for line in proc.stderr.splitlines():
+            _, cumulative_us, name = line.split("|")
+            if name.strip() == module:
+                best = min(best, int(cumulative_us) / 1000)
+    return best
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--runs", type=int, default=5)
+    argparser.add_argument(
+        "--budget", type=float, default=50, help="allowed import time in ms"
+    )
+    argparser.add_argument("--module", action="append")
+    args = argparser.parse_args()
+    ok = True
+    for module in args.module or MODULES:
+        elapsed = import_time(module, args.runs)
+        over = elapsed > args.budget
+        ok = ok and not over
+        status = "OVER BUDGET" if over else "ok"
+        print(f"{module:>16}: {elapsed:.1f}ms ({status})")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+"""
+Runs classic lisp workloads on every engine and reports
+how long they took and how much memory they needed at peak.
+
+Every workload is a program run with `run_source`, so the
+measured time covers the whole pipeline: reading, resolving,
+optimizing and evaluating. Time is the best of `--repeat` runs,
+peak memory is traced with `tracemalloc` in one more run.
+
+Results can be saved as JSON and compared against results
+saved earlier (for example on another commit), in which case
+the exit status is `1` if any workload got slower, or needed
+more memory, by more than `--threshold`.
+
+Can be run as module:
+    $ python -m benchmarks.suite --save before.json
+    $ python -m benchmarks.suite --compare before.json --threshold 0.1
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, NamedTuple, Optional, Sequence
+
+from pylisper.interpreter.engines import ENGINES
+from pylisper.printer import to_str
+from pylisper.runner import run_source
+
+
+class Workload(NamedTuple):
+    """
+    A benchmarked program.
+
+    `program(size)` returns source of the program and `expected(size)`
+    the printed value of its last form. `size` is used by default
+    and `quick_size` with `--quick`. `engines` are the engines the
+    workload runs on, every engine if empty.
+    """
+
+    program: Callable[[int], str]
+    expected: Callable[[int], str]
+    size: int
+    quick_size: int
+    engines: Sequence[str] = ()
+
+
+FIB = """
+(define fib
+    (lambda (n)
+        (cond
+            ((< n 2) n)
+            (#t (+ (fib (- n 1)) (fib (- n 2)))))))
+(fib {size})
+"""
+
+TAK = """
+(define tak
+    (lambda (x y z)
+        (cond
+            ((not (< y x)) z)
+            (#t (tak
+                (tak (- x 1) y z)
+                (tak (- y 1) z x)
+                (tak (- z 1) x y))))))
+(tak {size} 12 6)
+"""
+
+ACKERMANN = """
+(define ack
+    (lambda (m n)
+        (cond
+            ((= m 0) (+ n 1))
+            ((= n 0) (ack (- m 1) 1))
+            (#t (ack (- m 1) (ack m (- n 1)))))))
+(ack 3 {size})
+"""
+
+NQUEENS = """
+(define safe?
+    (lambda (row dist placed)
+        (cond
+            ((null? placed) #t)
+            ((= (car placed) row) #f)
+            ((= (car placed) (+ row dist)) #f)
+            ((= (car placed) (- row dist)) #f)
+            (#t (safe? row (+ dist 1) (cdr placed))))))
+(define try-rows
+    (lambda (row left n placed)
+        (cond
+            ((= row n) 0)
+            ((safe? row 1 placed)
+                (+ (place (- left 1) n (cons row placed))
+                   (try-rows (+ row 1) left n placed)))
+            (#t (try-rows (+ row 1) left n placed)))))
+(define place
+    (lambda (left n placed)
+        (cond
+            ((= left 0) 1)
+            (#t (try-rows 0 left n placed)))))
+(place {size} {size} (quote ()))
+"""
+
+SORT = """
+(define random-list
+    (lambda (n seed acc)
+        (cond
+            ((= n 0) acc)
+            (#t (random-list
+                (- n 1)
+                (remainder (+ (* seed 1103515245) 12345) 2147483648)
+                (cons (remainder seed 1000) acc))))))
+(define split
+    (lambda (l a b)
+        (cond
+            ((null? l) (cons a (cons b (quote ()))))
+            (#t (split (cdr l) b (cons (car l) a))))))
+(define merge
+    (lambda (a b acc)
+        (cond
+            ((null? a) (append (reverse acc) b))
+            ((null? b) (append (reverse acc) a))
+            ((< (car b) (car a)) (merge a (cdr b) (cons (car b) acc)))
+            (#t (merge (cdr a) b (cons (car a) acc))))))
+(define sort
+    (lambda (l)
+        (cond
+            ((null? l) l)
+            ((null? (cdr l)) l)
+            (#t (begin
+                (define halves (split l (quote ()) (quote ())))
+                (merge
+                    (sort (car halves))
+                    (sort (car (cdr halves)))
+                    (quote ())))))))
+(define sorted?
+    (lambda (l)
+        (cond
+            ((null? l) #t)
+            ((null? (cdr l)) #t)
+            ((< (car (cdr l)) (car l)) #f)
+            (#t (sorted? (cdr l))))))
+(define l (sort (random-list {size} 42 (quote ()))))
+(cons (length l) (cons (sorted? l) (quote ())))
+"""
+
+DEEP_RECURSION = """
+(define depth
+    (lambda (n)
+        (cond
+            ((= n 0) 0)
+            (#t (+ 1 (depth (- n 1)))))))
+(depth {size})
+"""
+
+COUNTERS = """
+(define make-counter
+    (lambda ()
+        (begin
+            (define n 0)
+            (lambda () (begin (set! n (+ n 1)) n)))))
+(define bump
+    (lambda (counter times)
+        (cond
+            ((= times 0) (counter))
+            (#t (begin (counter) (bump counter (- times 1)))))))
+(define run
+    (lambda (i acc)
+        (cond
+            ((= i 0) acc)
+            (#t (run (- i 1) (+ acc (bump (make-counter) 10)))))))
+(run {size} 0)
+"""
+
+LOOPS = """
+(define sum-squares
+    (lambda (n)
+        (do ((i 0 (+ i 1)) (acc 0 (+ acc (* i i))))
+            ((= i n) acc))))
+(define run
+    (lambda (n)
+        (let loop ((i 0) (acc 0))
+            (cond
+                ((= i n) acc)
+                (#t (let ((s (sum-squares 10))) (loop (+ i 1) (+ acc s))))))))
+(run {size})
+"""
+
+
+def _sized(template: str) -> Callable[[int], str]:
+    return lambda size: template.format(size=size)
+
+
+def _fib(n: int) -> int:
+    a, b = 0, 1
+    for _ in range(n):
+        a, b = b, a + b
+    return a
+
+
+def _tak(x: int, y: int, z: int) -> int:
+    if not y < x:
+        return z
+    return _tak(_tak(x - 1, y, z), _tak(y - 1, z, x), _tak(z - 1, x, y))
+
+
+_QUEENS = {4: 2, 5: 10, 6: 4, 7: 40, 8: 92, 9: 352, 10: 724}
+
+
+def _datum(size: int) -> str:
+    return "(quote (" + " ".join(str(i % 1000) for i in range(size)) + "))"
+
+
+def _datum_expected(size: int) -> str:
+    return "(" + " ".join(str(i % 1000) for i in range(size)) + ")"
+
+
+WORKLOADS: Dict[str, Workload] = {
+    "fib": Workload(_sized(FIB), lambda n: str(_fib(n)), 20, 10),
+    "tak": Workload(_sized(TAK), lambda x: str(_tak(x, 12, 6)), 18, 13),
+    "ackermann": Workload(_sized(ACKERMANN), lambda n: str(2 ** (n + 3) - 3), 5, 2),
+    "nqueens": Workload(_sized(NQUEENS), lambda n: str(_QUEENS[n]), 8, 5),
+    "sort": Workload(_sized(SORT), lambda n: f"({n} #t)", 5000, 100),
+    # non tail recursion on the tree engine is bounded by pythons stack
+    "deep-recursion": Workload(
+        _sized(DEEP_RECURSION), str, 100_000, 1000, ("vm", "stackless")
+    ),
+    "counters": Workload(_sized(COUNTERS), lambda n: str(n * 11), 5000, 100),
+    "loops": Workload(_sized(LOOPS), lambda n: str(n * 285), 2000, 100),
+    # about 10MB of source with the default size
+    "parse-datum": Workload(_datum, _datum_expected, 2_500_000, 1000),
+}
+"""
+A `dict` mapping names of the workloads to them.
+"""
+
+
+def measure(
+    workload: Workload, engine: str, size: int, repeat: int
+) -> Dict[str, float]:
+    """
+    Runs the workload and returns the best time in seconds
+    and peak traced memory in bytes.
+
+    Raises:
+        `ValueError`:
+            If the workload evaluates to an unexpected value.
+    """
+    source = workload.program(size)
+    expected = workload.expected(size)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        res = run_source(source, engine=engine)
+        best = min(best, time.perf_counter() - start)
+        if to_str(res) != expected:
+            raise ValueError(f"unexpected result {to_str(res)[:80]}")
+        del res
+    tracemalloc.start()
+    try:
+        run_source(source, engine=engine)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"time": best, "peak_memory": peak}
+
+
+def run(
+    workloads: Sequence[str],
+    engines: Sequence[str],
+    quick: bool = False,
+    repeat: int = 3,
+) -> Dict[str, Dict[str, float]]:
+    """
+    Measures every workload on every engine it runs on.
+
+    Returns a `dict` mapping `workload/engine` to
+    the results of `measure`.
+    """
+    results = {}
+    for name in workloads:
+        workload = WORKLOADS[name]
+        size = workload.quick_size if quick else workload.size
+        for engine in engines:
+            if workload.engines and engine not in workload.engines:
+                continue
+            results[f"{name}/{engine}"] = measure(workload, engine, size, repeat)
+    return results
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    threshold: float,
+) -> Dict[str, Dict[str, float]]:
+    """
+    Returns ratios of the results to the baseline which
+    exceed `1 + threshold`, keyed as the results are.
+    Results missing from the baseline are skipped.
+    """
+    regressions = {}
+    for key, measured in results.items():
+        if key not in baseline:
+            continue
+        for metric, value in measured.items():
+            before = baseline[key].get(metric)
+            if not before:
+                continue
+            ratio = value / before
+            if ratio > 1 + threshold:
+                regressions.setdefault(key, {})[metric] = ratio
+    return regressions
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    argparser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    argparser.add_argument("--workload", choices=WORKLOADS, action="append")
+    argparser.add_argument("--engine", choices=ENGINES, action="append")
+    argparser.add_argument("--repeat", type=int, default=3)
+    argparser.add_argument(
+        "--quick", action="store_true", help="use small sizes, for a smoke test"
+    )
+    argparser.add_argument("--save", metavar="path", help="save results as JSON")
+    argparser.add_argument(
+        "--compare", metavar="path", help="compare with results saved earlier"
+    )
+    argparser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="allowed relative slowdown or memory growth, 0.1 by default",
+    )
+    args = argparser.parse_args(argv)
+    results = run(
+        args.workload or list(WORKLOADS),
+        args.engine or list(ENGINES),
+        args.quick,
+        args.repeat,
+    )
+    for key, measured in results.items():
+        print(
+            f"{key:>26}: {measured['time']:8.3f}s"
+            f" {measured['peak_memory'] / 2 ** 10:10.1f}KB peak"
+        )
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(
+                {"python": platform.python_version(), "results": results},
+                f,
+                indent=2,
+                sort_keys=True,
+            )
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for key, ratios in regressions.items():
+            for metric, ratio in ratios.items():
+                print(f"regression {key} {metric}: {ratio:.2f}x", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
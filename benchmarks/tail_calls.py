@@ -0,0 +1,56 @@
+"""
+Runs a tail recursive countdown on every engine
+and reports how long it took.
+
+Can be run as module:
+    $ python -m benchmarks.tail_calls --iterations 1000000
+"""
+import argparse
+import time
+
+from pylisper.interpreter.compiler import ObjectCompiler
+from pylisper.interpreter.engines import ENGINES
+from pylisper.interpreter.env import Env
+from pylisper.interpreter.std_env import STD_ENV
+from pylisper.lexer import lexer
+from pylisper.parser import parser
+
+COUNTDOWN = """
+(define countdown
+    (lambda (n)
+        (cond
+            ((= n 0) (quote done))
+            (#t (countdown (- n 1))))))
+"""
+
+
+def compile(source):
+    return parser.parse(lexer.lex(source)).accept(ObjectCompiler())
+
+
+def run(engine, iterations):
+    """
+    Returns time in seconds it took to count down
+    from `iterations` using the `engine`.
+    """
+    evaluator = ENGINES[engine](Env(STD_ENV))
+    evaluator.eval(compile(COUNTDOWN))
+    call = compile(f"(countdown {iterations})")
+    start = time.perf_counter()
+    evaluator.eval(call)
+    return time.perf_counter() - start
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--iterations", type=int, default=1_000_000)
+    argparser.add_argument("--engine", choices=ENGINES, action="append")
+    args = argparser.parse_args()
+    for engine in args.engine or ENGINES:
+        elapsed = run(engine, args.iterations)
+        per_call = elapsed / args.iterations * 1e6
+        print(f"{engine:>6}: {elapsed:.2f}s ({per_call:.2f}us per call)")
+
+
+if __name__ == "__main__":
+    main()
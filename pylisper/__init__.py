@@ -1 +1,13 @@
 __version__ = "0.1.0"
+
+__all__ = ["run_file", "run_source"]
+
+
+def __getattr__(name):
+    # the runner pulls in the interpreter, so it is imported
+    # only when needed to keep `import pylisper` cheap
+    if name in __all__:
+        import pylisper.runner
+
+        return getattr(pylisper.runner, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,6 @@
+"""
+Allows running `pylisper` command as `python -m pylisper`.
+"""
+from pylisper.runner import main
+
+main()
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from abc import ABC, abstractmethod
 from collections import UserList
-from typing import Optional, Sequence
+from typing import Optional, Sequence, Tuple
 
 
 class BaseNode(ABC):
@@ -16,8 +16,13 @@ class BaseNode(ABC):
 
     Other than that this class doesn't impose
     any more requirements on the deriving classes.
+
+    `position` is the `(line, column)` the node starts
+    at in the source, or `None` if it is not known.
     """
 
+    position: Optional[Tuple[int, int]] = None
+
     @abstractmethod
     def accept(self, visitor: NodeVisitor):
         ...
@@ -31,8 +36,9 @@ class Number(BaseNode):
     with support for the Visitor protocol.
     """
 
-    def __init__(self, value: int):
+    def __init__(self, value: int, position: Optional[Tuple[int, int]] = None):
         self.value = value
+        self.position = position
 
     def accept(self, visitor: NodeVisitor):
         return visitor.visit_number(self)
@@ -47,8 +53,9 @@ class Symbol(BaseNode):
     an indentifier.
     """
 
-    def __init__(self, value: str):
+    def __init__(self, value: str, position: Optional[Tuple[int, int]] = None):
         self.value = value
+        self.position = position
 
     def accept(self, visitor: NodeVisitor):
         return visitor.visit_symbol(self)
@@ -63,7 +70,11 @@ class List(UserList, BaseNode):
     contained ast nodes.
     """
 
-    def __init__(self, exprs: Optional[Sequence[BaseNode]] = None):
+    def __init__(
+        self,
+        exprs: Optional[Sequence[BaseNode]] = None,
+        position: Optional[Tuple[int, int]] = None,
+    ):
         """
         Initialiazes underlying list to the `exprs`.
 
@@ -71,8 +82,11 @@ class List(UserList, BaseNode):
             `exprs`:
                 optional list to initialize internal data with.
                 If `None` new list is created. See `UserList` documentation.
+            `position`:
+                optional position of the opening paren.
         """
         super().__init__(exprs)
+        self.position = position
 
     @property
     def exprs(self):
@@ -0,0 +1,221 @@
+"""
+Contains persistent cache of the read programs.
+
+Similarly to pythons `__pycache__` forms read from a file
+are stored in a compact binary `.lispc` file inside of the
+`__lispcache__` directory next to the source. Cache is keyed
+by the hash of the source content and the interpreter version
+so it's invalidated automatically when either of them changes.
+
+Forms are encoded as a flat sequence of `(op, arg)` pairs,
+which builds them in postfix order, together with a table
+of symbol names stored once per file and positions of the
+lists (see `pylisper.locations`). All are serialized
+with `marshal`, so loading a cached program boils down to
+a file read and an unmarshal.
+
+Module provides:
+    - `read_file`, reading forms from a file through the cache,
+    - `dumps` and `loads`, serializing forms,
+    - `cache_path`, returning location of the cache for a source file.
+"""
+import hashlib
+import marshal
+import os
+from typing import List, Optional
+
+import pylisper
+import pylisper.interpreter.objects as obj
+from pylisper.locations import SourceMap
+from pylisper.reader import read_all
+
+CACHE_DIR = "__lispcache__"
+"""
+Name of the directory cached programs are stored in.
+"""
+
+MAGIC = b"LISPC\x00\x04\n"
+"""
+Prefix of every cache file, changed with the format.
+"""
+
+SYMBOL = 0
+NUMBER = 1
+LIST = 2
+VECTOR = 3
+HASH = 4
+
+
+def cache_path(path: str) -> str:
+    """
+    Returns path of the cache file for the source file under `path`.
+    """
+    head, tail = os.path.split(path)
+    name, _ = os.path.splitext(tail)
+    return os.path.join(head, CACHE_DIR, f"{name}.lispc")
+
+
+def source_hash(source: bytes) -> bytes:
+    """
+    Returns a key identifying the source content
+    and the version of the interpreter.
+    """
+    digest = hashlib.blake2b(source, digest_size=16)
+    digest.update(pylisper.__version__.encode())
+    return digest.digest()
+
+
+def dumps(
+    forms: List[obj.BaseObject],
+    key: bytes = b"",
+    source_map: Optional[SourceMap] = None,
+) -> bytes:
+    """
+    Serializes forms.
+
+    Args/Kwargs:
+        `forms`:
+            Forms to serialize.
+        `key`:
+            Key stored with the forms, usually the `source_hash`.
+            `loads` only returns forms stored with the same key.
+        `source_map`:
+            Optional map to store positions of the lists from.
+    """
+    symbols = {}
+    code = []
+    # line and column of every non empty list in postfix order
+    positions = []
+    todo = list(reversed(forms))
+    while todo:
+        node = todo.pop()
+        if isinstance(node, tuple):
+            # end of a list which items were already encoded
+            op, size, *cell = node
+            code.append(op)
+            code.append(size)
+            if cell and source_map is not None:
+                location = source_map.get(cell[0])
+                positions.extend(location[:2] if location else (0, 0))
+        elif isinstance(node, obj.Symbol):
+            code.append(SYMBOL)
+            code.append(symbols.setdefault(node.value, len(symbols)))
+        elif isinstance(node, int):
+            code.append(NUMBER)
+            code.append(node)
+        elif node is None:
+            code.append(LIST)
+            code.append(0)
+        elif isinstance(node, obj.Cell):
+            items = list(node)
+            todo.append((LIST, len(items), node))
+            todo.extend(reversed(items))
+        elif isinstance(node, obj.Vector):
+            todo.append((VECTOR, len(node.items)))
+            todo.extend(reversed(node.items))
+        elif isinstance(node, obj.HashTable):
+            todo.append((HASH, len(node.items)))
+            for entry in reversed(node.items.items()):
+                todo.extend(reversed(entry))
+        else:
+            raise TypeError(f"Cannot serialize {node!r}")
+    data = (key, tuple(symbols), tuple(code), tuple(positions))
+    return MAGIC + marshal.dumps(data)
+
+
+def loads(
+    data: bytes, key: bytes = b"", source_map: Optional[SourceMap] = None
+) -> Optional[List[obj.BaseObject]]:
+    """
+    Deserializes forms serialized with `dumps`.
+
+    Returns `None` if the data is not a valid cache
+    or was stored with a different `key`. Stored positions
+    of the lists are recorded in the `source_map`, if given.
+    """
+    if not data.startswith(MAGIC):
+        return None
+    try:
+        stored_key, names, code, positions = marshal.loads(data[len(MAGIC) :])
+    except (EOFError, ValueError, TypeError):
+        return None
+    if source_map is None:
+        positions = ()
+    lists = 0
+    if stored_key != key:
+        return None
+    symbols = [obj.Symbol(name) for name in names]
+    stack = []
+    ops = iter(code)
+    for op, arg in zip(ops, ops):
+        if op == SYMBOL:
+            stack.append(symbols[arg])
+        elif op == NUMBER:
+            stack.append(arg)
+        elif op == LIST:
+            lst = None
+            for _ in range(arg):
+                lst = obj.Cell(stack.pop(), lst)
+            stack.append(lst)
+            if arg and positions:
+                line, column = positions[lists], positions[lists + 1]
+                lists += 2
+                if line:
+                    source_map.add(lst, line, column)
+        else:
+            start = len(stack) - (arg if op == VECTOR else 2 * arg)
+            items = stack[start:]
+            del stack[start:]
+            if op == VECTOR:
+                stack.append(obj.Vector(items))
+            else:
+                table = dict(zip(items[::2], items[1::2]))
+                stack.append(obj.HashTable(table))
+    return stack
+
+
+def read_file(
+    path: str, use_cache: bool = True, source_map: Optional[SourceMap] = None
+) -> List[obj.BaseObject]:
+    """
+    Reads every form from the file under `path`.
+
+    If `use_cache` is `True`, forms are loaded from the cache
+    when it is up to date, otherwise the source is read and
+    cache is written. Failing to write the cache is ignored.
+    Positions of the read lists are recorded in the `source_map`.
+
+    Raises:
+        `OSError`:
+            If the source file cannot be read.
+        `UnicodeDecodeError`:
+            If the source file is not encoded in UTF-8.
+        As well as any exception raised by `read_all`.
+    """
+    with open(path, "rb") as f:
+        source = f.read()
+    if not use_cache:
+        return read_all(source.decode(), source_map)
+    key = source_hash(source)
+    cached = cache_path(path)
+    try:
+        with open(cached, "rb") as f:
+            forms = loads(f.read(), key, source_map)
+        if forms is not None:
+            return forms
+    except OSError:
+        pass
+    # positions are always cached so they are
+    # available to the runs that ask for them
+    if source_map is None:
+        source_map = SourceMap(path)
+    forms = read_all(source.decode(), source_map)
+    try:
+        os.makedirs(os.path.dirname(cached), exist_ok=True)
+        tmp = f"{cached}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(dumps(forms, key, source_map))
+        os.replace(tmp, cached)
+    except OSError:
+        pass
+    return forms
@@ -0,0 +1,509 @@
+"""
+Contains bytecode definition and the compiler lowering objects
+produced by the `ObjectCompiler` into a flat instruction stream
+that can be executed by the `VM`.
+
+Every instruction consists of an opcode followed by exactly one
+integer argument (instructions that don't need one use `0`) so
+the whole program can be stored as a flat `list` of integers.
+"""
+from __future__ import annotations
+
+from typing import Any, List, Optional, Sequence, Union
+
+import pylisper.interpreter.objects as obj
+import pylisper.interpreter.symbols as sym
+from pylisper.interpreter.env import UNBOUND
+from pylisper.interpreter.exceptions import InvalidFormError, LogicError
+from pylisper.interpreter.optimizer import Folded
+from pylisper.interpreter.resolver import (CapturedRef, GlobalRef,
+                                           LambdaTemplate, LocalRef, Loop,
+                                           Recur)
+
+# Opcodes
+
+CONST = 0
+"""Pushes `consts[arg]` onto the stack."""
+LOAD = 1
+"""Pushes value bound to `names[arg]` onto the stack."""
+DEFINE = 2
+"""Binds top of the stack to `names[arg]` in the current environment."""
+SET = 3
+"""Rebinds `names[arg]` in the environment it was defined in."""
+SET_CAR = 4
+"""Sets value of the cell under the top of the stack."""
+POP = 5
+"""Discards top of the stack."""
+JUMP = 6
+"""Sets instruction pointer to `arg`."""
+JUMP_IF_FALSE = 7
+"""Pops top of the stack and jumps to `arg` if it is falsy."""
+MAKE_LAMBDA = 8
+"""Creates closure of the `CodeObject` under `consts[arg]`."""
+CALL = 9
+"""Calls function with `arg` arguments."""
+TAIL_CALL = 10
+"""Same as `CALL` but reuses current frame."""
+RETURN = 11
+"""Returns top of the stack to the caller."""
+LOAD_LOCAL = 12
+"""Pushes value of the slot `arg` of the current frame."""
+LOAD_CAPTURED = 13
+"""Pushes captured variable `arg` of the current frame."""
+LOAD_GLOBAL = 14
+"""Pushes value of the `Binding` under `consts[arg]`."""
+STORE_LOCAL = 15
+"""Sets slot `arg` of the current frame to the top of the stack."""
+STORE_CAPTURED = 16
+"""Sets value of the `Box` captured as variable `arg` of the current frame."""
+SET_GLOBAL = 17
+"""Sets value of the `Binding` under `consts[arg]`."""
+GUARD = 18
+"""
+Pushes value of the `Folded` under `consts[arg]` if its guards hold,
+otherwise skips the next instruction.
+"""
+LOAD_BOXED = 19
+"""Pushes value of the `Box` in the slot `arg` of the current frame."""
+STORE_BOXED = 20
+"""Sets value of the `Box` in the slot `arg` of the current frame."""
+LOAD_CAPTURED_BOXED = 21
+"""Pushes value of the `Box` captured as variable `arg` of the current frame."""
+BIND_LOCAL = 22
+"""Pops top of the stack into the slot `arg` of the current frame."""
+BIND_BOXED = 23
+"""Pops top of the stack into a new `Box` in the slot `arg` of the current frame."""
+JUMP_IF_FALSE_OR_POP = 24
+"""Jumps to `arg` if top of the stack is falsy, keeping it, pops it otherwise."""
+JUMP_IF_TRUE_OR_POP = 25
+"""Jumps to `arg` if top of the stack is truthy, keeping it, pops it otherwise."""
+
+OPNAMES = {
+    CONST: "CONST",
+    LOAD: "LOAD",
+    DEFINE: "DEFINE",
+    SET: "SET",
+    SET_CAR: "SET_CAR",
+    POP: "POP",
+    JUMP: "JUMP",
+    JUMP_IF_FALSE: "JUMP_IF_FALSE",
+    MAKE_LAMBDA: "MAKE_LAMBDA",
+    CALL: "CALL",
+    TAIL_CALL: "TAIL_CALL",
+    RETURN: "RETURN",
+    LOAD_LOCAL: "LOAD_LOCAL",
+    LOAD_CAPTURED: "LOAD_CAPTURED",
+    LOAD_GLOBAL: "LOAD_GLOBAL",
+    STORE_LOCAL: "STORE_LOCAL",
+    STORE_CAPTURED: "STORE_CAPTURED",
+    SET_GLOBAL: "SET_GLOBAL",
+    GUARD: "GUARD",
+    LOAD_BOXED: "LOAD_BOXED",
+    STORE_BOXED: "STORE_BOXED",
+    LOAD_CAPTURED_BOXED: "LOAD_CAPTURED_BOXED",
+    BIND_LOCAL: "BIND_LOCAL",
+    BIND_BOXED: "BIND_BOXED",
+    JUMP_IF_FALSE_OR_POP: "JUMP_IF_FALSE_OR_POP",
+    JUMP_IF_TRUE_OR_POP: "JUMP_IF_TRUE_OR_POP",
+}
+"""
+A `dict` mapping opcodes to their names.
+"""
+
+
+class CodeObject:
+    """
+    Compiled unit of code, either a top level expression
+    or a lambdas body.
+
+    Holds flat list of instructions as well as constant pool
+    and a table of symbols referenced by the instructions.
+    """
+
+    def __init__(
+        self,
+        params: Sequence[obj.Symbol] = (),
+        locals: Sequence[obj.Symbol] = (),
+        name: Optional[str] = None,
+        source: Any = None,
+        captures: Sequence[Union[LocalRef, CapturedRef]] = (),
+        boxed: Sequence[int] = (),
+    ):
+        """
+        Creates an empty code object.
+
+        Args/Kwargs:
+            `params`:
+                Symbols that arguments get bound to on call.
+            `locals`:
+                Symbols of the frame slots, parameters included.
+            `name`:
+                Optional name of the code, used for debugging.
+            `source`:
+                Optional object the code was compiled from.
+            `captures`:
+                References to the free variables in the frame
+                closures of the code are created in.
+            `boxed`:
+                Slots holding a `Box`, created on call.
+        """
+        self.code: List[int] = []
+        self.consts: List[Any] = []
+        self.names: List[obj.Symbol] = []
+        self.params = tuple(params)
+        self.arity = len(self.params)
+        self.locals = tuple(locals)
+        self.size = len(self.locals)
+        # values of the slots following the parameters
+        self.padding = (UNBOUND,) * (self.size - self.arity)
+        self.name = name
+        self.source = source
+        self.captures = tuple(captures)
+        self.boxed = tuple(boxed)
+
+    def emit(self, op: int, arg: int = 0) -> int:
+        """
+        Appends an instruction and returns its position.
+        """
+        self.code.extend((op, arg))
+        return len(self.code) - 2
+
+    def patch(self, pos: int, arg: int):
+        """
+        Sets argument of the instruction at `pos`.
+        Used to resolve forward jumps.
+        """
+        self.code[pos + 1] = arg
+
+    def add_const(self, val: Any) -> int:
+        """
+        Adds value to the constant pool and returns its index.
+
+        Values are compared by identity so quoted
+        structures are never shared between different places.
+        """
+        for i, c in enumerate(self.consts):
+            if c is val:
+                return i
+        self.consts.append(val)
+        return len(self.consts) - 1
+
+    def add_name(self, name: obj.Symbol) -> int:
+        """
+        Adds symbol to the names table and returns its index.
+        """
+        try:
+            return self.names.index(name)
+        except ValueError:
+            self.names.append(name)
+            return len(self.names) - 1
+
+    def disassemble(self) -> str:
+        """
+        Returns human readable listing of the instructions.
+        """
+        lines = []
+        for pos in range(0, len(self.code), 2):
+            op, arg = self.code[pos], self.code[pos + 1]
+            line = f"{pos:4} {OPNAMES[op]:<14} {arg}"
+            if op in (LOAD, DEFINE, SET):
+                line = f"{line} ({self.names[arg]})"
+            elif op in (
+                LOAD_LOCAL,
+                STORE_LOCAL,
+                LOAD_BOXED,
+                STORE_BOXED,
+                BIND_LOCAL,
+                BIND_BOXED,
+            ):
+                line = f"{line} ({self.locals[arg]})"
+            elif op in (LOAD_CAPTURED, STORE_CAPTURED, LOAD_CAPTURED_BOXED):
+                line = f"{line} ({self.captures[arg]})"
+            elif op in (
+                CONST,
+                MAKE_LAMBDA,
+                LOAD_GLOBAL,
+                SET_GLOBAL,
+                GUARD,
+            ):
+                line = f"{line} ({self.consts[arg]})"
+            lines.append(line)
+        return "\n".join(lines)
+
+    def __str__(self):
+        name = "<lambda>" if self.name is None else self.name
+        return f"<code {name}>"
+
+
+class BytecodeCompiler:
+    """
+    Compiles objects resolved by the `Resolver` into `CodeObject`s.
+
+    Special forms are validated during compilation,
+    which means that unlike in case of the `Evaluator`
+    malformed forms are reported before any code runs.
+    """
+
+    def __init__(self):
+        self._special_forms = {
+            sym.DEFINE: self._compile_define,
+            sym.QUOTE: self._compile_quote,
+            sym.COND: self._compile_cond,
+            sym.SET: self._compile_set,
+            sym.BEGIN: self._compile_begin,
+            sym.LET: self._compile_let,
+            sym.LET_STAR: self._compile_let,
+            sym.LETREC: self._compile_letrec,
+            sym.IF: self._compile_if,
+            sym.WHEN: self._compile_when,
+            sym.UNLESS: self._compile_when,
+            sym.AND: self._compile_and_or,
+            sym.OR: self._compile_and_or,
+        }
+        # positions of the bodies of the loops being compiled
+        self._loops = {}
+
+    def compile(self, expr: obj.BaseObject) -> CodeObject:
+        """
+        Compiles a top level expression.
+
+        Args/Kwargs:
+            `expr`:
+                Resolved expression to compile.
+
+        Raises:
+            `EvaluationError`:
+                In case of a malformed special form.
+        """
+        code = CodeObject(source=expr)
+        self._compile(expr, code, tail=True)
+        code.emit(RETURN)
+        return code
+
+    def _compile(self, expr: obj.BaseObject, code: CodeObject, tail: bool):
+        if isinstance(expr, LocalRef):
+            code.emit(LOAD_BOXED if expr.boxed else LOAD_LOCAL, expr.slot)
+        elif isinstance(expr, CapturedRef):
+            code.emit(LOAD_CAPTURED_BOXED if expr.boxed else LOAD_CAPTURED, expr.index)
+        elif isinstance(expr, GlobalRef):
+            code.emit(LOAD_GLOBAL, code.add_const(expr.binding))
+        elif isinstance(expr, LambdaTemplate):
+            self._compile_lambda(expr, code)
+        elif isinstance(expr, Folded):
+            code.emit(GUARD, code.add_const(expr))
+            done = code.emit(JUMP)
+            self._compile(expr.expr, code, tail)
+            code.patch(done, len(code.code))
+        elif isinstance(expr, Recur):
+            self._compile_recur(expr, code)
+        elif isinstance(expr, Loop):
+            self._compile_loop(expr, code, tail)
+        elif isinstance(expr, int):
+            code.emit(CONST, code.add_const(expr))
+        elif isinstance(expr, obj.Symbol):
+            code.emit(LOAD, code.add_name(expr))
+        elif expr is None:
+            raise LogicError("Cannot evaluate an empty list")
+        else:
+            self._compile_list(expr, code, tail)
+
+    def _compile_list(self, node: obj.Cell, code: CodeObject, tail: bool):
+        func, *args = node
+        if isinstance(func, obj.Symbol) and func in self._special_forms:
+            self._special_forms[func](node, code, tail)
+            return
+        self._compile(func, code, tail=False)
+        for arg in args:
+            self._compile(arg, code, tail=False)
+        code.emit(TAIL_CALL if tail else CALL, len(args))
+
+    def _compile_lambda(self, template: LambdaTemplate, code: CodeObject):
+        lambda_code = CodeObject(
+            template.params,
+            template.locals,
+            template.name,
+            template.source,
+            template.captures,
+            template.boxed,
+        )
+        self._compile(template.body, lambda_code, tail=True)
+        lambda_code.emit(RETURN)
+        code.emit(MAKE_LAMBDA, code.add_const(lambda_code))
+
+    def _compile_cond(self, node: obj.Cell, code: CodeObject, tail: bool):
+        _, *arms = node
+        exits = []
+        for arm in arms:
+            try:
+                cond, expr = arm
+            except (ValueError, TypeError):
+                raise InvalidFormError(
+                    "each condition should be followed"
+                    " by an expression to be evaluated."
+                )
+            self._compile(cond, code, tail=False)
+            next_arm = code.emit(JUMP_IF_FALSE)
+            self._compile(expr, code, tail)
+            exits.append(code.emit(JUMP))
+            code.patch(next_arm, len(code.code))
+        code.emit(CONST, code.add_const(None))
+        for pos in exits:
+            code.patch(pos, len(code.code))
+
+    def _compile_quote(self, node: obj.Cell, code: CodeObject, tail: bool):
+        try:
+            _, expr = node
+        except ValueError:
+            raise InvalidFormError(
+                "quote form should consist of a single argument"
+                " which is a value to be quoted"
+            )
+        code.emit(CONST, code.add_const(expr))
+
+    def _compile_define(self, node: obj.Cell, code: CodeObject, tail: bool):
+        try:
+            _, name, expr = node
+        except ValueError:
+            raise InvalidFormError(
+                "define form should consist of 2 elements"
+                " first one being a symbol and the second one being"
+                " an assigned expression"
+            )
+        if isinstance(name, LocalRef):
+            self._compile(expr, code, tail=False)
+            code.emit(STORE_BOXED if name.boxed else STORE_LOCAL, name.slot)
+        elif isinstance(name, obj.Symbol):
+            self._compile(expr, code, tail=False)
+            code.emit(DEFINE, code.add_name(name))
+        else:
+            raise InvalidFormError(
+                "first argument to the define form should be a symbol"
+            )
+
+    def _compile_set(self, node: obj.Cell, code: CodeObject, tail: bool):
+        err = InvalidFormError(
+            "set! form should consist of memory reference (Symbol or cons cell)"
+            " and an expression to evaluate"
+        )
+        try:
+            _, ref, expr = node
+        except ValueError:
+            raise err
+        if isinstance(ref, LocalRef):
+            self._compile(expr, code, tail=False)
+            code.emit(STORE_BOXED if ref.boxed else STORE_LOCAL, ref.slot)
+        elif isinstance(ref, CapturedRef):
+            self._compile(expr, code, tail=False)
+            code.emit(STORE_CAPTURED, ref.index)
+        elif isinstance(ref, GlobalRef):
+            self._compile(expr, code, tail=False)
+            code.emit(SET_GLOBAL, code.add_const(ref.binding))
+        elif isinstance(ref, obj.Symbol):
+            self._compile(expr, code, tail=False)
+            code.emit(SET, code.add_name(ref))
+        elif isinstance(ref, obj.Cell) and ref.car is sym.CAR:
+            try:
+                _, cell = ref
+            except ValueError:
+                raise InvalidFormError(
+                    "car should be followed by a single expression to evaluate"
+                )
+            self._compile(cell, code, tail=False)
+            self._compile(expr, code, tail=False)
+            code.emit(SET_CAR)
+        else:
+            raise err
+
+    def _compile_begin(self, node: obj.Cell, code: CodeObject, tail: bool):
+        _, *exprs = node
+        if not exprs:
+            raise InvalidFormError(
+                "begin form should be followed by at least one expression"
+            )
+        for expr in exprs[:-1]:
+            self._compile(expr, code, tail=False)
+            code.emit(POP)
+        self._compile(exprs[-1], code, tail)
+
+    def _compile_if(self, node: obj.Cell, code: CodeObject, tail: bool):
+        _, test, then, *otherwise = node
+        self._compile(test, code, tail=False)
+        skip = code.emit(JUMP_IF_FALSE)
+        self._compile(then, code, tail)
+        done = code.emit(JUMP)
+        code.patch(skip, len(code.code))
+        if otherwise:
+            self._compile(otherwise[0], code, tail)
+        else:
+            code.emit(CONST, code.add_const(None))
+        code.patch(done, len(code.code))
+
+    def _compile_when(self, node: obj.Cell, code: CodeObject, tail: bool):
+        head, test, *body = node
+        self._compile(test, code, tail=False)
+        skip = code.emit(JUMP_IF_FALSE)
+        if head is sym.UNLESS:
+            code.emit(CONST, code.add_const(None))
+            done = code.emit(JUMP)
+            code.patch(skip, len(code.code))
+        for expr in body[:-1]:
+            self._compile(expr, code, tail=False)
+            code.emit(POP)
+        self._compile(body[-1], code, tail)
+        if head is sym.WHEN:
+            done = code.emit(JUMP)
+            code.patch(skip, len(code.code))
+            code.emit(CONST, code.add_const(None))
+        code.patch(done, len(code.code))
+
+    def _compile_and_or(self, node: obj.Cell, code: CodeObject, tail: bool):
+        head, *exprs = node
+        if not exprs:
+            code.emit(CONST, code.add_const(head is sym.AND))
+            return
+        jump = JUMP_IF_FALSE_OR_POP if head is sym.AND else JUMP_IF_TRUE_OR_POP
+        exits = []
+        for expr in exprs[:-1]:
+            self._compile(expr, code, tail=False)
+            exits.append(code.emit(jump))
+        self._compile(exprs[-1], code, tail)
+        for pos in exits:
+            code.patch(pos, len(code.code))
+
+    def _compile_let(self, node: obj.Cell, code: CodeObject, tail: bool):
+        _, bindings, body = node
+        for ref, expr in bindings:
+            self._compile(expr, code, tail=False)
+            _emit_bind(ref, code)
+        self._compile(body, code, tail)
+
+    def _compile_letrec(self, node: obj.Cell, code: CodeObject, tail: bool):
+        _, bindings, body = node
+        for ref, _ in bindings:
+            code.emit(CONST, code.add_const(UNBOUND))
+            _emit_bind(ref, code)
+        for ref, expr in bindings:
+            self._compile(expr, code, tail=False)
+            code.emit(STORE_BOXED if ref.boxed else STORE_LOCAL, ref.slot)
+            code.emit(POP)
+        self._compile(body, code, tail)
+
+    def _compile_loop(self, loop: Loop, code: CodeObject, tail: bool):
+        for ref, expr in zip(loop.refs, loop.inits):
+            self._compile(expr, code, tail=False)
+            _emit_bind(ref, code)
+        self._loops[loop] = len(code.code)
+        self._compile(loop.body, code, tail)
+        del self._loops[loop]
+
+    def _compile_recur(self, recur: Recur, code: CodeObject):
+        # every argument is evaluated before any variable is rebound
+        for arg in recur.args:
+            self._compile(arg, code, tail=False)
+        for ref in reversed(recur.loop.refs):
+            _emit_bind(ref, code)
+        code.emit(JUMP, self._loops[recur.loop])
+
+
+def _emit_bind(ref: LocalRef, code: CodeObject):
+    code.emit(BIND_BOXED if ref.boxed else BIND_LOCAL, ref.slot)
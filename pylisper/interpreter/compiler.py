@@ -2,28 +2,41 @@
 Module contains simple compiler class
 for the AST.
 """
+from typing import Optional
+
 import pylisper.interpreter.objects as obj
 from pylisper import ast
+from pylisper.locations import SourceMap
 
 
 class ObjectCompiler(ast.NodeVisitor):
     """
     Compiles AST to its corresponding object representation.
 
-    `Symbol` and `Number` are translated without much changes.
+    `Symbol` is translated without much changes while
+    `Number` becomes a plain pythons integer.
     `List` nodes are transforem into singly linked list to
     better model original lisps memory model.
+
+    Positions of the nodes are not kept in the objects,
+    if a `SourceMap` is passed on creation positions of
+    the lists are recorded there instead.
     """
 
+    def __init__(self, source_map: Optional[SourceMap] = None):
+        self._source_map = source_map
+
     def visit_list(self, node: ast.List):
         cell = None
         for n in reversed(node):
             val = n.accept(self)
             cell = obj.Cell.cons(val, cell)
+        if self._source_map is not None and node.position is not None:
+            self._source_map.add(cell, *node.position)
         return cell
 
     def visit_number(self, node: ast.Number):
-        return obj.Number(node.value)
+        return node.value
 
     def visit_symbol(self, node: ast.Symbol):
         return obj.Symbol(node.value)
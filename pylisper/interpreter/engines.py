@@ -0,0 +1,53 @@
+"""
+Registry of the available evaluation engines.
+
+Every engine is a class constructed with an `Env` and
+providing `eval` method accepting objects produced by
+the `ObjectCompiler`, so they can be used interchangeably.
+    - `tree` walks compiled objects directly (`Evaluator`),
+    - `vm` compiles them to bytecode and runs it on a `VM`,
+    - `stackless` walks them keeping pending work on the heap
+      (`StacklessEvaluator`).
+
+Engines are imported on the first access, so that importing
+the registry (and the runner) doesn't pay for every engine.
+"""
+import importlib
+from collections.abc import Mapping
+
+
+class _Engines(Mapping):
+    """
+    Read only mapping of engine names to their classes
+    which imports the class when it is looked up.
+    """
+
+    def __init__(self, paths):
+        self._paths = paths
+
+    def __getitem__(self, name: str):
+        module, cls = self._paths[name]
+        return getattr(importlib.import_module(module), cls)
+
+    def __iter__(self):
+        return iter(self._paths)
+
+    def __len__(self):
+        return len(self._paths)
+
+
+ENGINES = _Engines(
+    {
+        "tree": ("pylisper.interpreter.evaluator", "Evaluator"),
+        "vm": ("pylisper.interpreter.vm", "VM"),
+        "stackless": ("pylisper.interpreter.stackless", "StacklessEvaluator"),
+    }
+)
+"""
+A mapping of engine names to their classes.
+"""
+
+DEFAULT_ENGINE = "tree"
+"""
+Name of the engine used when none is specified.
+"""
@@ -6,11 +6,91 @@ as well as standard runtime environment with implementations.
 from __future__ import annotations
 
 from collections import UserDict
-from typing import Mapping, Optional
+from typing import Any, List, Mapping, Optional, Tuple
 
 from pylisper.interpreter.objects._symbol import Symbol
 
 
+class _Unbound:
+    """
+    Type of the `UNBOUND` marker.
+    """
+
+    def __repr__(self):
+        return "UNBOUND"
+
+
+UNBOUND = _Unbound()
+"""
+Marker for the bindings and frame slots that
+were not assigned any value yet.
+"""
+
+
+class Binding:
+    """
+    A single variable binding inside of an `Env`.
+
+    Bindings are handed out by `Env.binding` to the code
+    referencing global variables so that they can be read
+    directly instead of being looked up on each access.
+    Binding is kept in sync with the environment it
+    belongs to, so it should only be changed through it.
+    """
+
+    __slots__ = ("env", "symbol", "value")
+
+    def __init__(self, env: Env, symbol: Symbol, value: Any = UNBOUND):
+        self.env = env
+        self.symbol = symbol
+        self.value = value
+
+    def __repr__(self):
+        return f"Binding({self.symbol}={self.value!r})"
+
+
+class Box:
+    """
+    Mutable cell holding a variable that is both captured
+    by a closure and assigned, so the frame and the closures
+    see the same value.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any = UNBOUND):
+        self.value = value
+
+    def __repr__(self):
+        return f"Box({self.value!r})"
+
+
+class Frame:
+    """
+    Fixed size storage for the local variables of a single
+    lambda call.
+
+    Variables are addressed by the slot index assigned by
+    the `Resolver`. Variables of the enclosing lambdas are
+    reached through `captures` of the called closure.
+    """
+
+    __slots__ = ("values", "captures")
+
+    def __init__(self, values: List[Any], captures: Tuple[Any, ...] = ()):
+        """
+        Creates a frame.
+
+        Args/Kwargs:
+            `values`:
+                Initial slot values, its length is the size of the frame.
+            `captures`:
+                Variables captured by the called closure.
+        """
+        self.values = values
+        self.captures = captures
+
+
 class Env(UserDict):
     """
     Runtime environment providing simple symbol lookkup.
@@ -37,9 +117,44 @@ class Env(UserDict):
                 be found in this envirinment it will be then searched
                 in its parent.
         """
+        self._bindings = {}
         super().__init__(init)
         self.parent = parent
 
+    def __setitem__(self, sym: Symbol, value: Any):
+        self.data[sym] = value
+        binding = self._bindings.get(sym)
+        if binding is not None:
+            binding.value = value
+
+    def __delitem__(self, sym: Symbol):
+        del self.data[sym]
+        binding = self._bindings.get(sym)
+        if binding is not None:
+            binding.value = UNBOUND
+
+    def binding(self, sym: Symbol) -> Binding:
+        """
+        Returns `Binding` of the passed symbol.
+
+        Args/Kwargs:
+            `sym`:
+                Symbol to get binding for.
+
+        Binding is taken from the environment the symbol
+        is defined in. If the symbol is not defined yet then
+        an unbound binding is created in this environment
+        and it will get its value once the symbol gets defined.
+        """
+        env = self.lookup(sym)
+        if env is None:
+            env = self
+        binding = env._bindings.get(sym)
+        if binding is None:
+            binding = Binding(env, sym, env.data.get(sym, UNBOUND))
+            env._bindings[sym] = binding
+        return binding
+
     @property
     def is_global(self) -> bool:
         """
@@ -1,32 +1,65 @@
+from typing import Any, List, Optional, Union
+
 import pylisper.interpreter.objects as obj
 import pylisper.interpreter.symbols as sym
-from pylisper.interpreter.env import Env
+from pylisper.interpreter.env import UNBOUND, Env
 from pylisper.interpreter.exceptions import (EvalTypeError, EvaluationError,
                                              InvalidFormError, LogicError)
+from pylisper.interpreter.optimizer import Folded, Optimizer
+from pylisper.interpreter.resolver import (CapturedRef, GlobalRef,
+                                           LambdaTemplate, LocalRef, Loop,
+                                           Recur, Resolver)
+from pylisper.locations import SourceMap
 
 
 class Evaluator:
     """
     Allows for continous evaluation of
     a model compiled by `ObjectCompiler`.
+
+    Each evaluated expression is firstly resolved with
+    the `Resolver` so variables local to lambdas are kept
+    in the `Frame`s and accessed by their slot index.
+    Resolved expression is then passed through the `Optimizer`.
     """
 
-    def __init__(self, env: Env):
+    def __init__(
+        self,
+        env: Env,
+        optimize: bool = True,
+        source_map: Optional[SourceMap] = None,
+    ):
         """
         Create new Evaluator.
 
         Args/Kwargs:
             `env`:
                 Environment to initialize the Evaluator with.
+            `optimize`:
+                If `False` expressions are not optimized.
+            `source_map`:
+                Optional locations of the evaluated forms,
+                used to set `location` of the raised errors.
         """
-        self._current_env = env
+        self._env = env
+        self._current_frame = None
+        self._source_map = source_map
+        self._resolver = Resolver(env, source_map)
+        self._optimizer = Optimizer(source_map) if optimize else None
         self._special_forms = {
             sym.DEFINE: self._eval_define,
             sym.QUOTE: self._eval_quote,
             sym.COND: self._eval_cond,
-            sym.LAMBDA: self._eval_lambda,
             sym.SET: self._eval_set,
             sym.BEGIN: self._eval_begin,
+            sym.LET: self._eval_let,
+            sym.LET_STAR: self._eval_let,
+            sym.LETREC: self._eval_letrec,
+            sym.IF: self._eval_if,
+            sym.WHEN: self._eval_when,
+            sym.UNLESS: self._eval_unless,
+            sym.AND: self._eval_and,
+            sym.OR: self._eval_or,
         }
 
     def eval(self, expr: obj.BaseObject):
@@ -42,79 +75,148 @@ class Evaluator:
             `EvaluationError`:
                 In case of error during evaluation.
         """
-        while True:
-            if isinstance(expr, obj.Number):
-                res = self._eval_number(expr)
-            elif isinstance(expr, obj.Symbol):
-                res = self._eval_symbol(expr)
-            else:
-                res = self._eval_list(expr)
-                if isinstance(res, _ReuseStack):
-                    expr = res.expr
-                    continue
-            return res
+        try:
+            resolved = self._resolver.resolve(expr)
+            if self._optimizer is not None:
+                resolved = self._optimizer.optimize(resolved)
+            return self._eval(resolved)
+        except EvaluationError as e:
+            if e.location is None and self._source_map is not None:
+                e.location = self._source_map.get(expr)
+            raise
 
-    def _eval_number(self, number: obj.Number):
-        return number.value
+    def _eval(self, expr: obj.BaseObject):
+        """
+        Evaluates resolved expression.
+
+        Expressions in tail position (see `_ReuseStack`) are
+        evaluated in a loop instead of recursively. This includes
+        calls to lambdas, for which current frame is swapped
+        with the callees one, and bodies of the loops (see `Loop`).
+        Frame that was current on entry is restored on exit.
+
+        Errors get location of the innermost evaluated form
+        that has one in the source map.
+        """
+        frame = self._current_frame
+        try:
+            while True:
+                if isinstance(expr, (LocalRef, CapturedRef)):
+                    res = self._eval_local(expr)
+                elif isinstance(expr, GlobalRef):
+                    res = self._eval_global(expr)
+                elif isinstance(expr, int):
+                    res = expr
+                elif isinstance(expr, obj.Symbol):
+                    res = self._eval_symbol(expr)
+                elif isinstance(expr, LambdaTemplate):
+                    res = obj.Lambda(self, expr, expr.capture(self._current_frame))
+                elif isinstance(expr, Folded):
+                    if not expr.holds():
+                        expr = expr.expr
+                        continue
+                    res = expr.value
+                elif isinstance(expr, Recur):
+                    expr = self._eval_recur(expr)
+                    continue
+                elif isinstance(expr, Loop):
+                    expr = self._eval_loop(expr)
+                    continue
+                else:
+                    res = self._eval_list(expr)
+                    if isinstance(res, _ReuseStack):
+                        expr = res.expr
+                        continue
+                return res
+        except EvaluationError as e:
+            if e.location is None and self._source_map is not None:
+                e.location = self._source_map.get(expr)
+            raise
+        finally:
+            self._current_frame = frame
 
     def _eval_symbol(self, symbol: obj.Symbol):
-        env = self._current_env.lookup(symbol)
+        env = self._env.lookup(symbol)
         if env is None:
             raise EvaluationError(f"Undefinied symbol {symbol}")
         return env[symbol]
 
+    def _eval_local(self, ref: Union[LocalRef, CapturedRef]):
+        res = ref.load(self._current_frame)
+        if res is UNBOUND:
+            raise EvaluationError(f"Undefinied symbol {ref.symbol}")
+        return res
+
+    def _eval_global(self, ref: GlobalRef):
+        res = ref.binding.value
+        if res is UNBOUND:
+            raise EvaluationError(f"Undefinied symbol {ref.symbol}")
+        return res
+
     def _eval_list(self, list: obj.Cell):
         if list is None:
             raise LogicError("Cannot evaluate an empty list")
-        func, *args = list
-        if isinstance(func, obj.Symbol) and func in self._special_forms:
+        func = list.car
+        if isinstance(func, GlobalRef):
+            func = self._callee(func)
+        elif isinstance(func, obj.Symbol) and func in self._special_forms:
             return self._special_forms[func](list)
-        func = self.eval(func)
-        args = [self.eval(arg) for arg in args]
-        if not callable(func):
-            raise InvalidFormError(
-                "First value of an unquoted list should be a function"
-            )
-        return func(*args)
+        else:
+            func = self._eval(func)
+        # arguments are collected into a single list, that becomes
+        # the frame of a lambda, calls with up to two of them
+        # don't have to walk the cells in a loop
+        node = list.cdr
+        if node is None:
+            args = []
+        elif node.cdr is None:
+            args = [self._eval(node.car)]
+        elif node.cdr.cdr is None:
+            args = [self._eval(node.car), self._eval(node.cdr.car)]
+        else:
+            args = []
+            while node is not None:
+                args.append(self._eval(node.car))
+                node = node.cdr
+        return self._apply(func, args)
 
-    def push_env(self, env: Env):
+    def _callee(self, ref: GlobalRef):
         """
-        Pushes new environment onto the stack.
+        Returns function called through a global variable.
 
-        Assertion is made to make sure that the same
-        environment is not pushed twice as that would
-        create a reference cycle. And probably that
-        is not what you want anyway.
+        Binding of the reference acts as an inline cache of
+        the call site, it is resolved once by the `Resolver` and
+        kept up to date by the `Env` on every `define` and `set!`,
+        so the value is read without evaluating the reference.
         """
-        assert env is not self._current_env
-        env.parent = self._current_env
-        self._current_env = env
+        return self._eval_global(ref)
 
-    def pop_env(self):
+    def _apply(self, func, args: List[Any]):
         """
-        Pops environment from the stack.
+        Calls function with evaluated arguments.
 
-        Assertion is made to make sure that top level
-        environment is not popped from the stack as
-        that is not something that should ever happen.
+        Lambdas of this evaluator are not called, instead
+        frame of the call, made of the `args` list, is made
+        current and their body is returned to be evaluated in it.
         """
-        assert not self._current_env.is_global
-        self._current_env = self._current_env.parent
-
-    def _eval_lambda(self, node: obj.Cell):
-        try:
-            _, args, body = node
-        except ValueError:
+        if isinstance(func, obj.Lambda) and func._evaluator is self:
+            self._current_frame = func.frame(args)
+            return _ReuseStack(func._template.body)
+        if not callable(func):
             raise InvalidFormError(
-                "lambda form should consist of arguments and a function body"
+                "First value of an unquoted list should be a function"
             )
-        if args is not None:
-            if not isinstance(args, obj.Cell):
-                raise InvalidFormError("lambdas arguments should be a list")
-            for arg in args:
-                if not isinstance(arg, obj.Symbol):
-                    raise InvalidFormError("lambda form arguments should be symbols")
-        return obj.Lambda(self, args, body)
+        return func(*args)
+
+    def _call(self, func: obj.Lambda, args: List[Any]):
+        """
+        Evaluates call to a lambda of this evaluator made
+        from outside of it, see `Lambda.__call__`.
+
+        Frame of the call is made current by `_apply`,
+        as for the calls made by the evaluated code.
+        """
+        return self._eval(self._apply(func, args).expr)
 
     def _eval_cond(self, node: obj.Cell):
         try:
@@ -126,7 +228,7 @@ class Evaluator:
             )
         try:
             for cond, expr in exprs:
-                if self.eval(cond):
+                if self._eval(cond):
                     return _ReuseStack(expr)
         except (ValueError, TypeError):
             raise InvalidFormError(
@@ -152,11 +254,14 @@ class Evaluator:
                 " first one being a symbol and the second one being"
                 " an assigned expression"
             )
-        if not isinstance(sym, obj.Symbol):
+        if isinstance(sym, LocalRef):
+            sym.store(self._current_frame, self._eval(expr))
+        elif isinstance(sym, obj.Symbol):
+            self._env[sym] = self._eval(expr)
+        else:
             raise InvalidFormError(
                 "first argument to the define form should be a symbol"
             )
-        self._current_env[sym] = self.eval(expr)
 
     def _eval_set(self, node: obj.Cell):
         err = InvalidFormError(
@@ -167,14 +272,21 @@ class Evaluator:
             _, ref, expr = node
         except ValueError:
             raise err
-        if isinstance(ref, obj.Symbol):
-            ref_env = self._current_env.lookup(ref)
+        if isinstance(ref, (LocalRef, CapturedRef)):
+            ref.store(self._current_frame, self._eval(expr))
+        elif isinstance(ref, GlobalRef):
+            binding = ref.binding
+            if binding.value is UNBOUND:
+                raise EvaluationError(f"unknown symbol {ref}")
+            binding.env[binding.symbol] = self._eval(expr)
+        elif isinstance(ref, obj.Symbol):
+            ref_env = self._env.lookup(ref)
             if ref_env is None:
                 raise EvaluationError(f"unknown symbol {ref}")
-            ref_env[ref] = self.eval(expr)
+            ref_env[ref] = self._eval(expr)
         elif isinstance(ref, obj.Cell) and ref.car is sym.CAR:
             cell = self._eval_car_to_cell(ref)
-            cell.value = self.eval(expr)
+            cell.car = self._eval(expr)
         else:
             raise err
 
@@ -185,7 +297,7 @@ class Evaluator:
             raise InvalidFormError(
                 "car should be followed by a single expression to evaluate"
             )
-        cell = self.eval(expr)
+        cell = self._eval(expr)
         if cell is None:
             raise LogicError("car cannot be used on an empty list")
         if not isinstance(cell, obj.Cell):
@@ -200,14 +312,108 @@ class Evaluator:
                 "begin form should be followed by at least one expression"
             )
         for expr in exprs[:-1]:
-            self.eval(expr)
+            self._eval(expr)
         return _ReuseStack(exprs[-1])
 
+    # forms below are validated by the resolver, so they walk
+    # their cells instead of unpacking them into lists
+
+    def _eval_if(self, node: obj.Cell):
+        test = node.cdr
+        branches = test.cdr
+        if self._eval(test.car):
+            return _ReuseStack(branches.car)
+        if branches.cdr is None:
+            return None
+        return _ReuseStack(branches.cdr.car)
+
+    def _eval_when(self, node: obj.Cell):
+        test = node.cdr
+        if not self._eval(test.car):
+            return None
+        return self._eval_body(test.cdr)
+
+    def _eval_unless(self, node: obj.Cell):
+        test = node.cdr
+        if self._eval(test.car):
+            return None
+        return self._eval_body(test.cdr)
+
+    def _eval_body(self, exprs: obj.Cell):
+        """
+        Evaluates expressions in sequence and returns
+        the last one to be evaluated in tail position.
+        """
+        while exprs.cdr is not None:
+            self._eval(exprs.car)
+            exprs = exprs.cdr
+        return _ReuseStack(exprs.car)
+
+    def _eval_and(self, node: obj.Cell):
+        exprs = node.cdr
+        if exprs is None:
+            return True
+        while exprs.cdr is not None:
+            res = self._eval(exprs.car)
+            if not res:
+                return res
+            exprs = exprs.cdr
+        return _ReuseStack(exprs.car)
+
+    def _eval_or(self, node: obj.Cell):
+        exprs = node.cdr
+        if exprs is None:
+            return False
+        while exprs.cdr is not None:
+            res = self._eval(exprs.car)
+            if res:
+                return res
+            exprs = exprs.cdr
+        return _ReuseStack(exprs.car)
+
+    def _eval_let(self, node: obj.Cell):
+        _, bindings, body = node
+        frame = self._current_frame
+        for ref, expr in bindings:
+            ref.bind(frame, self._eval(expr))
+        return _ReuseStack(body)
+
+    def _eval_letrec(self, node: obj.Cell):
+        _, bindings, body = node
+        frame = self._current_frame
+        for ref, _ in bindings:
+            ref.bind(frame, UNBOUND)
+        for ref, expr in bindings:
+            ref.store(frame, self._eval(expr))
+        return _ReuseStack(body)
+
+    def _eval_loop(self, loop: Loop):
+        """
+        Binds variables of the loop and returns its body.
+        """
+        frame = self._current_frame
+        for ref, expr in zip(loop.refs, loop.inits):
+            ref.bind(frame, self._eval(expr))
+        return loop.body
+
+    def _eval_recur(self, recur: Recur):
+        """
+        Rebinds variables of the loop and returns its body.
+        """
+        vals = [self._eval(arg) for arg in recur.args]
+        frame = self._current_frame
+        for ref, val in zip(recur.loop.refs, vals):
+            ref.bind(frame, val)
+        return recur.loop.body
+
 
 class _ReuseStack:
     """
     Simple marker to wrap returned expression with if
     the evaluator should perform tail optimization.
+
+    Wrapped expression is evaluated with whatever frame
+    is current at the time the marker is returned.
     """
 
     def __init__(self, expr):
@@ -11,8 +11,14 @@ class EvaluationError(Exception):
     """
     An exception to be raised during expression
     evaluation.
+
+    `location` is set by the engines to the `Location`
+    of the innermost form they know the error happened
+    in, when the source was read with a `SourceMap`.
     """
 
+    location = None
+
 
 class EvalTypeError(EvaluationError):
     """
@@ -0,0 +1,325 @@
+"""
+Contains macro expander run on expressions before
+they are resolved (see `Resolver`).
+
+Macros are defined at the top level with `define-syntax`
+and `syntax-rules`:
+
+    (define-syntax name
+        (syntax-rules (literals ...)
+            (pattern template) ...))
+
+Every use of a macro, that is a list starting with its name,
+is expanded once when the form it occurs in is expanded. Lambda
+bodies are expanded when the lambda form is, so calling a lambda
+never expands anything again and macros cost nothing at runtime.
+
+Patterns are lists which first item (the name of the macro)
+is ignored. A symbol in a pattern matches any form and binds it,
+unless it is one of the literals, which only match themselves,
+or `_`, which matches anything without binding. A pattern followed
+by `...` matches any number of forms and the variables bound inside
+of it have to be followed by `...` in the template as well.
+
+Expansion is not hygienic, names introduced by a template
+refer to whatever they refer to at the place of use.
+Macros are global, once defined a name is expanded as
+a macro everywhere outside of the quoted expressions.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pylisper.interpreter.objects as obj
+import pylisper.interpreter.symbols as sym
+from pylisper.interpreter.exceptions import InvalidFormError
+from pylisper.locations import SourceMap
+
+
+class _Many(list):
+    """
+    Bindings of a pattern variable matched under an ellipsis.
+    """
+
+
+class SyntaxRules:
+    """
+    Macro transformer defined with `syntax-rules`.
+    """
+
+    def __init__(
+        self,
+        name: obj.Symbol,
+        literals: Sequence[obj.Symbol],
+        rules: Sequence[Tuple[obj.BaseObject, obj.BaseObject]],
+    ):
+        """
+        Creates a transformer.
+
+        Args/Kwargs:
+            `name`:
+                Name of the macro.
+            `literals`:
+                Symbols matching only themselves in the patterns.
+            `rules`:
+                Pairs of a pattern and a template, tried in order.
+        """
+        self.name = name
+        self.literals = frozenset(literals)
+        self.rules = tuple(rules)
+
+    def expand(self, form: obj.Cell) -> obj.BaseObject:
+        """
+        Returns expansion of the macro use.
+
+        Raises:
+            `InvalidFormError`:
+                If none of the patterns matches the form
+                or a template uses a variable incorrectly.
+        """
+        for pattern, template in self.rules:
+            binds = {}
+            if self._match(pattern.cdr, form.cdr, binds):
+                return _substitute(template, binds)
+        raise InvalidFormError(f"no syntax rule of {self.name} matches {form}")
+
+    def _match(self, pattern, form, binds: Dict[obj.Symbol, obj.BaseObject]) -> bool:
+        if isinstance(pattern, obj.Symbol):
+            if pattern is sym.WILDCARD:
+                return True
+            if pattern in self.literals:
+                return form is pattern
+            binds[pattern] = form
+            return True
+        if pattern is None:
+            return form is None
+        if isinstance(pattern, obj.Cell):
+            if form is not None and not isinstance(form, obj.Cell):
+                return False
+            return self._match_list(list(pattern), list(form or ()), binds)
+        return type(form) is type(pattern) and form == pattern
+
+    def _match_list(self, patterns: list, forms: list, binds) -> bool:
+        if sym.ELLIPSIS not in patterns:
+            if len(patterns) != len(forms):
+                return False
+            return all(self._match(p, f, binds) for p, f in zip(patterns, forms))
+        index = patterns.index(sym.ELLIPSIS)
+        if index == 0:
+            raise InvalidFormError(f"... has to follow a pattern in {self.name}")
+        before, repeated = patterns[: index - 1], patterns[index - 1]
+        after = patterns[index + 1 :]
+        if len(forms) < len(before) + len(after):
+            return False
+        middle = forms[len(before) : len(forms) - len(after)]
+        if not self._match_list(before, forms[: len(before)], binds):
+            return False
+        if not self._match_list(after, forms[len(forms) - len(after) :], binds):
+            return False
+        matches = []
+        for form in middle:
+            inner = {}
+            if not self._match(repeated, form, inner):
+                return False
+            matches.append(inner)
+        for var in self._variables(repeated):
+            binds[var] = _Many(inner[var] for inner in matches)
+        return True
+
+    def _variables(self, pattern) -> List[obj.Symbol]:
+        if isinstance(pattern, obj.Symbol):
+            if pattern in (sym.WILDCARD, sym.ELLIPSIS) or pattern in self.literals:
+                return []
+            return [pattern]
+        if isinstance(pattern, obj.Cell):
+            return [var for item in pattern for var in self._variables(item)]
+        return []
+
+
+def _substitute(template, binds: Dict[obj.Symbol, obj.BaseObject]):
+    if isinstance(template, obj.Symbol):
+        if template not in binds:
+            return template
+        val = binds[template]
+        if isinstance(val, _Many):
+            raise InvalidFormError(f"{template} has to be followed by ...")
+        return val
+    if not isinstance(template, obj.Cell):
+        return template
+    items = list(template)
+    res = []
+    for i, item in enumerate(items):
+        if item is sym.ELLIPSIS:
+            continue
+        if i + 1 < len(items) and items[i + 1] is sym.ELLIPSIS:
+            res.extend(_substitute_many(item, binds))
+        else:
+            res.append(_substitute(item, binds))
+    return _from_list(res)
+
+
+def _substitute_many(template, binds) -> list:
+    many = {var: val for var, val in binds.items() if isinstance(val, _Many)}
+    used = [var for var in many if _occurs(var, template)]
+    if not used:
+        raise InvalidFormError(f"no variable of {template} is followed by ...")
+    count = len(many[used[0]])
+    if any(len(many[var]) != count for var in used):
+        raise InvalidFormError(f"variables of {template} matched different lengths")
+    res = []
+    for i in range(count):
+        inner = dict(binds)
+        for var in used:
+            inner[var] = many[var][i]
+        res.append(_substitute(template, inner))
+    return res
+
+
+def _occurs(var: obj.Symbol, template) -> bool:
+    if isinstance(template, obj.Cell):
+        return any(_occurs(var, item) for item in template)
+    return template is var
+
+
+class Expander:
+    """
+    Expands macros of the expressions.
+
+    Keeps macros defined by the expanded expressions,
+    so they can be used by the expressions expanded later.
+    """
+
+    def __init__(self, source_map: Optional[SourceMap] = None):
+        """
+        Creates new expander.
+
+        Args/Kwargs:
+            `source_map`:
+                Optional locations of the expanded forms, expansions
+                get the location of the macro use.
+        """
+        self.macros: Dict[obj.Symbol, SyntaxRules] = {}
+        self.source_map = source_map
+
+    def expand(self, expr: obj.BaseObject) -> obj.BaseObject:
+        """
+        Returns the top level expression with every macro use expanded.
+
+        Expressions without macros are returned as they are.
+
+        Raises:
+            `InvalidFormError`:
+                In case of a malformed macro definition or use.
+        """
+        if isinstance(expr, obj.Cell) and expr.car is sym.DEFINE_SYNTAX:
+            self._define_syntax(expr)
+            return _from_list([sym.QUOTE, None])
+        return self._expand(expr)
+
+    def _expand(self, expr: obj.BaseObject) -> obj.BaseObject:
+        if not isinstance(expr, obj.Cell) or not self.macros:
+            return expr
+        head = expr.car
+        if head is sym.QUOTE:
+            return expr
+        if head is sym.DEFINE_SYNTAX:
+            raise InvalidFormError("define-syntax can only be used at the top level")
+        if isinstance(head, obj.Symbol) and head in self.macros:
+            res = self.macros[head].expand(expr)
+            if self.source_map is not None:
+                self.source_map.copy(expr, res)
+            return self._expand(res)
+        items = list(expr)
+        if head is sym.LAMBDA and len(items) == 3:
+            # parameters are not expressions
+            return self._rebuild(expr, items[:2] + [self._expand(items[2])])
+        if head is sym.COND:
+            arms = [self._expand_each(arm) for arm in items[1:]]
+            return self._rebuild(expr, [head] + arms)
+        if head in _BINDING_FORMS:
+            return self._rebuild(expr, self._expand_binding_form(items))
+        return self._expand_each(expr)
+
+    def _expand_binding_form(self, items: list) -> list:
+        """
+        Expands `let` like or `do` form, of which only the values
+        of the bindings (and steps of `do`) and the body are expressions.
+        """
+        head = items[0]
+        named = head is sym.LET and len(items) > 1 and isinstance(items[1], obj.Symbol)
+        bindings = 2 if named else 1
+        if len(items) <= bindings:
+            return items
+        res = items[: bindings + 1]
+        if isinstance(items[bindings], obj.Cell):
+            res[bindings] = self._rebuild(
+                items[bindings],
+                [self._expand_binding(binding) for binding in items[bindings]],
+            )
+        for i, item in enumerate(items[bindings + 1 :], bindings + 1):
+            if head is sym.DO and i == bindings + 1:
+                # test and the results
+                res.append(self._expand_each(item))
+            else:
+                res.append(self._expand(item))
+        return res
+
+    def _expand_binding(self, binding: obj.BaseObject) -> obj.BaseObject:
+        if not isinstance(binding, obj.Cell):
+            return binding
+        name, *exprs = binding
+        return self._rebuild(binding, [name] + [self._expand(e) for e in exprs])
+
+    def _expand_each(self, expr: obj.BaseObject) -> obj.BaseObject:
+        if not isinstance(expr, obj.Cell):
+            return expr
+        return self._rebuild(expr, [self._expand(item) for item in expr])
+
+    def _rebuild(self, expr: obj.Cell, items: list) -> obj.Cell:
+        """
+        Returns `expr` if none of its items changed,
+        a new list of the `items` otherwise.
+        """
+        if all(new is old for new, old in zip(items, expr)):
+            return expr
+        res = _from_list(items)
+        if self.source_map is not None:
+            self.source_map.copy(expr, res)
+        return res
+
+    def _define_syntax(self, node: obj.Cell):
+        err = InvalidFormError(
+            "define-syntax form should consist of a name"
+            " and a syntax-rules form with a list of literals"
+            " followed by (pattern template) rules"
+        )
+        try:
+            _, name, rules = node
+            head, literals, *rules = rules
+        except (ValueError, TypeError):
+            raise err
+        if not isinstance(name, obj.Symbol) or head is not sym.SYNTAX_RULES:
+            raise err
+        if literals is not None and not isinstance(literals, obj.Cell):
+            raise err
+        literals = list(literals or ())
+        if not all(isinstance(lit, obj.Symbol) for lit in literals):
+            raise err
+        parsed = []
+        for rule in rules:
+            try:
+                pattern, template = rule
+            except (ValueError, TypeError):
+                raise err
+            if not isinstance(pattern, obj.Cell):
+                raise err
+            parsed.append((pattern, template))
+        self.macros[name] = SyntaxRules(name, literals, parsed)
+
+
+_BINDING_FORMS = frozenset([sym.LET, sym.LET_STAR, sym.LETREC, sym.DO])
+
+
+def _from_list(exprs) -> Optional[obj.Cell]:
+    cell = None
+    for expr in reversed(exprs):
+        cell = obj.Cell(expr, cell)
+    return cell
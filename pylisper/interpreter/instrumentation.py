@@ -0,0 +1,198 @@
+"""
+Contains instrumented evaluator counting what the
+evaluator does and calling hooks on its events.
+
+`InstrumentedEvaluator` is a drop in replacement for the
+`Evaluator` (the `tree` engine). Instrumentation is opt in,
+the plain `Evaluator` doesn't count nor check for hooks.
+
+Counted are:
+    - `eval_steps`, expressions evaluated, including the ones
+      evaluated in a loop in tail position,
+    - `special_forms`, evaluated special forms by their name,
+    - `lambda_calls`, calls to the lambdas of the evaluator,
+      each of which allocates a `Frame`,
+    - `builtin_calls`, calls to any other function,
+    - `cons_cells`, cells allocated with `cons`,
+    - `max_depth`, maximal number of nested (not in tail position)
+      lambda calls, which is the number of frames alive at once.
+
+Lambdas called by builtin functions (for example by `map`)
+are counted the same way as the ones called by the evaluator.
+"""
+import json
+from typing import Any, Callable, Dict, Optional
+
+import pylisper.interpreter.objects as obj
+import pylisper.interpreter.symbols as sym
+from pylisper.interpreter.env import Env
+from pylisper.interpreter.evaluator import Evaluator, _ReuseStack
+from pylisper.interpreter.std_env import STD_ENV
+from pylisper.locations import Location, SourceMap
+
+_CONS = STD_ENV[sym.CONS]
+
+
+class Counters:
+    """
+    Counters gathered by the `InstrumentedEvaluator`.
+    """
+
+    __slots__ = (
+        "eval_steps",
+        "special_forms",
+        "lambda_calls",
+        "builtin_calls",
+        "cons_cells",
+        "max_depth",
+    )
+
+    def __init__(self):
+        self.eval_steps = 0
+        self.special_forms: Dict[str, int] = {}
+        self.lambda_calls = 0
+        self.builtin_calls = 0
+        self.cons_cells = 0
+        self.max_depth = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """
+        Returns counters as a `dict`.
+        """
+        res = {name: getattr(self, name) for name in self.__slots__}
+        res["special_forms"] = dict(self.special_forms)
+        return res
+
+    def to_json(self) -> str:
+        """
+        Returns counters as a JSON object.
+        """
+        return json.dumps(self.as_dict(), sort_keys=True)
+
+
+class InstrumentedEvaluator(Evaluator):
+    """
+    `Evaluator` updating `Counters` and calling hooks.
+
+    Hooks are optional callables:
+        - `on_eval(expr)`, called before each evaluation step,
+        - `on_special_form(name, node)`, called before
+          a special form is evaluated,
+        - `on_call(func, args)`, called before every call.
+
+    Expressions passed to the hooks are resolved ones,
+    their location can be obtained with `location`.
+    """
+
+    def __init__(
+        self,
+        env: Env,
+        optimize: bool = True,
+        source_map: Optional[SourceMap] = None,
+        counters: Optional[Counters] = None,
+        on_eval: Optional[Callable[[obj.BaseObject], Any]] = None,
+        on_special_form: Optional[Callable[[str, obj.Cell], Any]] = None,
+        on_call: Optional[Callable[[Any, list], Any]] = None,
+    ):
+        """
+        Creates new instrumented evaluator.
+
+        Args/Kwargs:
+            `env`:
+                Environment to initialize the Evaluator with.
+            `optimize`:
+                If `False` expressions are not optimized.
+            `source_map`:
+                Optional locations of the evaluated forms.
+            `counters`:
+                Counters to update, new ones if `None`.
+            `on_eval`, `on_special_form`, `on_call`:
+                Hooks, see the class documentation.
+        """
+        super().__init__(env, optimize, source_map)
+        self.counters = Counters() if counters is None else counters
+        self._on_eval = on_eval
+        self._on_special_form = on_special_form
+        self._on_call = on_call
+        # number of lambda calls alive and whether
+        # the innermost `_eval` made one of them
+        self._depth = 0
+        self._entered = False
+        for name, form in self._special_forms.items():
+            self._special_forms[name] = self._counted(str(name), form)
+
+    def location(self, expr: obj.BaseObject) -> Optional[Location]:
+        """
+        Returns location of the expression, if it is known.
+        """
+        if self._source_map is None:
+            return None
+        return self._source_map.get(expr)
+
+    def _counted(self, name: str, form: Callable):
+        counts = self.counters.special_forms
+
+        def special_form(node: obj.Cell):
+            counts[name] = counts.get(name, 0) + 1
+            if self._on_special_form is not None:
+                self._on_special_form(name, node)
+            return form(node)
+
+        return special_form
+
+    def _eval(self, expr: obj.BaseObject):
+        self.counters.eval_steps += 1
+        if self._on_eval is not None:
+            self._on_eval(expr)
+        return self._nested(super()._eval, expr)
+
+    def _call(self, func: obj.Lambda, args: list):
+        # called by a builtin, so the call is nested in it
+        return self._nested(super()._call, func, args)
+
+    def _nested(self, evaluate, *args):
+        """
+        Runs `evaluate` counting a lambda call it makes as nested.
+        """
+        entered = self._entered
+        self._entered = False
+        try:
+            return evaluate(*args)
+        finally:
+            if self._entered:
+                self._depth -= 1
+            self._entered = entered
+
+    def _eval_list(self, list: obj.Cell):
+        res = super()._eval_list(list)
+        if isinstance(res, _ReuseStack):
+            # evaluated in the loop of the current `_eval`
+            self.counters.eval_steps += 1
+            if self._on_eval is not None:
+                self._on_eval(res.expr)
+        return res
+
+    def _callee(self, ref):
+        # evaluated without `_eval`, but still a step
+        self.counters.eval_steps += 1
+        if self._on_eval is not None:
+            self._on_eval(ref)
+        return super()._callee(ref)
+
+    def _apply(self, func, args):
+        counters = self.counters
+        if self._on_call is not None:
+            # `args` become the frame of a lambda call
+            self._on_call(func, list(args))
+        if isinstance(func, obj.Lambda) and func._evaluator is self:
+            counters.lambda_calls += 1
+            if not self._entered:
+                self._entered = True
+                self._depth += 1
+                if self._depth > counters.max_depth:
+                    counters.max_depth = self._depth
+        else:
+            counters.builtin_calls += 1
+            if func is _CONS:
+                counters.cons_cells += 1
+        return super()._apply(func, args)
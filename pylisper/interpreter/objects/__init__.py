@@ -3,20 +3,28 @@ This module contains classes for the object model
 of the executed code.
     - `BaseObject` as a base class for all of the objects,
     - `Cell` representing a node in a singly-linked list,
-    - `Number` being a simple wrapper for integer,
+    - `Vector`, an array of values,
+    - `HashTable`, a mapping of symbols and numbers to values,
+    - `NumArray`, a packed array of numbers,
     - `Lambda`, a function capturing its environment;
     - `Symbol`, an identifier.
+
+Numbers are represented by plain pythons integers.
 """
+from pylisper.interpreter.objects._array import NumArray
 from pylisper.interpreter.objects._base import BaseObject
 from pylisper.interpreter.objects._cell import Cell
+from pylisper.interpreter.objects._hash_table import HashTable
 from pylisper.interpreter.objects._lambda import Lambda
-from pylisper.interpreter.objects._number import Number
 from pylisper.interpreter.objects._symbol import Symbol
+from pylisper.interpreter.objects._vector import Vector
 
 __all__ = [
     "BaseObject",
     "Cell",
-    "Number",
+    "Vector",
+    "HashTable",
+    "NumArray",
     "Lambda",
     "Symbol",
 ]
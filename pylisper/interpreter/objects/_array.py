@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from pylisper.interpreter.objects._base import BaseObject
+
+TYPES = {"q": "int64", "d": "float64"}
+"""
+Names of the supported element types keyed by their
+`array` module type codes.
+"""
+
+
+class NumArray(BaseObject):
+    """
+    Packed array of numbers of a single type,
+    either 64 bit integers or 64 bit floats.
+
+    Items are kept in a `memoryview` under the `data` attribute,
+    over an `array.array` or a memory mapped file, so arrays can
+    be sliced without copying. Arrays can be large, so they
+    are printed without their items, as `#<array int64 len=3>`,
+    which can't be read back.
+    """
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: memoryview):
+        """
+        Creates an array.
+
+        Args/Kwargs:
+            `data`:
+                View of the items, with format being one
+                of the `TYPES` type codes.
+        """
+        self.data = data
+
+    @property
+    def typecode(self) -> str:
+        """
+        Type code of the items, see `TYPES`.
+        """
+        return self.data.format
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __str__(self):
+        return f"#<array {TYPES[self.typecode]} len={len(self)}>"
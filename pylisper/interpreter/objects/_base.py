@@ -1,7 +1,4 @@
-from abc import ABC, abstractmethod
-
-
-class BaseObject(ABC):
+class BaseObject:
     """
     Base class for all of the deriving objects.
 
@@ -9,8 +6,13 @@ class BaseObject(ABC):
     assuring that all of the objects have a reasonable
     string representation and having all of them
     have distinct root.
+
+    It's a plain class with empty `__slots__` instead of
+    an `ABC` so deriving classes can declare their own
+    `__slots__` and stay free of the per-instance `__dict__`.
     """
 
-    @abstractmethod
+    __slots__ = ()
+
     def __str__(self):
-        ...
+        raise NotImplementedError
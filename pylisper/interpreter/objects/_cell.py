@@ -10,9 +10,9 @@ class Cell(BaseObject):
     `Cell` is a node in a singly-linked list.
 
     It is modeled after the original lisps list.
-    Alias `car` for the underlaying value is provided.
-    As well as static `cons` method that simply wraps
-    the class constructor.
+    Both `car` and `cdr` are plain slot attributes.
+    Alias `value` for the `car` is provided as well as
+    static `cons` method that simply wraps the class constructor.
 
     `Cell` is an interator so it can be used with
     pattern matching to unpack values.
@@ -35,6 +35,8 @@ class Cell(BaseObject):
         2
     """
 
+    __slots__ = ("car", "cdr")
+
     def __init__(self, value: Any, cdr: Optional[Cell] = None):
         """
         Creates a cell.
@@ -45,15 +47,19 @@ class Cell(BaseObject):
             `cdr`:
                 Optional rest of the list.
         """
-        self.value = value
+        self.car = value
         self.cdr = cdr
 
     @property
-    def car(self):
+    def value(self):
         """
-        Simple getter for the `self.value`.
+        Alias for the `self.car`.
         """
-        return self.value
+        return self.car
+
+    @value.setter
+    def value(self, value: Any):
+        self.car = value
 
     def __iter__(self):
         return CellIterator(self)
@@ -75,6 +81,8 @@ class CellIterator:
     An iterator over the cells values.
     """
 
+    __slots__ = ("_cell",)
+
     def __init__(self, cell: Cell):
         self._cell = cell
 
@@ -84,6 +92,6 @@ class CellIterator:
     def __next__(self):
         if self._cell is None:
             raise StopIteration
-        val = self._cell.value
+        val = self._cell.car
         self._cell = self._cell.cdr
         return val
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from typing import Any, Dict
+
+from pylisper.interpreter.objects._base import BaseObject
+
+
+class HashTable(BaseObject):
+    """
+    Mapping of symbols and numbers to values
+    with constant time access.
+
+    Entries are kept in a pythons `dict` under the `items`
+    attribute. Hash tables are written as `#hash((a 1) (b 2))`.
+    """
+
+    __slots__ = ("items",)
+
+    def __init__(self, items: Dict[Any, Any]):
+        """
+        Creates a hash table.
+
+        Args/Kwargs:
+            `items`:
+                Dictionary of entries, owned by the table from now on.
+        """
+        self.items = items
+
+    def __len__(self):
+        return len(self.items)
+
+    def __str__(self):
+        body = " ".join(f"({key} {val})" for key, val in self.items.items())
+        return f"#hash({body})"
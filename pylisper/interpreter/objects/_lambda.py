@@ -1,47 +1,64 @@
 from __future__ import annotations
 
-from typing import Any, Sequence
+from typing import Any, List, Sequence, Tuple
 
-from pylisper.interpreter.env import Env
+import pylisper.interpreter.env as env
 from pylisper.interpreter.exceptions import EvaluationError
 from pylisper.interpreter.objects._base import BaseObject
-from pylisper.interpreter.objects._symbol import Symbol
-
-LambdaArgs = Sequence[Symbol]
 
 
 class Lambda(BaseObject):
     """
     Model representing a lambda function.
 
-    Lambda is represented by its unevaluated body,
-    list of arguments and environment captured at
-    lambda definition.
+    Lambda is represented by its resolved template
+    (see `LambdaTemplate`) and the variables it captured.
     """
 
-    def __init__(self, eval, args: LambdaArgs, body: BaseObject):
+    __slots__ = ("_evaluator", "_template", "_captures")
+
+    def __init__(self, eval, template, captures: Tuple[Any, ...]):
         """
         Creates a lambda object.
 
         Args/Kwargs:
             `eval`:
-                Evaluator, used to capture definition environment as well
-                as to, later, evaluate lambdas body.
-            `body`:
-                Unevaluated function body.
-            `args`:
-                List of symbols to be later associated with values lambda was
-                called with.
+                Evaluator, used to evaluate lambdas body.
+            `template`:
+                Resolved lambda form holding parameters, frame size
+                and the body of the lambda.
+            `captures`:
+                Free variables of the lambda, see `LambdaTemplate.capture`.
         """
         self._evaluator = eval
-        self._body = body
-        self._func_args = tuple() if args is None else args
+        self._template = template
+        self._captures = captures
 
-        assert all(map(lambda x: isinstance(x, Symbol), self._func_args))
+    def bind(self, args: Sequence[Any]) -> env.Frame:
+        """
+        Creates a frame for the call with `args`.
+        """
+        return self.frame(list(args))
 
-        self._def_env = eval._current_env
-        if eval._current_env.is_global:
-            self._def_env = None
+    def frame(self, values: List[Any]) -> env.Frame:
+        """
+        Creates a frame for the call with arguments in `values`.
+
+        The list becomes the storage of the frame, so it
+        is not copied. Arguments stay in the first slots,
+        the rest of the slots is appended to them and
+        the boxed slots get their `Box`es.
+        """
+        template = self._template
+        if template.arity != len(values):
+            raise EvaluationError(
+                f"number of call arguments doesn't match"
+                f" expected {template.arity} got {len(values)}"
+            )
+        values.extend(template.padding)
+        for slot in template.boxed:
+            values[slot] = env.Box(values[slot])
+        return env.Frame(values, self._captures)
 
     def __call__(self, *args: Any):
         """
@@ -51,44 +68,24 @@ class Lambda(BaseObject):
             `*args`:
                 Arguments to evaluate the body with.
 
-        Evaluation is done by firstly pushing captured definition
-        environment, then pushing environment created by
-        associating values passed to the call with
-        names provided during lambda definition; onto the
-        environment stack and then evaluating the lambdas body.
+        Evaluation is done by the evaluators `_call`, which
+        makes a frame created by `frame` current and evaluates
+        the lambdas body with it.
 
-        Environments are always popped from the stack even if
+        Previous frame is always restored even if
         exception happens during evaluation.
 
-        If lambda was used to define a top-level function then
-        it captures a global environment. In this case, on call,
-        only arguments environment is pushed onto the stack
-        as pushing a global one would create a reference cycle
-        for the environments.
+        This method is only used when lambda is called from
+        outside of the evaluator, for example by a builtin.
+        Evaluator itself handles calls in a loop so they don't
+        grow pythons stack in tail position.
         """
-        func_args = [x for x in self._func_args]
-        if len(func_args) != len(args):
-            raise EvaluationError(
-                f"number of call arguments doesn't match"
-                f" expected {len(func_args)} got {len(args)}"
-            )
-        env_init = dict(zip(func_args, args))
-        call_env = Env(env_init)
-        self._push_envs(call_env)
+        evaluator = self._evaluator
+        prev_frame = evaluator._current_frame
         try:
-            return self._evaluator.eval(self._body)
+            return evaluator._call(self, list(args))
         finally:
-            self._pop_envs()
-
-    def _push_envs(self, call_env: Env):
-        if self._def_env is not None:
-            self._evaluator.push_env(self._def_env)
-        self._evaluator.push_env(call_env)
-
-    def _pop_envs(self):
-        self._evaluator.pop_env()
-        if self._def_env is not None:
-            self._evaluator.pop_env()
+            evaluator._current_frame = prev_frame
 
     def __str__(self):
-        return f"(lambda {self._func_args} {self._body})"
+        return str(self._template)
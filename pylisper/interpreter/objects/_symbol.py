@@ -22,6 +22,8 @@ class Symbol(BaseObject):
     a new instance the old one is returned.
     """
 
+    __slots__ = ("value",)
+
     _existing_symbols = {}
 
     def __new__(cls, value: str, *args: Any, **kwargs: Any):
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from typing import Any, List
+
+from pylisper.interpreter.objects._base import BaseObject
+
+
+class Vector(BaseObject):
+    """
+    Fixed size array of values with constant time access.
+
+    Values are kept in a pythons `list` under the `items`
+    attribute. Vectors are written as `#(1 2 3)`.
+    """
+
+    __slots__ = ("items",)
+
+    def __init__(self, items: List[Any]):
+        """
+        Creates a vector.
+
+        Args/Kwargs:
+            `items`:
+                List of values, owned by the vector from now on.
+        """
+        self.items = items
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __str__(self):
+        body = " ".join(map(str, self.items))
+        return f"#({body})"
@@ -0,0 +1,315 @@
+"""
+Contains optimizer pass run on expressions resolved by the `Resolver`.
+
+Optimizer:
+    - folds calls of the pure builtins on constant arguments,
+    - removes `cond` arms that can never be taken and branches
+      of `if`, `when` and `unless` with a constant test,
+    - flattens nested `begin` forms,
+    - inlines `quote` of the self evaluating atoms.
+
+Builtins can be redefined with `define` and `set!` at any time,
+so a folded call is replaced by `Folded` which keeps the bindings
+the call depended on. Engines only use the folded value while
+those bindings still hold the same builtins and evaluate the
+original call otherwise. Only calls inside of lambda bodies,
+which reference builtins through `GlobalRef`, are folded as
+top level expressions are evaluated only once anyway.
+
+`#t` and `#f` are variables which can be redefined as well,
+so calls on them are folded with their bindings guarded the same
+way, while `cond` arms and branches are only removed for tests
+that are really constant (numbers and quoted atoms).
+
+Optimized lists get the location of the lists they were
+optimized from in the `SourceMap`, if one is given.
+"""
+import copy
+from typing import Any, Optional, Tuple
+
+import pylisper.interpreter.objects as obj
+import pylisper.interpreter.symbols as sym
+from pylisper.interpreter.env import Binding
+from pylisper.interpreter.exceptions import EvaluationError
+from pylisper.interpreter.resolver import GlobalRef, LambdaTemplate, Loop, Recur
+from pylisper.interpreter.std_env import STD_ENV
+from pylisper.locations import SourceMap
+
+PURE_BUILTINS = frozenset(
+    STD_ENV[name]
+    for name in (
+        sym.EQ_NUM,
+        sym.LT_NUM,
+        sym.GT_NUM,
+        sym.LE_NUM,
+        sym.GE_NUM,
+        sym.PLUS_NUM,
+        sym.MINUS_NUM,
+        sym.MUL_NUM,
+        sym.DIV_NUM,
+        sym.QUOTIENT,
+        sym.REMAINDER,
+        sym.MIN,
+        sym.MAX,
+        sym.EQ,
+        sym.NULL,
+        sym.ATOM,
+        sym.NOT,
+    )
+)
+"""
+Builtins without side effects which result depends only on their arguments.
+"""
+
+_IMMUTABLE = (int, float, obj.Symbol, type(None))
+
+_LITERALS = {sym.TRUE: True, sym.FALSE: False}
+
+_NOT_CONSTANT = object()
+
+
+class Folded(obj.BaseObject):
+    """
+    Result of a call folded at compile time.
+
+    `guards` is a tuple of `(Binding, value)` pairs, of the builtins
+    and the `#t` and `#f` arguments, the folded value is only valid
+    as long as every binding holds its value, otherwise `expr`,
+    the original call, has to be evaluated.
+    """
+
+    __slots__ = ("value", "guards", "expr")
+
+    def __init__(
+        self,
+        value: Any,
+        guards: Tuple[Tuple[Binding, Any], ...],
+        expr: obj.Cell,
+    ):
+        self.value = value
+        self.guards = guards
+        self.expr = expr
+
+    def holds(self) -> bool:
+        """
+        Checks if none of the folded bindings were redefined.
+        """
+        for binding, func in self.guards:
+            if binding.value is not func:
+                return False
+        return True
+
+    def __str__(self):
+        return str(self.expr)
+
+
+class Optimizer:
+    """
+    Optimizes resolved expressions.
+
+    Malformed special forms are left untouched
+    so engines can report them when evaluated.
+    """
+
+    def __init__(self, source_map: Optional[SourceMap] = None):
+        self.source_map = source_map
+        self._special_forms = {
+            sym.QUOTE: self._optimize_quote,
+            sym.COND: self._optimize_cond,
+            sym.BEGIN: self._optimize_begin,
+            sym.DEFINE: self._optimize_assignment,
+            sym.SET: self._optimize_assignment,
+            sym.LET: self._optimize_let,
+            sym.LET_STAR: self._optimize_let,
+            sym.LETREC: self._optimize_let,
+            sym.IF: self._optimize_if,
+            sym.WHEN: self._optimize_when,
+            sym.UNLESS: self._optimize_when,
+            sym.AND: self._optimize_operands,
+            sym.OR: self._optimize_operands,
+        }
+        # optimized copies of the loops being optimized,
+        # which their `Recur`s have to point to
+        self._loops = {}
+
+    def optimize(self, expr: obj.BaseObject) -> obj.BaseObject:
+        """
+        Returns optimized version of the resolved expression.
+
+        Expression itself is not modified.
+        """
+        if isinstance(expr, LambdaTemplate):
+            template = copy.copy(expr)
+            template.body = self.optimize(expr.body)
+            return template
+        if isinstance(expr, Loop):
+            loop = copy.copy(expr)
+            loop.inits = tuple(map(self.optimize, expr.inits))
+            self._loops[expr] = loop
+            loop.body = self.optimize(expr.body)
+            del self._loops[expr]
+            return loop
+        if isinstance(expr, Recur):
+            loop = self._loops.get(expr.loop, expr.loop)
+            return Recur(loop, list(map(self.optimize, expr.args)), expr.source)
+        if not isinstance(expr, obj.Cell):
+            return expr
+        head = expr.car
+        if isinstance(head, obj.Symbol) and head in self._special_forms:
+            res = self._special_forms[head](expr)
+        else:
+            items = [self.optimize(item) for item in expr]
+            call = _from_list(items)
+            folded = self._fold(items, call)
+            res = call if folded is None else folded
+            if self.source_map is not None:
+                self.source_map.copy(expr, call)
+        if self.source_map is not None:
+            self.source_map.copy(expr, res)
+        return res
+
+    def _fold(self, items, call: obj.Cell) -> Optional[Folded]:
+        func, *args = items
+        if not isinstance(func, GlobalRef) or func.binding.value not in PURE_BUILTINS:
+            return None
+        builtin = func.binding.value
+        guards = [(func.binding, builtin)]
+        values = []
+        for arg in args:
+            if isinstance(arg, Folded):
+                guards.extend(arg.guards)
+                values.append(arg.value)
+                continue
+            if isinstance(arg, GlobalRef) and arg.symbol in _LITERALS:
+                val = _LITERALS[arg.symbol]
+                if arg.binding.value is not val:
+                    return None
+                guards.append((arg.binding, val))
+                values.append(val)
+                continue
+            val = _constant(arg)
+            if val is _NOT_CONSTANT:
+                return None
+            values.append(val)
+        try:
+            res = builtin(*values)
+        except (EvaluationError, TypeError):
+            # left for the engine to report
+            return None
+        if not isinstance(res, _IMMUTABLE):
+            return None
+        return Folded(res, tuple(guards), call)
+
+    def _optimize_quote(self, node: obj.Cell):
+        try:
+            _, expr = node
+        except ValueError:
+            return node
+        if type(expr) is int:
+            return expr
+        return node
+
+    def _optimize_cond(self, node: obj.Cell):
+        head, *arms = node
+        optimized = []
+        for arm in arms:
+            try:
+                cond, expr = arm
+            except (ValueError, TypeError):
+                return node
+            optimized.append((self.optimize(cond), self.optimize(expr)))
+        reachable = []
+        for cond, expr in optimized:
+            val = _constant(cond)
+            if val is _NOT_CONSTANT:
+                reachable.append((cond, expr))
+            elif not val:
+                continue
+            elif not reachable:
+                return expr
+            else:
+                reachable.append((cond, expr))
+                break
+        if not reachable:
+            return _from_list([sym.QUOTE, None])
+        return _from_list([head] + [_from_list(arm) for arm in reachable])
+
+    def _optimize_begin(self, node: obj.Cell):
+        head, *exprs = node
+        if not exprs:
+            return node
+        flat = []
+        for expr in map(self.optimize, exprs):
+            if isinstance(expr, obj.Cell) and expr.car is sym.BEGIN and expr.cdr:
+                flat.extend(expr.cdr)
+            else:
+                flat.append(expr)
+        # values of all but the last expression are discarded
+        body = [e for e in flat[:-1] if _constant(e) is _NOT_CONSTANT] + flat[-1:]
+        if len(body) == 1:
+            return body[0]
+        return _from_list([head] + body)
+
+    def _optimize_if(self, node: obj.Cell):
+        head, test, *branches = node
+        test = self.optimize(test)
+        val = _constant(test)
+        if val is _NOT_CONSTANT:
+            return _from_list([head, test] + [self.optimize(e) for e in branches])
+        if val:
+            return self.optimize(branches[0])
+        if len(branches) == 1:
+            return _from_list([sym.QUOTE, None])
+        return self.optimize(branches[1])
+
+    def _optimize_when(self, node: obj.Cell):
+        head, test, *body = node
+        test = self.optimize(test)
+        val = _constant(test)
+        if val is _NOT_CONSTANT:
+            return _from_list([head, test] + [self.optimize(e) for e in body])
+        if bool(val) is (head is sym.WHEN):
+            return self.optimize(_from_list([sym.BEGIN] + body))
+        return _from_list([sym.QUOTE, None])
+
+    def _optimize_operands(self, node: obj.Cell):
+        head, *exprs = node
+        if len(exprs) == 1:
+            return self.optimize(exprs[0])
+        return _from_list([head] + [self.optimize(expr) for expr in exprs])
+
+    def _optimize_let(self, node: obj.Cell):
+        head, bindings, body = node
+        bindings = [_from_list([ref, self.optimize(expr)]) for ref, expr in bindings]
+        return _from_list([head, _from_list(bindings), self.optimize(body)])
+
+    def _optimize_assignment(self, node: obj.Cell):
+        try:
+            head, target, expr = node
+        except ValueError:
+            return node
+        return _from_list([head, target, self.optimize(expr)])
+
+
+def _constant(expr: obj.BaseObject) -> Any:
+    """
+    Returns value of the expression if it is known without
+    evaluating it or `_NOT_CONSTANT` otherwise.
+    """
+    if isinstance(expr, int):
+        return expr
+    if isinstance(expr, obj.Cell) and expr.car is sym.QUOTE:
+        try:
+            _, val = expr
+        except ValueError:
+            return _NOT_CONSTANT
+        if isinstance(val, (int, obj.Symbol)) or val is None:
+            return val
+    return _NOT_CONSTANT
+
+
+def _from_list(exprs) -> Optional[obj.Cell]:
+    cell = None
+    for expr in reversed(exprs):
+        cell = obj.Cell(expr, cell)
+    return cell
@@ -0,0 +1,223 @@
+"""
+Contains profiler measuring where the time of a program
+is spent in terms of its lambdas, rather than the internals
+of the evaluator pythons profilers would show.
+
+`ProfilingEvaluator` is a drop in replacement for the `Evaluator`
+(the `tree` engine) recording every call to a lambda into a `Profile`.
+Profiling is opt in, the plain `Evaluator` doesn't do any bookkeeping.
+
+Lambdas are reported under the name they were defined with,
+and the location of their lambda form if the source was read
+with a `SourceMap`. Calls in tail position replace the caller
+on the profiled stack, the same way they replace its frame.
+Lambdas called by builtin functions (for example by `map`)
+are recorded as called by the lambda calling the builtin.
+"""
+from __future__ import annotations
+
+import time
+from typing import Dict, List, Optional, Tuple
+
+import pylisper.interpreter.objects as obj
+from pylisper.interpreter.env import Env
+from pylisper.interpreter.evaluator import Evaluator, _ReuseStack
+from pylisper.interpreter.resolver import LambdaTemplate
+from pylisper.locations import SourceMap
+
+
+class FunctionStats:
+    """
+    Statistics of a single lambda.
+
+    `total` is time spent in the lambda including the calls it
+    made, counted once for recursive calls, and `own` excludes it.
+    """
+
+    __slots__ = ("calls", "total", "own")
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.own = 0.0
+
+
+class Profile:
+    """
+    Results of profiling.
+
+    Holds `FunctionStats` of every called lambda and the time
+    spent in each distinct stack of calls, which can be exported
+    in the collapsed stack format read by the flamegraph tools.
+    """
+
+    def __init__(self):
+        self.stats: Dict[LambdaTemplate, FunctionStats] = {}
+        # stacks are stored as a tree of (parent, template) nodes
+        # so entering a call doesn't copy the whole stack
+        self._nodes: List[Tuple[int, Optional[LambdaTemplate]]] = [(0, None)]
+        self._children: Dict[Tuple[int, LambdaTemplate], int] = {}
+        self._stack_time: Dict[int, float] = {}
+
+    def stats_of(self, template: LambdaTemplate) -> FunctionStats:
+        """
+        Returns stats of the lambda, creating them on the first call.
+        """
+        stats = self.stats.get(template)
+        if stats is None:
+            stats = self.stats[template] = FunctionStats()
+        return stats
+
+    def enter(self, parent: int, template: LambdaTemplate) -> int:
+        """
+        Returns id of the stack made of the `parent` stack
+        and the `template` called on top of it. `0` is the id
+        of an empty stack.
+        """
+        key = (parent, template)
+        node = self._children.get(key)
+        if node is None:
+            node = self._children[key] = len(self._nodes)
+            self._nodes.append(key)
+        return node
+
+    def add_time(self, stack: int, seconds: float):
+        """
+        Adds time spent on top of the `stack`.
+        """
+        self._stack_time[stack] = self._stack_time.get(stack, 0.0) + seconds
+
+    def stacks(self) -> Dict[Tuple[str, ...], float]:
+        """
+        Returns time spent in each stack, from the outermost call.
+        """
+        res = {}
+        for node, seconds in self._stack_time.items():
+            names = []
+            while node:
+                node, template = self._nodes[node]
+                names.append(label(template))
+            key = tuple(reversed(names))
+            res[key] = res.get(key, 0.0) + seconds
+        return res
+
+    def collapsed(self) -> str:
+        """
+        Returns stacks in the collapsed format, one stack per line
+        with frames separated by `;` followed by time in microseconds.
+        """
+        lines = []
+        for names, seconds in sorted(self.stacks().items()):
+            micros = round(seconds * 1_000_000)
+            if micros:
+                lines.append(f"{';'.join(names)} {micros}")
+        return "".join(f"{line}\n" for line in lines)
+
+    def report(self, limit: Optional[int] = None) -> str:
+        """
+        Returns flat report with a line per lambda,
+        sorted by the time spent in the lambda itself.
+        """
+        rows = sorted(self.stats.items(), key=lambda item: item[1].own, reverse=True)
+        lines = [f"{'calls':>10} {'total s':>10} {'own s':>10}  function"]
+        for template, stats in rows[:limit]:
+            line = (
+                f"{stats.calls:>10} {stats.total:>10.4f} {stats.own:>10.4f}"
+                f"  {label(template)}"
+            )
+            if template.location is not None:
+                line = f"{line} ({template.location})"
+            lines.append(line)
+        return "\n".join(lines)
+
+
+def label(template: LambdaTemplate) -> str:
+    """
+    Returns name lambda is reported under.
+    """
+    return "<lambda>" if template.name is None else template.name
+
+
+class ProfilingEvaluator(Evaluator):
+    """
+    `Evaluator` recording calls to lambdas into a `Profile`.
+    """
+
+    def __init__(
+        self,
+        env: Env,
+        optimize: bool = True,
+        source_map: Optional[SourceMap] = None,
+        profile: Optional[Profile] = None,
+    ):
+        """
+        Creates new profiling evaluator.
+
+        Args/Kwargs:
+            `env`:
+                Environment to initialize the Evaluator with.
+            `optimize`:
+                If `False` expressions are not optimized.
+            `source_map`:
+                Optional locations of the evaluated forms,
+                lambdas are reported with their location.
+            `profile`:
+                Profile to record calls into, a new one if `None`.
+        """
+        super().__init__(env, optimize, source_map)
+        self.profile = Profile() if profile is None else profile
+        # [template, stack id, start, time of the nested calls]
+        self._calls: List[list] = []
+        # calls made by the innermost `_eval` start above this index
+        self._base = 0
+        self._active: Dict[LambdaTemplate, int] = {}
+
+    def _eval(self, expr: obj.BaseObject):
+        return self._nested(super()._eval, expr)
+
+    def _call(self, func: obj.Lambda, args: list):
+        # called by a builtin, so never in tail position
+        return self._nested(super()._call, func, args)
+
+    def _nested(self, evaluate, *args):
+        """
+        Runs `evaluate` leaving the calls it entered when it returns.
+        """
+        calls = self._calls
+        base = self._base
+        self._base = len(calls)
+        try:
+            return evaluate(*args)
+        finally:
+            now = time.perf_counter()
+            while len(calls) > self._base:
+                self._leave(now)
+            self._base = base
+
+    def _apply(self, func, args):
+        res = super()._apply(func, args)
+        if not isinstance(res, _ReuseStack) or not isinstance(func, obj.Lambda):
+            return res
+        now = time.perf_counter()
+        calls = self._calls
+        if len(calls) > self._base:
+            # call in tail position replaces the caller
+            self._leave(now)
+        template = func._template
+        parent = calls[-1][1] if calls else 0
+        calls.append([template, self.profile.enter(parent, template), now, 0.0])
+        self._active[template] = self._active.get(template, 0) + 1
+        self.profile.stats_of(template).calls += 1
+        return res
+
+    def _leave(self, now: float):
+        template, stack, start, nested = self._calls.pop()
+        elapsed = now - start
+        stats = self.profile.stats_of(template)
+        stats.own += elapsed - nested
+        self.profile.add_time(stack, elapsed - nested)
+        self._active[template] -= 1
+        if not self._active[template]:
+            stats.total += elapsed
+        if self._calls:
+            self._calls[-1][3] += elapsed
@@ -0,0 +1,789 @@
+"""
+Contains resolver pass computing lexical addresses of
+the variables referenced inside of lambda bodies.
+
+Macros are expanded (see `Expander`) before resolving.
+
+Resolved expressions are the same objects the `ObjectCompiler`
+produces with variable references replaced by:
+    - `LocalRef`, slot of a lambdas local variable in its frame,
+    - `CapturedRef`, index of a variable of the enclosing lambdas
+      in the captures of the closure,
+    - `GlobalRef`, direct reference to the global variables `Binding`,
+and valid lambda forms replaced by `LambdaTemplate`.
+
+Variables bound by `let`, `let*`, `letrec`, named `let` and `do`
+get slots of their own in the frame of the enclosing lambda, so
+binding them allocates neither a closure nor a frame. Ones bound
+at the top level, where there is no frame, are resolved inside
+of a lambda called right away. A named `let` that calls itself
+only in tail position, and every `do` form, is resolved into
+a `Loop` which `Recur` rebinds the variables of and evaluates
+again, any other named `let` is bound to a lambda.
+
+Closures capture only the free variables of their body, as a flat
+tuple. Variables that are both captured and assigned (with `define`
+or `set!`) are kept in a `Box` shared by the frame and the closures,
+any other variable is captured by value.
+
+Resolved lists get the location of the lists they were resolved
+from in the `SourceMap`, if the resolver was given one, and lambda
+templates keep the location of their lambda form.
+
+Vector and hash table literals are wrapped in `quote` and
+`set!` used with `vector-ref`, `hash-ref` or `array-ref` is
+rewritten into a call to the matching setter function,
+so engines don't have to know about them.
+"""
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence, Set, Tuple, Union
+
+import pylisper.interpreter.objects as obj
+import pylisper.interpreter.symbols as sym
+from pylisper.interpreter.env import UNBOUND, Binding, Box, Env, Frame
+from pylisper.interpreter.exceptions import InvalidFormError
+from pylisper.interpreter.expander import Expander
+from pylisper.locations import Location, SourceMap
+from pylisper.printer import to_str
+
+
+class LocalRef(obj.BaseObject):
+    """
+    Reference to a local variable.
+
+    `slot` is an index of the variable in the current frame.
+    If `boxed` is `True` the slot holds a `Box` with the value.
+    """
+
+    __slots__ = ("symbol", "slot", "boxed")
+
+    def __init__(self, symbol: obj.Symbol, slot: int):
+        self.symbol = symbol
+        self.slot = slot
+        self.boxed = False
+
+    def load(self, frame: Frame):
+        """
+        Returns value of the variable, possibly `UNBOUND`.
+        """
+        val = frame.values[self.slot]
+        return val.value if self.boxed else val
+
+    def store(self, frame: Frame, val):
+        """
+        Sets value of the variable.
+        """
+        if self.boxed:
+            frame.values[self.slot].value = val
+        else:
+            frame.values[self.slot] = val
+
+    def bind(self, frame: Frame, val):
+        """
+        Initializes the variable, boxed ones get a new `Box`
+        so closures created before keep the previous one.
+        """
+        frame.values[self.slot] = Box(val) if self.boxed else val
+
+    def capture(self, frame: Frame):
+        """
+        Returns what closures capture, that is the `Box` itself
+        for the boxed variables and the value for the others.
+        """
+        return frame.values[self.slot]
+
+    def __str__(self):
+        return str(self.symbol)
+
+
+class CapturedRef(obj.BaseObject):
+    """
+    Reference to a variable of one of the enclosing lambdas.
+
+    `index` is an index of the variable in the captures
+    of the current frame. If `boxed` is `True` the captured
+    value is a `Box` with the value.
+    """
+
+    __slots__ = ("symbol", "index", "boxed")
+
+    def __init__(self, symbol: obj.Symbol, index: int):
+        self.symbol = symbol
+        self.index = index
+        self.boxed = False
+
+    def load(self, frame: Frame):
+        """
+        Returns value of the variable, possibly `UNBOUND`.
+        """
+        val = frame.captures[self.index]
+        return val.value if self.boxed else val
+
+    def store(self, frame: Frame, val):
+        """
+        Sets value of the variable, which has to be boxed.
+        """
+        frame.captures[self.index].value = val
+
+    def capture(self, frame: Frame):
+        """
+        Same as `LocalRef.capture`.
+        """
+        return frame.captures[self.index]
+
+    def __str__(self):
+        return str(self.symbol)
+
+
+class GlobalRef(obj.BaseObject):
+    """
+    Reference to a global variable holding its `Binding`.
+    """
+
+    __slots__ = ("binding",)
+
+    def __init__(self, binding: Binding):
+        self.binding = binding
+
+    @property
+    def symbol(self) -> obj.Symbol:
+        return self.binding.symbol
+
+    def __str__(self):
+        return str(self.binding.symbol)
+
+
+class LambdaTemplate(obj.BaseObject):
+    """
+    Resolved lambda form.
+
+    Contains everything that is needed to create
+    a function out of it, that is parameters, local
+    variables which determine the size of the frame
+    to allocate on call and resolved body.
+
+    `captures` are references to the free variables of the body
+    in the frame the lambda is created in, see `capture`, and
+    `boxed` are slots of the frame that have to hold a `Box`.
+    `arity` and `padding`, the values of the slots following
+    the parameters, are computed once so calls only check
+    the number of arguments and extend them to a frame.
+    """
+
+    def __init__(
+        self,
+        params: Sequence[obj.Symbol],
+        locals: Sequence[obj.Symbol],
+        body: obj.BaseObject,
+        source: obj.Cell,
+        name: Optional[str] = None,
+    ):
+        """
+        Creates lambda template.
+
+        Args/Kwargs:
+            `params`:
+                Lambdas parameters, bound to the first slots of the frame.
+            `locals`:
+                Every variable local to the lambda ordered by slot,
+                parameters included.
+            `body`:
+                Resolved body.
+            `source`:
+                Lambda form the template was resolved from.
+            `name`:
+                Optional name the lambda was defined with.
+        """
+        self.params = tuple(params)
+        self.arity = len(self.params)
+        self.locals = tuple(locals)
+        self.size = len(self.locals)
+        self.padding = (UNBOUND,) * (self.size - self.arity)
+        self.body = body
+        self.source = source
+        self.name = name
+        self.captures: Tuple[Union[LocalRef, CapturedRef], ...] = ()
+        self.boxed: Tuple[int, ...] = ()
+        self.location: Optional[Location] = None
+
+    def capture(self, frame: Optional[Frame]) -> tuple:
+        """
+        Returns captures of a closure created in the `frame`.
+        """
+        return tuple([ref.capture(frame) for ref in self.captures])
+
+    def __str__(self):
+        return to_str(self.source)
+
+
+class Loop(obj.BaseObject):
+    """
+    Resolved named `let` or `do` form evaluated as a loop.
+
+    Loop variables, referenced by `refs`, are bound to the values
+    of `inits` and the `body` is evaluated in the same frame.
+    Every `Recur` in the body rebinds them and evaluates the body
+    again, which can only happen in tail position of the body.
+    """
+
+    def __init__(
+        self,
+        refs: Sequence[LocalRef],
+        inits: Sequence[obj.BaseObject],
+        source: obj.Cell,
+    ):
+        self.refs = tuple(refs)
+        self.inits = tuple(inits)
+        self.body: obj.BaseObject = None
+        self.source = source
+
+    def __str__(self):
+        return to_str(self.source)
+
+
+class Recur(obj.BaseObject):
+    """
+    Call of the enclosing `Loop` with the new values
+    of its variables, evaluated before any is rebound.
+    """
+
+    __slots__ = ("loop", "args", "source")
+
+    def __init__(self, loop: Loop, args: Sequence[obj.BaseObject], source: obj.Cell):
+        self.loop = loop
+        self.args = tuple(args)
+        self.source = source
+
+    def __str__(self):
+        return to_str(self.source)
+
+
+class _Scope:
+    """
+    Variables local to a single lambda as well as
+    the variables of enclosing lambdas it captures.
+    """
+
+    def __init__(self, params: Sequence[obj.Symbol]):
+        # slots of the variables visible at the moment,
+        # `let` forms shadow them with new slots
+        self.slots: Dict[obj.Symbol, int] = {}
+        self.locals: List[obj.Symbol] = []
+        # every reference to the local variables by slot, including
+        # the ones from nested lambdas, so they can be boxed
+        self.refs: List[list] = []
+        self.assigned: Set[int] = set()
+        self.captured: Set[int] = set()
+        # slots initialized by the `let` forms rather than on call
+        self.bound: Set[int] = set()
+        self.captures: Dict[Tuple[int, int], int] = {}
+        self.capture_sources: List[Union[LocalRef, CapturedRef]] = []
+        for param in params:
+            self.add(param)
+
+    def add(self, name: obj.Symbol):
+        if name not in self.slots:
+            self.slots[name] = self._new_slot(name)
+
+    def bind(self, names: Sequence[obj.Symbol]) -> Dict[obj.Symbol, Optional[int]]:
+        """
+        Gives the names new slots, initialized by a `let` form,
+        and returns the slots they had to restore with `unbind`.
+        """
+        saved = {}
+        for name in names:
+            saved.setdefault(name, self.slots.get(name))
+            self.slots[name] = self._new_slot(name)
+            self.bound.add(self.slots[name])
+        return saved
+
+    def unbind(self, saved: Dict[obj.Symbol, Optional[int]]):
+        for name, slot in saved.items():
+            if slot is None:
+                del self.slots[name]
+            else:
+                self.slots[name] = slot
+
+    def _new_slot(self, name: obj.Symbol) -> int:
+        self.locals.append(name)
+        self.refs.append([])
+        return len(self.locals) - 1
+
+    def local(self, name: obj.Symbol) -> LocalRef:
+        ref = LocalRef(name, self.slots[name])
+        self.refs[ref.slot].append(ref)
+        return ref
+
+    def capture(self, key: Tuple[int, int], source) -> int:
+        index = self.captures.get(key)
+        if index is None:
+            index = self.captures[key] = len(self.capture_sources)
+            self.capture_sources.append(source)
+        return index
+
+    def box(self) -> Tuple[int, ...]:
+        """
+        Marks references to the variables that are both captured
+        and assigned as boxed and returns their slots, except for
+        the ones `let` forms put a new `Box` into themselves.
+        """
+        boxed = self.captured & self.assigned
+        for slot in boxed:
+            for ref in self.refs[slot]:
+                ref.boxed = True
+        return tuple(sorted(boxed - self.bound))
+
+
+class Resolver:
+    """
+    Resolves variable references inside of lambda bodies.
+
+    Parameters of a lambda and every variable created
+    with `define` inside of its body (but not in the nested
+    lambdas) are local to the lambda and get a slot in its frame.
+    Variables local to the enclosing lambdas are captured
+    by the closure (see `LambdaTemplate.captures`).
+    Any other reference inside of a lambda is considered global
+    and is bound directly to its `Binding` in the environment
+    the resolver was created with.
+
+    References at the top level are left as they are,
+    as they are only evaluated once.
+
+    Malformed `define`, `set!`, `quote`, `cond` and `begin` forms
+    are left untouched so engines can report them when evaluated,
+    any other malformed special form is rejected by the resolver.
+    """
+
+    def __init__(self, env: Env, source_map: Optional[SourceMap] = None):
+        """
+        Creates new resolver.
+
+        Args/Kwargs:
+            `env`:
+                Global environment to bind global references to.
+            `source_map`:
+                Optional locations of the resolved forms.
+        """
+        self._env = env
+        self.source_map = source_map
+        self._expander = Expander(source_map)
+        # names of the loops (see `Loop`) in scope
+        self._loops: Dict[obj.Symbol, Loop] = {}
+        self._special_forms = {
+            sym.DEFINE: self._resolve_define,
+            sym.QUOTE: self._resolve_quote,
+            sym.COND: self._resolve_cond,
+            sym.LAMBDA: self._resolve_lambda,
+            sym.SET: self._resolve_set,
+            sym.BEGIN: self._resolve_operands,
+            sym.AND: self._resolve_operands,
+            sym.OR: self._resolve_operands,
+            sym.IF: self._resolve_if,
+            sym.WHEN: self._resolve_when,
+            sym.UNLESS: self._resolve_when,
+            sym.LET: self._resolve_let,
+            sym.LET_STAR: self._resolve_let,
+            sym.LETREC: self._resolve_let,
+            sym.DO: self._resolve_do,
+        }
+
+    def resolve(self, expr: obj.BaseObject) -> obj.BaseObject:
+        """
+        Expands macros of the top level expression and resolves it.
+
+        Args/Kwargs:
+            `expr`:
+                Expression to resolve.
+
+        Raises:
+            `InvalidFormError`:
+                In case of a malformed special form, see the class
+                documentation, or a macro.
+        """
+        self._loops = {}
+        return self._resolve(self._expander.expand(expr), [])
+
+    def _resolve(self, expr: obj.BaseObject, scopes: List[_Scope]):
+        if isinstance(expr, obj.Symbol):
+            return self._resolve_symbol(expr, scopes)
+        if isinstance(expr, obj.Cell):
+            head = expr.car
+            if isinstance(head, obj.Symbol) and head in self._loops:
+                res = self._resolve_recur(expr, self._loops[head], scopes)
+            elif isinstance(head, obj.Symbol) and head in self._special_forms:
+                res = self._special_forms[head](expr, scopes)
+            else:
+                res = _from_list([self._resolve(e, scopes) for e in expr])
+            if self.source_map is not None:
+                self.source_map.copy(expr, res)
+            return res
+        if isinstance(expr, (obj.Vector, obj.HashTable)):
+            return _from_list([sym.QUOTE, expr])
+        return expr
+
+    def _resolve_symbol(self, symbol: obj.Symbol, scopes: List[_Scope]):
+        if not scopes:
+            return symbol
+        owner = _owner(symbol, scopes)
+        if owner is None:
+            return GlobalRef(self._env.binding(symbol))
+        ref = scopes[owner].local(symbol)
+        inner = scopes[owner + 1 :]
+        if inner:
+            scopes[owner].captured.add(ref.slot)
+        # every lambda between the owner and the current one
+        # captures the variable to pass it down
+        key = (owner, ref.slot)
+        for scope in inner:
+            ref = CapturedRef(symbol, scope.capture(key, ref))
+            scopes[owner].refs[key[1]].append(ref)
+        return ref
+
+    def _resolve_lambda(self, node: obj.Cell, scopes: List[_Scope], name=None):
+        try:
+            _, args, body = node
+        except ValueError:
+            raise InvalidFormError(
+                "lambda form should consist of arguments and a function body"
+            )
+        if args is not None:
+            if not isinstance(args, obj.Cell):
+                raise InvalidFormError("lambdas arguments should be a list")
+            for arg in args:
+                if not isinstance(arg, obj.Symbol):
+                    raise InvalidFormError("lambda form arguments should be symbols")
+        params = () if args is None else tuple(args)
+        scope = _Scope(params)
+        _collect_defines(body, scope)
+        body = self._resolve(body, scopes + [scope])
+        template = LambdaTemplate(params, scope.locals, body, node, name)
+        template.captures = tuple(scope.capture_sources)
+        template.boxed = scope.box()
+        if self.source_map is not None:
+            template.location = self.source_map.get(node)
+        return template
+
+    def _resolve_define(self, node: obj.Cell, scopes: List[_Scope]):
+        try:
+            head, name, expr = node
+        except ValueError:
+            return node
+        if not isinstance(name, obj.Symbol):
+            return node
+        expr = self._resolve_value(name, expr, scopes)
+        if scopes:
+            name = scopes[-1].local(name)
+            scopes[-1].assigned.add(name.slot)
+        return _from_list([head, name, expr])
+
+    def _resolve_value(self, name: obj.Symbol, expr, scopes: List[_Scope]):
+        """
+        Resolves expression assigned to the `name`,
+        lambdas are named after the variable.
+        """
+        if isinstance(expr, obj.Cell) and expr.car is sym.LAMBDA:
+            return self._resolve_lambda(expr, scopes, name=str(name))
+        return self._resolve(expr, scopes)
+
+    def _resolve_set(self, node: obj.Cell, scopes: List[_Scope]):
+        try:
+            head, ref, expr = node
+        except ValueError:
+            return node
+        if isinstance(ref, obj.Symbol):
+            owner = _owner(ref, scopes)
+            if owner is not None:
+                scopes[owner].assigned.add(scopes[owner].slots[ref])
+            ref = self._resolve_symbol(ref, scopes)
+        elif isinstance(ref, obj.Cell) and ref.car is sym.CAR:
+            car, *exprs = ref
+            ref = _from_list([car] + [self._resolve(e, scopes) for e in exprs])
+        elif isinstance(ref, obj.Cell) and ref.car in _SETTERS:
+            _, *args = ref
+            setter = _SETTERS[ref.car]
+            return self._resolve(_from_list([setter, *args, expr]), scopes)
+        else:
+            return node
+        return _from_list([head, ref, self._resolve(expr, scopes)])
+
+    def _resolve_cond(self, node: obj.Cell, scopes: List[_Scope]):
+        head, *arms = node
+        resolved = []
+        for arm in arms:
+            if isinstance(arm, obj.Cell):
+                arm = _from_list([self._resolve(e, scopes) for e in arm])
+            resolved.append(arm)
+        return _from_list([head] + resolved)
+
+    def _resolve_quote(self, node: obj.Cell, scopes: List[_Scope]):
+        return node
+
+    def _resolve_operands(self, node: obj.Cell, scopes: List[_Scope]):
+        head, *exprs = node
+        return _from_list([head] + [self._resolve(e, scopes) for e in exprs])
+
+    def _resolve_if(self, node: obj.Cell, scopes: List[_Scope]):
+        _, *exprs = node
+        if len(exprs) not in (2, 3):
+            raise InvalidFormError(
+                "if form should consist of a test, an expression evaluated"
+                " if it's true and an optional one evaluated otherwise"
+            )
+        return self._resolve_operands(node, scopes)
+
+    def _resolve_when(self, node: obj.Cell, scopes: List[_Scope]):
+        head, *exprs = node
+        if len(exprs) < 2:
+            raise InvalidFormError(
+                f"{head} form should consist of a test"
+                " followed by at least one expression"
+            )
+        return self._resolve_operands(node, scopes)
+
+    def _resolve_let(self, node: obj.Cell, scopes: List[_Scope]):
+        if not scopes:
+            # there is no frame to bind variables in, so the form
+            # is evaluated in the body of a lambda called right away
+            call = _from_list([_from_list([sym.LAMBDA, None, node])])
+            if self.source_map is not None:
+                self.source_map.copy(node, call)
+            return self._resolve(call, scopes)
+        head, *rest = node
+        if head is sym.LET and len(rest) == 3 and isinstance(rest[0], obj.Symbol):
+            name, bindings, body = rest
+            names, inits = _bindings(head, bindings)
+            return self._resolve_named_let(node, name, names, inits, body, scopes)
+        if len(rest) != 2:
+            raise InvalidFormError(
+                f"{head} form should consist of a list of bindings and a body"
+            )
+        bindings, body = rest
+        names, inits = _bindings(head, bindings)
+        if not names:
+            return self._resolve(body, scopes)
+        scope = scopes[-1]
+        if head is sym.LET_STAR:
+            saved, refs, resolved = {}, [], []
+            for name, init in zip(names, inits):
+                resolved.append(self._resolve_value(name, init, scopes))
+                for shadowed, slot in scope.bind([name]).items():
+                    saved.setdefault(shadowed, slot)
+                refs.append(scope.local(name))
+        elif head is sym.LETREC:
+            saved = scope.bind(names)
+            refs = [scope.local(name) for name in names]
+            scope.assigned.update(ref.slot for ref in refs)
+            resolved = [self._resolve_value(n, i, scopes) for n, i in zip(names, inits)]
+        else:
+            resolved = [self._resolve_value(n, i, scopes) for n, i in zip(names, inits)]
+            saved = scope.bind(names)
+            refs = [scope.local(name) for name in names]
+        body = self._resolve(body, scopes)
+        scope.unbind(saved)
+        bindings = [_from_list([ref, init]) for ref, init in zip(refs, resolved)]
+        return _from_list([head, _from_list(bindings), body])
+
+    def _resolve_named_let(
+        self,
+        node: obj.Cell,
+        name: obj.Symbol,
+        names: List[obj.Symbol],
+        inits: List[obj.BaseObject],
+        body: obj.BaseObject,
+        scopes: List[_Scope],
+    ):
+        defines = _Scope(())
+        _collect_defines(body, defines)
+        # a loop reuses slots of the variables, defined ones
+        # included, which would be shared by closures of
+        # different iterations
+        looping = _tail_calls_only(name, len(names), body)
+        if name in names or defines.slots or not looping:
+            func = _from_list([sym.LAMBDA, _from_list(names), body])
+            bindings = _from_list([_from_list([name, func])])
+            call = _from_list([_from_list([sym.LETREC, bindings, name])] + inits)
+            if self.source_map is not None:
+                self.source_map.copy(node, call)
+            shadowed = self._loops.pop(name, None)
+            res = self._resolve(call, scopes)
+            if shadowed is not None:
+                self._loops[name] = shadowed
+            return res
+        resolved = [self._resolve(init, scopes) for init in inits]
+        scope = scopes[-1]
+        saved = scope.bind(names)
+        loop = Loop([scope.local(n) for n in names], resolved, node)
+        outer = self._loops.get(name)
+        self._loops[name] = loop
+        loop.body = self._resolve(body, scopes)
+        if outer is None:
+            del self._loops[name]
+        else:
+            self._loops[name] = outer
+        scope.unbind(saved)
+        return loop
+
+    def _resolve_recur(self, node: obj.Cell, loop: Loop, scopes: List[_Scope]):
+        _, *args = node
+        return Recur(loop, [self._resolve(arg, scopes) for arg in args], node)
+
+    def _resolve_do(self, node: obj.Cell, scopes: List[_Scope]):
+        err = InvalidFormError(
+            "do form should consist of a list of (variable init [step]) bindings,"
+            " a list of a test followed by the result expressions and a body"
+        )
+        try:
+            _, variables, (test, *results), *body = node
+        except (ValueError, TypeError):
+            raise err
+        if variables is not None and not isinstance(variables, obj.Cell):
+            raise err
+        bindings, steps = [], []
+        for var in variables or ():
+            try:
+                name, init, *step = var
+            except (ValueError, TypeError):
+                raise err
+            if len(step) > 1:
+                raise err
+            bindings.append(_from_list([name, init]))
+            steps.append(step[0] if step else name)
+        if results:
+            result = _from_list([sym.BEGIN] + results)
+        else:
+            result = _from_list([sym.QUOTE, None])
+        again = _from_list([sym.BEGIN] + body + [_from_list([_DO_LOOP] + steps)])
+        arms = [_from_list([test, result]), _from_list([sym.TRUE, again])]
+        loop = _from_list(
+            [sym.LET, _DO_LOOP, _from_list(bindings), _from_list([sym.COND] + arms)]
+        )
+        if self.source_map is not None:
+            self.source_map.copy(node, loop)
+        return self._resolve(loop, scopes)
+
+
+_DO_LOOP = obj.Symbol("do loop")
+"""
+Name of the named `let` loops `do` forms are rewritten to,
+it can't be read so it doesn't clash with any variable.
+"""
+
+_SETTERS = {
+    sym.VECTOR_REF: sym.VECTOR_SET,
+    sym.HASH_REF: sym.HASH_SET,
+    sym.ARRAY_REF: sym.ARRAY_SET,
+}
+"""
+Accessors which can be used as a `set!` target
+mapped to the functions setting their value.
+"""
+
+
+def _collect_defines(expr: obj.BaseObject, scope: _Scope):
+    """
+    Adds every symbol defined inside of `expr`
+    to the `scope` skipping quoted expressions
+    and nested lambdas.
+    """
+    if not isinstance(expr, obj.Cell):
+        return
+    head = expr.car
+    if head is sym.QUOTE or head is sym.LAMBDA:
+        return
+    if head is sym.DEFINE:
+        try:
+            _, name, _ = expr
+        except ValueError:
+            return
+        if isinstance(name, obj.Symbol):
+            scope.add(name)
+            scope.assigned.add(scope.slots[name])
+    for sub in expr:
+        _collect_defines(sub, scope)
+
+
+def _bindings(
+    head: obj.Symbol, bindings: obj.BaseObject
+) -> Tuple[List[obj.Symbol], List[obj.BaseObject]]:
+    """
+    Returns names and initial values of the `let` forms bindings.
+    """
+    err = InvalidFormError(
+        f"{head} bindings should be a list of (variable value) lists"
+    )
+    if bindings is not None and not isinstance(bindings, obj.Cell):
+        raise err
+    names, inits = [], []
+    for binding in bindings or ():
+        try:
+            name, init = binding
+        except (ValueError, TypeError):
+            raise err
+        if not isinstance(name, obj.Symbol):
+            raise err
+        names.append(name)
+        inits.append(init)
+    if head is not sym.LET_STAR and len(set(names)) != len(names):
+        raise InvalidFormError(f"variables bound by {head} should be distinct")
+    return names, inits
+
+
+_LETS = (sym.LET, sym.LET_STAR, sym.LETREC)
+
+
+def _tail_calls_only(name: obj.Symbol, arity: int, expr, tail: bool = True) -> bool:
+    """
+    Checks if `expr` uses `name` only to call it with `arity`
+    arguments in tail position. Forms binding the `name` again,
+    including lambdas, are considered to use it otherwise.
+    """
+
+    def check(sub, tail=False):
+        return _tail_calls_only(name, arity, sub, tail)
+
+    if expr is name:
+        return False
+    if not isinstance(expr, obj.Cell) or expr.car is sym.QUOTE:
+        return True
+    head, *rest = expr
+    if head is name:
+        return tail and len(rest) == arity and all(map(check, rest))
+    if head in (sym.BEGIN, sym.AND, sym.OR) and rest:
+        return all(map(check, rest[:-1])) and check(rest[-1], tail)
+    if head is sym.IF and len(rest) in (2, 3):
+        return check(rest[0]) and all(check(sub, tail) for sub in rest[1:])
+    if head in (sym.WHEN, sym.UNLESS) and len(rest) > 1:
+        body = rest[1:]
+        return check(rest[0]) and all(map(check, body[:-1])) and check(body[-1], tail)
+    if head is sym.COND:
+        for arm in rest:
+            items = list(arm) if isinstance(arm, obj.Cell) else []
+            if len(items) == 2:
+                if not (check(items[0]) and check(items[1], tail)):
+                    return False
+            elif not check(arm):
+                return False
+        return True
+    if head in _LETS and len(rest) == 2 and not isinstance(rest[0], obj.Symbol):
+        bindings, body = rest
+        return check(bindings) and check(body, tail)
+    return all(map(check, expr))
+
+
+def _owner(symbol: obj.Symbol, scopes: List[_Scope]) -> Optional[int]:
+    """
+    Returns index of the innermost scope the symbol is local to.
+    """
+    for i in reversed(range(len(scopes))):
+        if symbol in scopes[i].slots:
+            return i
+    return None
+
+
+def _from_list(exprs: List[obj.BaseObject]) -> Optional[obj.Cell]:
+    cell = None
+    for expr in reversed(exprs):
+        cell = obj.Cell.cons(expr, cell)
+    return cell
@@ -0,0 +1,578 @@
+"""
+Contains evaluator that doesn't use pythons stack
+to keep track of the pending work.
+
+Instead of recursing into subexpressions evaluator keeps
+an explicit stack of continuations (in the spirit of
+the CEK machine) on the heap, so the depth of the evaluated
+recursion is only limited by the available memory.
+"""
+from __future__ import annotations
+
+from typing import Any, List, Optional, Sequence
+
+import pylisper.interpreter.objects as obj
+import pylisper.interpreter.symbols as sym
+from pylisper.interpreter.env import UNBOUND, Env, Frame
+from pylisper.interpreter.exceptions import (EvalTypeError, EvaluationError,
+                                             InvalidFormError, LogicError)
+from pylisper.interpreter.optimizer import Folded, Optimizer
+from pylisper.interpreter.resolver import (CapturedRef, GlobalRef,
+                                           LambdaTemplate, LocalRef, Loop,
+                                           Recur, Resolver)
+from pylisper.locations import SourceMap
+
+
+class StacklessEvaluator:
+    """
+    Evaluator keeping its pending work on the heap.
+
+    Can be used as a drop in replacement for the `Evaluator`.
+    Each step either produces a value, which is then passed
+    to the continuation on top of the stack, or an expression
+    to evaluate next (see `_Next`). Lambdas created by this
+    evaluator are only called recursively when called from
+    outside of it, for example by a builtin.
+    """
+
+    def __init__(
+        self,
+        env: Env,
+        optimize: bool = True,
+        source_map: Optional[SourceMap] = None,
+    ):
+        """
+        Create new StacklessEvaluator.
+
+        Args/Kwargs:
+            `env`:
+                Environment to initialize the evaluator with.
+            `optimize`:
+                If `False` expressions are not passed through the `Optimizer`.
+            `source_map`:
+                Optional locations of the evaluated forms,
+                used to set `location` of the raised errors.
+        """
+        self._env = env
+        self._current_frame = None
+        self._source_map = source_map
+        self._resolver = Resolver(env, source_map)
+        self._optimizer = Optimizer(source_map) if optimize else None
+        self._special_forms = {
+            sym.DEFINE: self._eval_define,
+            sym.QUOTE: self._eval_quote,
+            sym.COND: self._eval_cond,
+            sym.SET: self._eval_set,
+            sym.BEGIN: self._eval_begin,
+            sym.LET: self._eval_let,
+            sym.LET_STAR: self._eval_let,
+            sym.LETREC: self._eval_letrec,
+            sym.IF: self._eval_if,
+            sym.WHEN: self._eval_when,
+            sym.UNLESS: self._eval_when,
+            sym.AND: self._eval_and_or,
+            sym.OR: self._eval_and_or,
+        }
+
+    def eval(self, expr: obj.BaseObject):
+        """
+        Evaluate given expression with the environment
+        passed during object creation.
+
+        Args/Kwargs:
+            `expr`:
+                Expression to evaluate.
+
+        Raises:
+            `EvaluationError`:
+                In case of error during evaluation.
+        """
+        try:
+            resolved = self._resolver.resolve(expr)
+            if self._optimizer is not None:
+                resolved = self._optimizer.optimize(resolved)
+            return self._eval(resolved)
+        except EvaluationError as e:
+            if e.location is None and self._source_map is not None:
+                e.location = self._source_map.get(expr)
+            raise
+
+    def _eval(self, expr: obj.BaseObject):
+        frame = self._current_frame
+        konts: List[_Kont] = []
+        try:
+            while True:
+                res = self._step(expr, konts)
+                while not isinstance(res, _Next):
+                    if not konts:
+                        return res
+                    kont = konts.pop()
+                    self._current_frame = kont.frame
+                    res = kont.resume(self, res, konts)
+                expr = res.expr
+        finally:
+            self._current_frame = frame
+
+    def _step(self, expr: obj.BaseObject, konts: List[_Kont]):
+        if isinstance(expr, (LocalRef, CapturedRef)):
+            res = expr.load(self._current_frame)
+            if res is UNBOUND:
+                raise EvaluationError(f"Undefinied symbol {expr.symbol}")
+            return res
+        if isinstance(expr, GlobalRef):
+            res = expr.binding.value
+            if res is UNBOUND:
+                raise EvaluationError(f"Undefinied symbol {expr.symbol}")
+            return res
+        if isinstance(expr, int):
+            return expr
+        if isinstance(expr, obj.Symbol):
+            env = self._env.lookup(expr)
+            if env is None:
+                raise EvaluationError(f"Undefinied symbol {expr}")
+            return env[expr]
+        if isinstance(expr, LambdaTemplate):
+            return obj.Lambda(self, expr, expr.capture(self._current_frame))
+        if isinstance(expr, Folded):
+            return expr.value if expr.holds() else _Next(expr.expr)
+        if isinstance(expr, Recur):
+            if not expr.args:
+                return _Next(expr.loop.body)
+            konts.append(_RecurKont(self._current_frame, expr))
+            return _Next(expr.args[0])
+        if isinstance(expr, Loop):
+            kont = _LetKont(self._current_frame, expr.refs, expr.inits, expr.body)
+            return kont.start(konts)
+        if expr is None:
+            raise LogicError("Cannot evaluate an empty list")
+        func = expr.car
+        if isinstance(func, obj.Symbol) and func in self._special_forms:
+            return self._special_forms[func](expr, konts)
+        kont = _CallKont(self._current_frame, expr.cdr)
+        if isinstance(func, _ATOMS):
+            return kont.resume(self, self._step(func, konts), konts)
+        konts.append(kont)
+        return _Next(func)
+
+    def _apply(self, func: Any, args: List[Any]):
+        if isinstance(func, obj.Lambda) and func._evaluator is self:
+            self._current_frame = func.frame(args)
+            return _Next(func._template.body)
+        if not callable(func):
+            raise InvalidFormError(
+                "First value of an unquoted list should be a function"
+            )
+        return func(*args)
+
+    def _call(self, func: obj.Lambda, args: List[Any]):
+        """
+        Evaluates call to a lambda of this evaluator made
+        from outside of it, see `Lambda.__call__`.
+        """
+        return self._eval(self._apply(func, args).expr)
+
+    def _eval_cond(self, node: obj.Cell, konts: List[_Kont]):
+        _, *arms = node
+        return _CondKont(self._current_frame, arms).next_arm(konts)
+
+    def _eval_quote(self, node: obj.Cell, konts: List[_Kont]):
+        try:
+            _, expr = node
+        except ValueError:
+            raise InvalidFormError(
+                "quote form should consist of a single argument"
+                " which is a value to be quoted"
+            )
+        return expr
+
+    def _eval_define(self, node: obj.Cell, konts: List[_Kont]):
+        try:
+            _, target, expr = node
+        except ValueError:
+            raise InvalidFormError(
+                "define form should consist of 2 elements"
+                " first one being a symbol and the second one being"
+                " an assigned expression"
+            )
+        if not isinstance(target, (LocalRef, obj.Symbol)):
+            raise InvalidFormError(
+                "first argument to the define form should be a symbol"
+            )
+        konts.append(_AssignKont(self._current_frame, target))
+        return _Next(expr)
+
+    def _eval_set(self, node: obj.Cell, konts: List[_Kont]):
+        err = InvalidFormError(
+            "set! form should consist of memory reference (Symbol or cons cell)"
+            " and an expression to evaluate"
+        )
+        try:
+            _, ref, expr = node
+        except ValueError:
+            raise err
+        if isinstance(ref, GlobalRef):
+            if ref.binding.value is UNBOUND:
+                raise EvaluationError(f"unknown symbol {ref}")
+        elif isinstance(ref, obj.Symbol):
+            if self._env.lookup(ref) is None:
+                raise EvaluationError(f"unknown symbol {ref}")
+        elif isinstance(ref, obj.Cell) and ref.car is sym.CAR:
+            try:
+                _, cell = ref
+            except ValueError:
+                raise InvalidFormError(
+                    "car should be followed by a single expression to evaluate"
+                )
+            konts.append(_SetCarKont(self._current_frame, expr))
+            return _Next(cell)
+        elif not isinstance(ref, (LocalRef, CapturedRef)):
+            raise err
+        konts.append(_AssignKont(self._current_frame, ref, define=False))
+        return _Next(expr)
+
+    def _eval_begin(self, node: obj.Cell, konts: List[_Kont]):
+        _, *exprs = node
+        if not exprs:
+            raise InvalidFormError(
+                "begin form should be followed by at least one expression"
+            )
+        if len(exprs) > 1:
+            konts.append(_BeginKont(self._current_frame, exprs))
+        return _Next(exprs[0])
+
+    def _eval_if(self, node: obj.Cell, konts: List[_Kont]):
+        _, test, then, *otherwise = node
+        konts.append(_IfKont(self._current_frame, [then], otherwise))
+        return _Next(test)
+
+    def _eval_when(self, node: obj.Cell, konts: List[_Kont]):
+        head, test, *body = node
+        if head is sym.WHEN:
+            kont = _IfKont(self._current_frame, body, [])
+        else:
+            kont = _IfKont(self._current_frame, [], body)
+        konts.append(kont)
+        return _Next(test)
+
+    def _eval_and_or(self, node: obj.Cell, konts: List[_Kont]):
+        head, *exprs = node
+        if not exprs:
+            return head is sym.AND
+        if len(exprs) > 1:
+            konts.append(_AndOrKont(self._current_frame, exprs, head is sym.AND))
+        return _Next(exprs[0])
+
+    def _eval_let(self, node: obj.Cell, konts: List[_Kont]):
+        _, bindings, body = node
+        refs, exprs = zip(*bindings)
+        return _LetKont(self._current_frame, refs, exprs, body).start(konts)
+
+    def _eval_letrec(self, node: obj.Cell, konts: List[_Kont]):
+        _, bindings, body = node
+        refs, exprs = zip(*bindings)
+        for ref in refs:
+            ref.bind(self._current_frame, UNBOUND)
+        kont = _LetKont(self._current_frame, refs, exprs, body, store=True)
+        return kont.start(konts)
+
+
+_ATOMS = (LocalRef, CapturedRef, GlobalRef, int)
+"""
+Expressions which evaluation never needs a continuation.
+"""
+
+
+class _Next:
+    """
+    Marker for the expression that should be evaluated next.
+    """
+
+    __slots__ = ("expr",)
+
+    def __init__(self, expr: obj.BaseObject):
+        self.expr = expr
+
+
+class _Kont:
+    """
+    Base class for the continuations.
+
+    Each continuation remembers a frame that should
+    be restored before it is resumed with a value.
+    """
+
+    __slots__ = ("frame",)
+
+    def __init__(self, frame: Frame):
+        self.frame = frame
+
+    def resume(self, evaluator: StacklessEvaluator, val: Any, konts: List[_Kont]):
+        """
+        Continues evaluation with `val`.
+
+        Returns either a value or the `_Next` expression to evaluate.
+        Continuation can push itself back onto the `konts` if it
+        still expects more values.
+        """
+        raise NotImplementedError
+
+
+class _CallKont(_Kont):
+    """
+    Collects evaluated function and its arguments.
+
+    `node` is the cell of the next argument to evaluate,
+    `args` is `None` until the function is evaluated.
+    """
+
+    __slots__ = ("node", "func", "args")
+
+    def __init__(self, frame: Frame, node: Optional[obj.Cell]):
+        super().__init__(frame)
+        self.node = node
+        self.func = None
+        self.args: Optional[List[Any]] = None
+
+    def resume(self, evaluator, val, konts):
+        args = self.args
+        if args is None:
+            self.func = val
+            args = self.args = []
+        else:
+            args.append(val)
+        node = self.node
+        while node is not None:
+            expr = node.car
+            node = node.cdr
+            if not isinstance(expr, _ATOMS):
+                self.node = node
+                konts.append(self)
+                return _Next(expr)
+            args.append(evaluator._step(expr, konts))
+        return evaluator._apply(self.func, args)
+
+
+class _CondKont(_Kont):
+    """
+    Checks predicates of the `cond` arms one by one.
+    """
+
+    __slots__ = ("arms", "index")
+
+    def __init__(self, frame: Frame, arms: List[obj.Cell]):
+        super().__init__(frame)
+        self.arms = arms
+        self.index = -1
+
+    def next_arm(self, konts):
+        self.index += 1
+        if self.index == len(self.arms):
+            return None
+        pred, _ = self._arm()
+        konts.append(self)
+        return _Next(pred)
+
+    def resume(self, evaluator, val, konts):
+        if val:
+            _, expr = self._arm()
+            return _Next(expr)
+        return self.next_arm(konts)
+
+    def _arm(self):
+        try:
+            pred, expr = self.arms[self.index]
+        except (ValueError, TypeError):
+            raise InvalidFormError(
+                "each condition should be followed by an expression to be evaluated."
+            )
+        return pred, expr
+
+
+class _BeginKont(_Kont):
+    """
+    Evaluates expressions of the `begin` form one by one.
+    """
+
+    __slots__ = ("exprs", "index")
+
+    def __init__(self, frame: Frame, exprs: List[obj.BaseObject]):
+        super().__init__(frame)
+        self.exprs = exprs
+        self.index = 0
+
+    def resume(self, evaluator, val, konts):
+        self.index += 1
+        if self.index < len(self.exprs) - 1:
+            konts.append(self)
+        return _Next(self.exprs[self.index])
+
+
+class _IfKont(_Kont):
+    """
+    Evaluates one of the sequences of expressions
+    depending on the value of the test.
+    """
+
+    __slots__ = ("then", "otherwise")
+
+    def __init__(
+        self,
+        frame: Frame,
+        then: List[obj.BaseObject],
+        otherwise: List[obj.BaseObject],
+    ):
+        super().__init__(frame)
+        self.then = then
+        self.otherwise = otherwise
+
+    def resume(self, evaluator, val, konts):
+        exprs = self.then if val else self.otherwise
+        if not exprs:
+            return None
+        if len(exprs) > 1:
+            konts.append(_BeginKont(self.frame, exprs))
+        return _Next(exprs[0])
+
+
+class _AndOrKont(_Kont):
+    """
+    Evaluates operands of the `and` and `or` forms
+    until one of them decides the result.
+    """
+
+    __slots__ = ("exprs", "index", "conjunction")
+
+    def __init__(self, frame: Frame, exprs: List[obj.BaseObject], conjunction: bool):
+        super().__init__(frame)
+        self.exprs = exprs
+        self.index = 0
+        self.conjunction = conjunction
+
+    def resume(self, evaluator, val, konts):
+        if bool(val) is not self.conjunction:
+            return val
+        self.index += 1
+        if self.index < len(self.exprs) - 1:
+            konts.append(self)
+        return _Next(self.exprs[self.index])
+
+
+class _AssignKont(_Kont):
+    """
+    Assigns value to the variable for `define` and `set!` forms.
+    """
+
+    __slots__ = ("target", "define")
+
+    def __init__(self, frame: Frame, target: obj.BaseObject, define: bool = True):
+        super().__init__(frame)
+        self.target = target
+        self.define = define
+
+    def resume(self, evaluator, val, konts):
+        target = self.target
+        if isinstance(target, (LocalRef, CapturedRef)):
+            target.store(self.frame, val)
+        elif isinstance(target, GlobalRef):
+            target.binding.env[target.binding.symbol] = val
+        elif self.define:
+            evaluator._env[target] = val
+        else:
+            evaluator._env.lookup(target)[target] = val
+        return None
+
+
+class _SetCarKont(_Kont):
+    """
+    Sets value of a cell for the `set!` form used with `car`.
+
+    Firstly receives the cell and then the value to set.
+    """
+
+    __slots__ = ("expr", "cell")
+
+    def __init__(self, frame: Frame, expr: obj.BaseObject):
+        super().__init__(frame)
+        self.expr = expr
+        self.cell = UNBOUND
+
+    def resume(self, evaluator, val, konts):
+        if self.cell is UNBOUND:
+            if val is None:
+                raise LogicError("car cannot be used on an empty list")
+            if not isinstance(val, obj.Cell):
+                raise EvalTypeError("car can only be called on a list")
+            self.cell = val
+            konts.append(self)
+            return _Next(self.expr)
+        self.cell.car = val
+        return None
+
+
+class _LetKont(_Kont):
+    """
+    Binds variables of the `let` forms and loops one by one
+    and evaluates the body once all of them are bound.
+    """
+
+    __slots__ = ("refs", "exprs", "body", "store", "index")
+
+    def __init__(
+        self,
+        frame: Frame,
+        refs: Sequence[LocalRef],
+        exprs: Sequence[obj.BaseObject],
+        body: obj.BaseObject,
+        store: bool = False,
+    ):
+        super().__init__(frame)
+        self.refs = refs
+        self.exprs = exprs
+        self.body = body
+        # `letrec` variables are bound before and only assigned
+        self.store = store
+        self.index = 0
+
+    def start(self, konts):
+        if not self.exprs:
+            return _Next(self.body)
+        konts.append(self)
+        return _Next(self.exprs[0])
+
+    def resume(self, evaluator, val, konts):
+        ref = self.refs[self.index]
+        if self.store:
+            ref.store(self.frame, val)
+        else:
+            ref.bind(self.frame, val)
+        self.index += 1
+        if self.index < len(self.exprs):
+            konts.append(self)
+            return _Next(self.exprs[self.index])
+        return _Next(self.body)
+
+
+class _RecurKont(_Kont):
+    """
+    Collects new values of the loop variables
+    and rebinds them once all are evaluated.
+    """
+
+    __slots__ = ("recur", "vals")
+
+    def __init__(self, frame: Frame, recur: Recur):
+        super().__init__(frame)
+        self.recur = recur
+        self.vals = []
+
+    def resume(self, evaluator, val, konts):
+        vals = self.vals
+        vals.append(val)
+        args = self.recur.args
+        if len(vals) < len(args):
+            konts.append(self)
+            return _Next(args[len(vals)])
+        loop = self.recur.loop
+        for ref, val in zip(loop.refs, vals):
+            ref.bind(self.frame, val)
+        return _Next(loop.body)
@@ -1,10 +1,18 @@
+import array
+import math
+import mmap
+import operator
+from itertools import repeat
+from typing import Iterable, Iterator, List, Optional
+
 import pylisper.interpreter.objects as obj
 import pylisper.interpreter.symbols as sym
-from pylisper.interpreter.exceptions import EvalTypeError, LogicError
+from pylisper.interpreter.exceptions import (EvalTypeError, EvaluationError,
+                                             LogicError)
 
 
 def _cons(car, cdr):
-    if not isinstance(cdr, obj.Cell):
+    if cdr is not None and not isinstance(cdr, obj.Cell):
         raise EvalTypeError("second argument to cons has to be a list")
     return obj.Cell.cons(car, cdr)
 
@@ -26,13 +34,450 @@ def _cdr(cell):
 
 
 def _atom(arg):
-    return isinstance(arg, (obj.Number, obj.Symbol))
+    return isinstance(arg, (int, obj.Symbol)) and not isinstance(arg, bool)
+
+
+def _eq(a, b):
+    # integers are not interned by python so
+    # equal numbers are not always the same object
+    return a is b or (type(a) is int and type(b) is int and a == b)
 
 
 def _null(arg):
     return arg is None
 
 
+def _to_list(items: Iterable) -> Optional[obj.Cell]:
+    res = None
+    for item in reversed(items):
+        res = obj.Cell(item, res)
+    return res
+
+
+def _add(*args):
+    try:
+        return sum(args)
+    except TypeError:
+        raise EvalTypeError("+ can only be used on numbers")
+
+
+def _sub(*args):
+    if not args:
+        raise EvalTypeError("- expects at least one number")
+    first, *rest = args
+    try:
+        if not rest:
+            return -first
+        return first - sum(rest)
+    except TypeError:
+        raise EvalTypeError("- can only be used on numbers")
+
+
+def _mul(*args):
+    try:
+        return math.prod(args)
+    except TypeError:
+        raise EvalTypeError("* can only be used on numbers")
+
+
+def _div(*args):
+    if not args:
+        raise EvalTypeError("/ expects at least one number")
+    first, *rest = args
+    # there are only integers so the division has to be exact
+    if not rest:
+        first, rest = 1, (first,)
+    try:
+        divisor = math.prod(rest)
+        res, rem = divmod(first, divisor)
+    except TypeError:
+        raise EvalTypeError("/ can only be used on numbers")
+    except ZeroDivisionError:
+        raise LogicError("division by zero")
+    if rem:
+        raise LogicError(f"{first} is not divisible by {divisor}")
+    return res
+
+
+def _quotient(a, b):
+    try:
+        res = abs(a) // abs(b)
+    except TypeError:
+        raise EvalTypeError("quotient can only be used on numbers")
+    except ZeroDivisionError:
+        raise LogicError("division by zero")
+    # rounds towards zero unlike pythons floor division
+    return res if (a < 0) == (b < 0) else -res
+
+
+def _remainder(a, b):
+    return a - b * _quotient(a, b)
+
+
+def _compare(name, op):
+    def compare(first, *rest):
+        try:
+            return all(map(op, (first,) + rest, rest))
+        except TypeError:
+            raise EvalTypeError(f"{name} can only be used on numbers")
+
+    return compare
+
+
+def _extreme(name, func):
+    def extreme(*args):
+        if not args:
+            raise EvalTypeError(f"{name} expects at least one number")
+        try:
+            return func(args)
+        except TypeError:
+            raise EvalTypeError(f"{name} can only be used on numbers")
+
+    return extreme
+
+
+def _sum(lst):
+    try:
+        return sum(lst or ())
+    except TypeError:
+        raise EvalTypeError("sum can only be used on a list of numbers")
+
+
+def _product(lst):
+    try:
+        return math.prod(lst or ())
+    except TypeError:
+        raise EvalTypeError("product can only be used on a list of numbers")
+
+
+def _range(*args):
+    try:
+        return _to_list(range(*args))
+    except TypeError:
+        raise EvalTypeError("range expects from 1 to 3 numbers")
+    except ValueError:
+        raise LogicError("range step cannot be zero")
+
+
+def _iota(count, start=0, step=1):
+    if not isinstance(count, int) or count < 0:
+        raise EvalTypeError("iota count should be a non negative number")
+    try:
+        return _to_list([start + i * step for i in range(count)])
+    except TypeError:
+        raise EvalTypeError("iota can only be used on numbers")
+
+
+def _items(lst, name: str) -> Iterator:
+    if lst is None:
+        return iter(())
+    if not isinstance(lst, obj.Cell):
+        raise EvalTypeError(f"{name} can only be used on lists")
+    return iter(lst)
+
+
+def _function(func, name: str):
+    if not callable(func):
+        raise EvalTypeError(f"first argument to {name} has to be a function")
+    return func
+
+
+def _map(func, *lsts):
+    _function(func, "map")
+    if not lsts:
+        raise EvalTypeError("map expects at least one list")
+    return _to_list(list(map(func, *(_items(lst, "map") for lst in lsts))))
+
+
+def _filter(pred, lst):
+    _function(pred, "filter")
+    return _to_list([item for item in _items(lst, "filter") if pred(item)])
+
+
+_ASSOCIATIVE = (_add, _mul)
+"""
+Variadic builtins which folds can call once with every
+item of the list instead of calling them for each item.
+"""
+
+
+def _foldl(func, init, lst):
+    items = _items(lst, "foldl")
+    if _function(func, "foldl") in _ASSOCIATIVE:
+        return func(init, *items)
+    acc = init
+    for item in items:
+        acc = func(acc, item)
+    return acc
+
+
+def _foldr(func, init, lst):
+    items = list(_items(lst, "foldr"))
+    if _function(func, "foldr") in _ASSOCIATIVE:
+        return func(init, *items)
+    acc = init
+    for item in reversed(items):
+        acc = func(item, acc)
+    return acc
+
+
+def _length(lst):
+    res = 0
+    for _ in _items(lst, "length"):
+        res += 1
+    return res
+
+
+def _append(*lsts):
+    if not lsts:
+        return None
+    *init, res = lsts
+    items: List = []
+    for lst in init:
+        items.extend(_items(lst, "append"))
+    for item in reversed(items):
+        res = obj.Cell(item, res)
+    return res
+
+
+def _reverse(lst):
+    res = None
+    for item in _items(lst, "reverse"):
+        res = obj.Cell(item, res)
+    return res
+
+
+def _list_ref(lst, index):
+    if not isinstance(index, int) or index < 0:
+        raise EvalTypeError("list-ref index should be a non negative number")
+    for i, item in enumerate(_items(lst, "list-ref")):
+        if i == index:
+            return item
+    raise LogicError(f"list-ref index {index} out of range")
+
+
+def _find_pair(name: str, eq):
+    def find_pair(key, lst):
+        for pair in _items(lst, name):
+            if not isinstance(pair, obj.Cell):
+                raise EvalTypeError(f"{name} can only be used on a list of lists")
+            if eq(pair.car, key):
+                return pair
+        return False
+
+    return find_pair
+
+
+def _member(item, lst):
+    if lst is not None and not isinstance(lst, obj.Cell):
+        raise EvalTypeError("member can only be used on lists")
+    while lst is not None:
+        if lst.car == item:
+            return lst
+        lst = lst.cdr
+    return False
+
+
+def _apply(func, *args):
+    if not args:
+        raise EvalTypeError("apply expects a list of arguments")
+    _function(func, "apply")
+    *args, rest = args
+    args.extend(_items(rest, "apply"))
+    return func(*args)
+
+
+def _make_vector(size, fill=None):
+    if not isinstance(size, int) or size < 0:
+        raise EvalTypeError("vector size should be a non negative number")
+    return obj.Vector([fill] * size)
+
+
+def _vector(*items):
+    return obj.Vector(list(items))
+
+
+def _vector_index(vec, index, name: str) -> int:
+    if not isinstance(vec, obj.Vector):
+        raise EvalTypeError(f"{name} can only be used on vectors")
+    if not isinstance(index, int):
+        raise EvalTypeError(f"{name} index should be a number")
+    if not 0 <= index < len(vec.items):
+        raise LogicError(f"{name} index {index} out of range")
+    return index
+
+
+def _vector_ref(vec, index):
+    index = _vector_index(vec, index, "vector-ref")
+    return vec.items[index]
+
+
+def _vector_set(vec, index, val):
+    index = _vector_index(vec, index, "vector-set!")
+    vec.items[index] = val
+
+
+def _vector_length(vec):
+    if not isinstance(vec, obj.Vector):
+        raise EvalTypeError("vector-length can only be used on vectors")
+    return len(vec.items)
+
+
+def _hash_key(table, key, name: str):
+    if not isinstance(table, obj.HashTable):
+        raise EvalTypeError(f"{name} can only be used on hash tables")
+    if not _atom(key):
+        raise EvalTypeError(f"{name} key should be a symbol or a number")
+    return key
+
+
+_MISSING = object()
+
+
+def _hash_ref(table, key, default=_MISSING):
+    try:
+        key = _hash_key(table, key, "hash-ref")
+        return table.items[key]
+    except KeyError:
+        if default is _MISSING:
+            raise LogicError(f"hash-ref no value for the key {key}")
+        return default
+
+
+def _hash_set(table, key, val):
+    key = _hash_key(table, key, "hash-set!")
+    table.items[key] = val
+
+
+def _hash_count(table):
+    if not isinstance(table, obj.HashTable):
+        raise EvalTypeError("hash-count can only be used on hash tables")
+    return len(table.items)
+
+
+_TYPECODES = {sym.INT64: "q", sym.FLOAT64: "d"}
+
+
+def _typecode(type, name: str) -> str:
+    try:
+        return _TYPECODES[type]
+    except (KeyError, TypeError):
+        raise EvalTypeError(f"{name} type should be either int64 or float64")
+
+
+def _new_array(typecode: str, items, name: str) -> obj.NumArray:
+    try:
+        return obj.NumArray(memoryview(array.array(typecode, items)))
+    except TypeError:
+        raise EvalTypeError(f"{name} items should be numbers")
+    except OverflowError:
+        raise LogicError(f"{name} items don't fit in 64 bits")
+
+
+def _check_array(arr, name: str) -> memoryview:
+    if not isinstance(arr, obj.NumArray):
+        raise EvalTypeError(f"{name} can only be used on arrays")
+    return arr.data
+
+
+def _make_array(type, size, fill=0):
+    if not isinstance(size, int) or size < 0:
+        raise EvalTypeError("array size should be a non negative number")
+    return _new_array(_typecode(type, "make-array"), repeat(fill, size), "make-array")
+
+
+def _list_to_array(type, lst):
+    items = _items(lst, "list->array")
+    return _new_array(_typecode(type, "list->array"), items, "list->array")
+
+
+def _array_to_list(arr):
+    return _to_list(_check_array(arr, "array->list").tolist())
+
+
+def _array_index(arr, index, name: str) -> int:
+    data = _check_array(arr, name)
+    if not isinstance(index, int):
+        raise EvalTypeError(f"{name} index should be a number")
+    if not 0 <= index < len(data):
+        raise LogicError(f"{name} index {index} out of range")
+    return index
+
+
+def _array_ref(arr, index):
+    index = _array_index(arr, index, "array-ref")
+    return arr.data[index]
+
+
+def _array_set(arr, index, val):
+    index = _array_index(arr, index, "array-set!")
+    if arr.data.readonly:
+        raise LogicError("array-set! cannot be used on a loaded array")
+    try:
+        arr.data[index] = val
+    except (TypeError, ValueError):
+        raise EvalTypeError(f"array-set! cannot store {val} in the array")
+
+
+def _array_length(arr):
+    return len(_check_array(arr, "array-length"))
+
+
+def _array_slice(arr, start, end=None):
+    data = _check_array(arr, "array-slice")
+    if not isinstance(start, int) or not isinstance(end, (int, type(None))):
+        raise EvalTypeError("array-slice bounds should be numbers")
+    # shares memory with the sliced array
+    return obj.NumArray(data[start:end])
+
+
+def _array_sum(arr):
+    return sum(_check_array(arr, "array-sum"))
+
+
+def _array_dot(a, b):
+    a = _check_array(a, "array-dot")
+    b = _check_array(b, "array-dot")
+    if len(a) != len(b):
+        raise LogicError("array-dot arrays should be of the same length")
+    return sum(map(operator.mul, a, b))
+
+
+def _array_map_plus(a, b):
+    a = _check_array(a, "array-map+")
+    if isinstance(b, obj.NumArray):
+        b = b.data
+        if len(a) != len(b):
+            raise LogicError("array-map+ arrays should be of the same length")
+        floats = a.format == "d" or b.format == "d"
+    elif isinstance(b, (int, float)) and not isinstance(b, bool):
+        floats = a.format == "d" or isinstance(b, float)
+        b = repeat(b)
+    else:
+        raise EvalTypeError("array-map+ can only add an array or a number")
+    typecode = "d" if floats else "q"
+    return _new_array(typecode, map(operator.add, a, b), "array-map+")
+
+
+def _array_load(path, type=sym.INT64):
+    typecode = _typecode(type, "array-load")
+    try:
+        with open(str(path), "rb") as f:
+            size = f.seek(0, 2)
+            if not size:
+                return _new_array(typecode, (), "array-load")
+            # checked before mapping, so no mapping is left open on error
+            if size % 8:
+                raise LogicError(
+                    f"array-load size of {path} is not a multiple of 8 bytes"
+                )
+            # the mapping stays open as long as the view is alive
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except OSError as e:
+        raise EvaluationError(f"array-load cannot read {path}: {e.strerror}")
+    return obj.NumArray(memoryview(data).cast(typecode))
+
+
 def _not(arg):
     if not isinstance(arg, bool):
         raise EvalTypeError("not can only be called with bool value")
@@ -44,13 +489,61 @@ STD_ENV = {
     sym.CDR: _cdr,
     sym.CAR: _car,
     sym.ATOM: _atom,
-    sym.EQ: lambda a, b: a is b,
+    sym.EQ: _eq,
     sym.NULL: _null,
     sym.TRUE: True,
     sym.FALSE: False,
-    sym.EQ_NUM: lambda a, b: a == b,
-    sym.MINUS_NUM: lambda a, b: a - b,
-    sym.PLUS_NUM: lambda a, b: a + b,
+    sym.EQ_NUM: _compare("=", operator.eq),
+    sym.LT_NUM: _compare("<", operator.lt),
+    sym.GT_NUM: _compare(">", operator.gt),
+    sym.LE_NUM: _compare("<=", operator.le),
+    sym.GE_NUM: _compare(">=", operator.ge),
+    sym.MINUS_NUM: _sub,
+    sym.PLUS_NUM: _add,
+    sym.MUL_NUM: _mul,
+    sym.DIV_NUM: _div,
+    sym.QUOTIENT: _quotient,
+    sym.REMAINDER: _remainder,
+    sym.MIN: _extreme("min", min),
+    sym.MAX: _extreme("max", max),
+    sym.SUM: _sum,
+    sym.PRODUCT: _product,
+    sym.RANGE: _range,
+    sym.IOTA: _iota,
+    sym.MAP: _map,
+    sym.FILTER: _filter,
+    sym.FOLDL: _foldl,
+    sym.FOLDR: _foldr,
+    sym.LENGTH: _length,
+    sym.APPEND: _append,
+    sym.REVERSE: _reverse,
+    sym.LIST_REF: _list_ref,
+    sym.ASSOC: _find_pair("assoc", operator.eq),
+    sym.ASSQ: _find_pair("assq", _eq),
+    sym.MEMBER: _member,
+    sym.APPLY: _apply,
+    sym.MAKE_VECTOR: _make_vector,
+    sym.VECTOR: _vector,
+    sym.VECTOR_REF: _vector_ref,
+    sym.VECTOR_SET: _vector_set,
+    sym.VECTOR_LENGTH: _vector_length,
+    sym.MAKE_HASH: lambda: obj.HashTable({}),
+    sym.HASH_REF: _hash_ref,
+    sym.HASH_SET: _hash_set,
+    sym.HASH_COUNT: _hash_count,
+    sym.INT64: sym.INT64,
+    sym.FLOAT64: sym.FLOAT64,
+    sym.MAKE_ARRAY: _make_array,
+    sym.LIST_TO_ARRAY: _list_to_array,
+    sym.ARRAY_TO_LIST: _array_to_list,
+    sym.ARRAY_REF: _array_ref,
+    sym.ARRAY_SET: _array_set,
+    sym.ARRAY_LENGTH: _array_length,
+    sym.ARRAY_SLICE: _array_slice,
+    sym.ARRAY_SUM: _array_sum,
+    sym.ARRAY_DOT: _array_dot,
+    sym.ARRAY_MAP_PLUS: _array_map_plus,
+    sym.ARRAY_LOAD: _array_load,
     sym.NOT: _not,
 }
 """
@@ -16,11 +16,28 @@ BEGIN = _s("begin")
 LAMBDA = _s("lambda")
 COND = _s("cond")
 QUOTE = _s("quote")
+LET = _s("let")
+LET_STAR = _s("let*")
+LETREC = _s("letrec")
+DO = _s("do")
+IF = _s("if")
+WHEN = _s("when")
+UNLESS = _s("unless")
+AND = _s("and")
+OR = _s("or")
+
+
+# Macros
+
+DEFINE_SYNTAX = _s("define-syntax")
+SYNTAX_RULES = _s("syntax-rules")
+ELLIPSIS = _s("...")
+WILDCARD = _s("_")
 
 
 # std functions
 
-CONS = _s("crons")
+CONS = _s("cons")
 CAR = _s("car")
 CDR = _s("cdr")
 ATOM = _s("atom?")
@@ -31,4 +48,56 @@ FALSE = _s("#f")
 EQ_NUM = _s("=")
 PLUS_NUM = _s("+")
 MINUS_NUM = _s("-")
+MUL_NUM = _s("*")
+DIV_NUM = _s("/")
+LT_NUM = _s("<")
+GT_NUM = _s(">")
+LE_NUM = _s("<=")
+GE_NUM = _s(">=")
+QUOTIENT = _s("quotient")
+REMAINDER = _s("remainder")
+MIN = _s("min")
+MAX = _s("max")
+SUM = _s("sum")
+PRODUCT = _s("product")
+RANGE = _s("range")
+IOTA = _s("iota")
+MAP = _s("map")
+FILTER = _s("filter")
+FOLDL = _s("foldl")
+FOLDR = _s("foldr")
+LENGTH = _s("length")
+APPEND = _s("append")
+REVERSE = _s("reverse")
+LIST_REF = _s("list-ref")
+ASSOC = _s("assoc")
+ASSQ = _s("assq")
+MEMBER = _s("member")
+APPLY = _s("apply")
+MAKE_VECTOR = _s("make-vector")
+VECTOR = _s("vector")
+VECTOR_REF = _s("vector-ref")
+VECTOR_SET = _s("vector-set!")
+VECTOR_LENGTH = _s("vector-length")
+MAKE_HASH = _s("make-hash")
+HASH_REF = _s("hash-ref")
+HASH_SET = _s("hash-set!")
+HASH_COUNT = _s("hash-count")
+MAKE_ARRAY = _s("make-array")
+LIST_TO_ARRAY = _s("list->array")
+ARRAY_TO_LIST = _s("array->list")
+ARRAY_REF = _s("array-ref")
+ARRAY_SET = _s("array-set!")
+ARRAY_LENGTH = _s("array-length")
+ARRAY_SLICE = _s("array-slice")
+ARRAY_SUM = _s("array-sum")
+ARRAY_DOT = _s("array-dot")
+ARRAY_MAP_PLUS = _s("array-map+")
+ARRAY_LOAD = _s("array-load")
 NOT = _s("not")
+
+
+# array element types
+
+INT64 = _s("int64")
+FLOAT64 = _s("float64")
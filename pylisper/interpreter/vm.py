@@ -0,0 +1,281 @@
+"""
+Contains stack based virtual machine executing
+bytecode produced by the `BytecodeCompiler`.
+"""
+from __future__ import annotations
+
+from typing import Any, List, Optional, Sequence, Tuple
+
+import pylisper.interpreter.objects as obj
+from pylisper.interpreter.bytecode import (BIND_BOXED, BIND_LOCAL, CALL,
+                                           CONST, DEFINE, GUARD, JUMP,
+                                           JUMP_IF_FALSE, JUMP_IF_FALSE_OR_POP,
+                                           JUMP_IF_TRUE_OR_POP, LOAD,
+                                           LOAD_BOXED, LOAD_CAPTURED,
+                                           LOAD_CAPTURED_BOXED, LOAD_GLOBAL,
+                                           LOAD_LOCAL, MAKE_LAMBDA, POP,
+                                           RETURN, SET, SET_CAR, SET_GLOBAL,
+                                           STORE_BOXED, STORE_CAPTURED,
+                                           STORE_LOCAL, TAIL_CALL,
+                                           BytecodeCompiler, CodeObject)
+from pylisper.interpreter.env import UNBOUND, Box, Env, Frame
+from pylisper.interpreter.exceptions import (EvalTypeError, EvaluationError,
+                                             InvalidFormError, LogicError)
+from pylisper.interpreter.optimizer import Optimizer
+from pylisper.interpreter.resolver import Resolver
+from pylisper.locations import SourceMap
+from pylisper.printer import to_str
+
+
+class Closure(obj.BaseObject):
+    """
+    Function created by the `VM` out of a lambdas `CodeObject`
+    and the variables it captured.
+
+    Closures are callable so they can be passed to the
+    builtin functions, in which case a new run of the
+    virtual machine is started to evaluate them.
+    """
+
+    def __init__(self, vm: VM, code: CodeObject, captures: Tuple[Any, ...]):
+        """
+        Creates a closure.
+
+        Args/Kwargs:
+            `vm`:
+                Virtual machine to run the closure with when called
+                from outside of the machine.
+            `code`:
+                Compiled lambdas body.
+            `captures`:
+                Free variables of the code, see `CodeObject.captures`.
+        """
+        self.vm = vm
+        self.code = code
+        self.captures = captures
+
+    def bind(self, args: Sequence[Any]) -> Frame:
+        """
+        Creates frame for the call with `args`.
+        """
+        return self.frame(list(args))
+
+    def frame(self, values: List[Any]) -> Frame:
+        """
+        Creates frame for the call with arguments in `values`,
+        the list is extended to the size of the frame in place.
+        """
+        code = self.code
+        if code.arity != len(values):
+            raise EvaluationError(
+                f"number of call arguments doesn't match"
+                f" expected {code.arity} got {len(values)}"
+            )
+        values.extend(code.padding)
+        for slot in code.boxed:
+            values[slot] = Box(values[slot])
+        return Frame(values, self.captures)
+
+    def __call__(self, *args: Any):
+        return self.vm.run(self.code, self.bind(args))
+
+    def __str__(self):
+        return to_str(self.code.source)
+
+
+class VM:
+    """
+    Stack based virtual machine.
+
+    Can be used as a drop in replacement for the `Evaluator`.
+    Each expression passed to `eval` is firstly compiled to
+    bytecode and then executed. Calls between closures don't
+    use pythons stack, instead frames are kept on the machines
+    own stack, and calls in tail position reuse the frame.
+    """
+
+    def __init__(
+        self,
+        env: Env,
+        optimize: bool = True,
+        source_map: Optional[SourceMap] = None,
+    ):
+        """
+        Creates new VM.
+
+        Args/Kwargs:
+            `env`:
+                Global environment to run code with.
+            `optimize`:
+                If `False` expressions are not passed through the `Optimizer`.
+            `source_map`:
+                Optional locations of the evaluated forms,
+                used to set `location` of the raised errors.
+        """
+        self._env = env
+        self._source_map = source_map
+        self._resolver = Resolver(env, source_map)
+        self._optimizer = Optimizer(source_map) if optimize else None
+        self._compiler = BytecodeCompiler()
+
+    def eval(self, expr: obj.BaseObject):
+        """
+        Compiles and evaluates given expression.
+
+        Args/Kwargs:
+            `expr`:
+                Expression to evaluate.
+
+        Raises:
+            `EvaluationError`:
+                In case of error during compilation or evaluation.
+        """
+        try:
+            resolved = self._resolver.resolve(expr)
+            if self._optimizer is not None:
+                resolved = self._optimizer.optimize(resolved)
+            return self.run(self._compiler.compile(resolved), None)
+        except EvaluationError as e:
+            if e.location is None and self._source_map is not None:
+                e.location = self._source_map.get(expr)
+            raise
+
+    def run(self, code: CodeObject, frame: Optional[Frame]):
+        """
+        Executes code object with passed frame
+        and returns its result.
+        """
+        env = self._env
+        stack = []
+        frames = []
+        instrs, consts, names = code.code, code.consts, code.names
+        pc = 0
+        while True:
+            op = instrs[pc]
+            arg = instrs[pc + 1]
+            pc += 2
+            if op == LOAD_LOCAL:
+                val = frame.values[arg]
+                if val is UNBOUND:
+                    raise EvaluationError(f"Undefinied symbol {code.locals[arg]}")
+                stack.append(val)
+            elif op == LOAD_GLOBAL:
+                val = consts[arg].value
+                if val is UNBOUND:
+                    raise EvaluationError(f"Undefinied symbol {consts[arg].symbol}")
+                stack.append(val)
+            elif op == LOAD_CAPTURED:
+                stack.append(frame.captures[arg])
+            elif op == LOAD_BOXED:
+                val = frame.values[arg].value
+                if val is UNBOUND:
+                    raise EvaluationError(f"Undefinied symbol {code.locals[arg]}")
+                stack.append(val)
+            elif op == LOAD_CAPTURED_BOXED:
+                val = frame.captures[arg].value
+                if val is UNBOUND:
+                    raise EvaluationError(
+                        f"Undefinied symbol {code.captures[arg].symbol}"
+                    )
+                stack.append(val)
+            elif op == LOAD:
+                name = names[arg]
+                found = env.lookup(name)
+                if found is None:
+                    raise EvaluationError(f"Undefinied symbol {name}")
+                stack.append(found[name])
+            elif op == CONST:
+                stack.append(consts[arg])
+            elif op == GUARD:
+                folded = consts[arg]
+                if folded.holds():
+                    stack.append(folded.value)
+                else:
+                    pc += 2
+            elif op == CALL or op == TAIL_CALL:
+                if arg:
+                    args = stack[-arg:]
+                    del stack[-arg:]
+                else:
+                    args = []
+                func = stack.pop()
+                if isinstance(func, Closure):
+                    call_frame = func.frame(args)
+                    if op == CALL:
+                        frames.append((code, pc, frame))
+                    code = func.code
+                    instrs, consts, names = code.code, code.consts, code.names
+                    pc = 0
+                    frame = call_frame
+                elif callable(func):
+                    stack.append(func(*args))
+                else:
+                    raise InvalidFormError(
+                        "First value of an unquoted list should be a function"
+                    )
+            elif op == JUMP_IF_FALSE:
+                if not stack.pop():
+                    pc = arg
+            elif op == JUMP:
+                pc = arg
+            elif op == JUMP_IF_FALSE_OR_POP:
+                if stack[-1]:
+                    stack.pop()
+                else:
+                    pc = arg
+            elif op == JUMP_IF_TRUE_OR_POP:
+                if stack[-1]:
+                    pc = arg
+                else:
+                    stack.pop()
+            elif op == RETURN:
+                if not frames:
+                    return stack.pop()
+                code, pc, frame = frames.pop()
+                instrs, consts, names = code.code, code.consts, code.names
+            elif op == POP:
+                stack.pop()
+            elif op == BIND_LOCAL:
+                frame.values[arg] = stack.pop()
+            elif op == BIND_BOXED:
+                frame.values[arg] = Box(stack.pop())
+            elif op == STORE_LOCAL:
+                frame.values[arg] = stack.pop()
+                stack.append(None)
+            elif op == STORE_BOXED:
+                frame.values[arg].value = stack.pop()
+                stack.append(None)
+            elif op == STORE_CAPTURED:
+                frame.captures[arg].value = stack.pop()
+                stack.append(None)
+            elif op == SET_GLOBAL:
+                binding = consts[arg]
+                if binding.value is UNBOUND:
+                    raise EvaluationError(f"unknown symbol {binding.symbol}")
+                binding.env[binding.symbol] = stack.pop()
+                stack.append(None)
+            elif op == DEFINE:
+                env[names[arg]] = stack.pop()
+                stack.append(None)
+            elif op == SET:
+                name = names[arg]
+                found = env.lookup(name)
+                if found is None:
+                    raise EvaluationError(f"unknown symbol {name}")
+                found[name] = stack.pop()
+                stack.append(None)
+            elif op == SET_CAR:
+                val = stack.pop()
+                cell = stack.pop()
+                if cell is None:
+                    raise LogicError("car cannot be used on an empty list")
+                if not isinstance(cell, obj.Cell):
+                    raise EvalTypeError("car can only be called on a list")
+                cell.car = val
+                stack.append(None)
+            elif op == MAKE_LAMBDA:
+                lambda_code = consts[arg]
+                captures = tuple([ref.capture(frame) for ref in lambda_code.captures])
+                stack.append(Closure(self, lambda_code, captures))
+            else:
+                raise AssertionError(f"unknown opcode {op}")
@@ -4,9 +4,10 @@ Contains lexer as well as tokens definiton.
 Whole module consists of 2 global variables;
     - `lexer` which is a lexer object ready to parse source line,
     - `TOKENS` dictionary mapping token names to their respoctive regexes.
-"""
 
-from rply import LexerGenerator
+`lexer` is built on the first access, so importing
+the module doesn't compile any of the regexes.
+"""
 
 TOKENS = {
     "LPAREN": r"\(",
@@ -24,6 +25,8 @@ def _lispy_lexer_generator():
     """
     Creates a rply lexer generator.
     """
+    from rply import LexerGenerator
+
     lg = LexerGenerator()
     lg.ignore(r"\s+|(;;.*?(\n|$))")
     for name, pat in TOKENS.items():
@@ -31,4 +34,13 @@ def _lispy_lexer_generator():
     return lg
 
 
-lexer = _lispy_lexer_generator().build()
+_lexer = None
+
+
+def __getattr__(name):
+    global _lexer
+    if name == "lexer":
+        if _lexer is None:
+            _lexer = _lispy_lexer_generator().build()
+        return _lexer
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
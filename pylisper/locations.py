@@ -0,0 +1,93 @@
+"""
+Contains source locations of the read forms.
+
+Cells don't carry their position, so reading a program
+costs no additional memory per cell unless it's asked for.
+Instead positions are recorded in a `SourceMap`, a side table
+keyed by the identity of the cells, which readers fill when
+given one and passes rewriting forms copy from the original
+to the rewritten cell.
+
+Only lists (non empty, as `()` is `None`) are recorded,
+as these are the forms that can fail during evaluation
+and that lambdas are made of.
+"""
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import pylisper.interpreter.objects as obj
+
+
+class Location(NamedTuple):
+    """
+    Position of a form in the source, lines
+    and columns are counted from `1`.
+    """
+
+    line: int
+    column: int
+    path: Optional[str] = None
+
+    def __str__(self):
+        if self.path is None:
+            return f"{self.line}:{self.column}"
+        return f"{self.path}:{self.line}:{self.column}"
+
+
+class SourceMap:
+    """
+    Side table mapping cells to their `Location`.
+
+    Recorded cells are kept alive by the map,
+    so their identity is never reused for another cell.
+
+    Examples:
+
+        >>> source_map = SourceMap("prog.lisp")
+        >>> form = read("\\n  (car x)", source_map)
+        >>> str(source_map.get(form))
+        'prog.lisp:2:3'
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Creates an empty source map.
+
+        Args/Kwargs:
+            `path`:
+                Optional path of the source file
+                included in every returned location.
+        """
+        self.path = path
+        self._positions: Dict[int, Tuple[obj.Cell, int, int]] = {}
+
+    def add(self, form: obj.BaseObject, line: int, column: int):
+        """
+        Records position of the form, ignored if it is not a list.
+        """
+        if isinstance(form, obj.Cell):
+            self._positions[id(form)] = (form, line, column)
+
+    def get(self, form: obj.BaseObject) -> Optional[Location]:
+        """
+        Returns location of the form or `None` if it is not known.
+        """
+        entry = self._positions.get(id(form))
+        if entry is None or entry[0] is not form:
+            return None
+        _, line, column = entry
+        return Location(line, column, self.path)
+
+    def copy(self, src: obj.BaseObject, dst: obj.BaseObject):
+        """
+        Records `dst` at the location of `src` if it has one,
+        unless `dst` already has its own location. Used by passes
+        producing new forms out of the read ones.
+        """
+        if src is dst or self.get(dst) is not None:
+            return
+        entry = self._positions.get(id(src))
+        if entry is not None and entry[0] is src:
+            self.add(dst, entry[1], entry[2])
+
+    def __len__(self):
+        return len(self._positions)
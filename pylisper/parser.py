@@ -1,55 +1,50 @@
 """
 Module containing `parser` object ready to parse source
 when provided with a lexer and parsing exceptions.
-"""
-from rply import ParserGenerator
 
+Parsing exceptions are shared with, and defined in,
+the `pylisper.reader` module.
+
+Beside `parser`, which parses a single s-expression,
+`program_parser` is provided which parses a sequence of them.
+Nodes keep `(line, column)` of the token they start with
+as their `position`.
+
+Both parsers are built on the first access. Their LR tables
+are persisted in rply's cache directory, keyed on the grammar,
+so the tables are generated only once per grammar change.
+"""
 from pylisper.ast import List, Number, Symbol
 from pylisper.lexer import TOKENS
+from pylisper.reader import IncompleteInput, UnexpectedCharacter
 
 ACCEPTED_TOKEN_NAMES = [t for t in TOKENS if t != "UNKNOWN"]
 
 
-class IncompleteInput(Exception):
+def _pylisper_parser_gen(program: bool = False):
     """
-    An exception to be thrown in case of possibility that
-    the input might be incomplete.
+    Createas a rply parser generator for the pylisper.
+
+    Args/Kwargs:
+        `program`:
+            If `True` the parser accepts a sequence of s-expressions
+            and returns them as a `List`. Otherwise it accepts exactly
+            one s-expression.
     """
+    from rply import ParserGenerator
 
+    cache_id = "pylisper-program" if program else "pylisper"
+    pg = ParserGenerator(ACCEPTED_TOKEN_NAMES, cache_id=cache_id)
 
-class UnexpectedCharacter(Exception):
-    """
-    An exception to be thrown in case of encountering
-    an unexpected character in the input stream.
-    """
+    if program:
 
-    def __init__(self, char, line, column):
-        """
-        Creates new error instance.
-
-        Args/Kwargs:
-            `char`:
-                A character that caused an error.
-            `line`:
-                Line of input the character occured in.
-            `column`:
-                Index of the unexpected character in its line.
-        """
-        super().__init__()
-        self.char = char
-        self.line = line
-        self.column = column
-        self.msg = f"Unexpected character ({line}:{column}): '{char}'"
-
-    def __str__(self):
-        return self.msg
-
-
-def _pylisper_parser_gen():
-    """
-    Createas a rply parser generator for the pylisper.
-    """
-    pg = ParserGenerator(ACCEPTED_TOKEN_NAMES)
+        @pg.production("program : sexprs")
+        def nonempty_program(prod):
+            return prod[0]
+
+        @pg.production("program : ")
+        def empty_program(prod):
+            return List()
 
     @pg.production("sexpr : atom")
     @pg.production("sexpr : list")
@@ -58,15 +53,16 @@ def _pylisper_parser_gen():
 
     @pg.production("list : LPAREN RPAREN")
     def empty_list(prod):
-        return List()
+        return List(position=_position(prod[0]))
 
     @pg.production("list : LPAREN sexprs RPAREN")
     def nonempty_list(prod):
-        return List(prod[1].exprs)
+        return List(prod[1].exprs, _position(prod[0]))
 
     @pg.production("sexprs : sexprs sexpr")
     def multi_expr_sexprs(prod):
-        return List(prod[0].exprs + [prod[1]])
+        prod[0].append(prod[1])
+        return prod[0]
 
     @pg.production("sexprs : sexpr")
     def single_expr_sexprs(prod):
@@ -74,11 +70,12 @@ def _pylisper_parser_gen():
 
     @pg.production("atom : SYMBOL")
     def atom_symbol(prod):
+        position = _position(prod[0])
         try:
             val = int(prod[0].getstr())
-            return Number(val)
+            return Number(val, position)
         except ValueError:
-            return Symbol(prod[0].getstr())
+            return Symbol(prod[0].getstr(), position)
 
     @pg.error
     def error_handler(tok):
@@ -91,4 +88,18 @@ def _pylisper_parser_gen():
     return pg
 
 
-parser = _pylisper_parser_gen().build()
+def _position(token):
+    pos = token.getsourcepos()
+    return (pos.lineno, pos.colno)
+
+
+_parsers = {}
+
+
+def __getattr__(name):
+    if name in ("parser", "program_parser"):
+        if name not in _parsers:
+            program = name == "program_parser"
+            _parsers[name] = _pylisper_parser_gen(program).build()
+        return _parsers[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
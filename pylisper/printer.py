@@ -0,0 +1,31 @@
+"""
+Contains `to_str` function converting evaluated values
+to their textual representation in the pylisper syntax.
+"""
+from typing import Any
+
+import pylisper.interpreter.objects as obj
+
+
+def to_str(val: Any) -> str:
+    """
+    Returns textual representation of the passed value.
+
+    Python values used by the interpreter are printed the way
+    they are written in the source, that is `None` as an empty
+    list and booleans as `#t` and `#f`.
+    """
+    if val is None:
+        return "()"
+    if val is True:
+        return "#t"
+    if val is False:
+        return "#f"
+    if isinstance(val, obj.Cell):
+        return f"({' '.join(map(to_str, val))})"
+    if isinstance(val, obj.Vector):
+        return f"#({' '.join(map(to_str, val))})"
+    if isinstance(val, obj.HashTable):
+        entries = (f"({to_str(k)} {to_str(v)})" for k, v in val.items.items())
+        return f"#hash({' '.join(entries)})"
+    return str(val)
@@ -0,0 +1,223 @@
+"""
+Contains hand written reader turning source text
+directly into objects evaluated by the interpreter.
+
+Reader is a single pass replacement for the `lexer`,
+`parser` and `ObjectCompiler` pipeline. It reads the
+source incrementally, line by line, so it can be used
+with open files as well as strings, and yields top
+level forms as soon as they are complete.
+
+Module provides:
+    - `Reader`, an iterable over forms read from the source,
+    - `read`, reading exactly one form,
+    - `read_all`, reading every form into a list,
+as well as reading exceptions `IncompleteInput`
+and `UnexpectedCharacter`.
+"""
+import io
+import re
+from typing import Iterator, List, Optional, TextIO, Tuple, Union
+
+import pylisper.interpreter.objects as obj
+from pylisper.locations import SourceMap
+
+
+class IncompleteInput(Exception):
+    """
+    An exception to be thrown in case of possibility that
+    the input might be incomplete.
+    """
+
+
+class UnexpectedCharacter(Exception):
+    """
+    An exception to be thrown in case of encountering
+    an unexpected character in the input stream.
+    """
+
+    def __init__(self, char, line, column):
+        """
+        Creates new error instance.
+
+        Args/Kwargs:
+            `char`:
+                A character that caused an error.
+            `line`:
+                Line of input the character occured in.
+            `column`:
+                Index of the unexpected character in its line.
+        """
+        super().__init__()
+        self.char = char
+        self.line = line
+        self.column = column
+        self.msg = f"Unexpected character ({line}:{column}): '{char}'"
+
+    def __str__(self):
+        return self.msg
+
+
+_TOKEN = re.compile(
+    r"""(?P<skip>\s+|;;.*)"""
+    r"""|(?P<lparen>\(|\#\(|\#hash\()"""
+    r"""|(?P<rparen>\))"""
+    r"""|(?P<symbol>[^)('"`,;\s\r]+)"""
+    r"""|(?P<unknown>.)"""
+)
+"""
+Regex matching a single token. Mirrors `lexer.TOKENS`
+with the addition of `#(` and `#hash(` opening vectors
+and hash tables.
+"""
+
+
+def _atom(text: str) -> obj.BaseObject:
+    """
+    Returns an `int` if the text is an integer literal
+    and a `Symbol` otherwise.
+    """
+    first = text[0]
+    if first.isdigit() or (first in "+-" and len(text) > 1):
+        try:
+            return int(text)
+        except ValueError:
+            pass
+    return obj.Symbol(text)
+
+
+def _hash_table(items: List[obj.BaseObject]) -> Optional[obj.HashTable]:
+    """
+    Returns a hash table of the `(key value)` lists
+    or `None` if any of the items is not one.
+    """
+    table = {}
+    for item in items:
+        if not isinstance(item, obj.Cell) or item.cdr is None:
+            return None
+        key = item.car
+        if not isinstance(key, (int, obj.Symbol)) or item.cdr.cdr is not None:
+            return None
+        table[key] = item.cdr.car
+    return obj.HashTable(table)
+
+
+class Reader:
+    """
+    Iterable over the top level forms of the source.
+
+    Lines and columns are counted from `1`.
+    Position of the most recently read form is available
+    under `form_start` attribute. Positions of every read
+    list are recorded in the `source_map`, if one is given.
+
+
+    Examples:
+
+        >>> reader = Reader("(define x 1) x")
+        >>> [str(form) for form in reader]
+        ['(define x 1)', 'x']
+    """
+
+    def __init__(
+        self, source: Union[str, TextIO], source_map: Optional[SourceMap] = None
+    ):
+        """
+        Creates a reader.
+
+        Args/Kwargs:
+            `source`:
+                Either a string or a text stream to read from.
+                Stream is read lazily, one line at a time.
+            `source_map`:
+                Optional map to record positions of the read lists in.
+        """
+        if isinstance(source, str):
+            source = io.StringIO(source)
+        self._source = source
+        self._source_map = source_map
+        self.form_start: Optional[Tuple[int, int]] = None
+
+    def __iter__(self) -> Iterator[obj.BaseObject]:
+        return self._forms()
+
+    def _forms(self) -> Iterator[obj.BaseObject]:
+        # items of the lists that are not closed yet
+        # together with their opening paren and its position
+        open_lists: List[Tuple[list, str, int, int]] = []
+        for lineno, line in enumerate(self._source, start=1):
+            for match in _TOKEN.finditer(line):
+                kind = match.lastgroup
+                if kind == "skip":
+                    continue
+                column = match.start() + 1
+                if kind == "lparen":
+                    open_lists.append(([], match.group(), lineno, column))
+                    continue
+                if kind == "symbol":
+                    form = _atom(match.group())
+                    start = (lineno, column)
+                elif kind == "rparen":
+                    if not open_lists:
+                        raise UnexpectedCharacter(")", lineno, column)
+                    items, paren, *start = open_lists.pop()
+                    if paren == "#(":
+                        form = obj.Vector(items)
+                    elif paren == "#hash(":
+                        form = _hash_table(items)
+                        if form is None:
+                            raise UnexpectedCharacter(")", lineno, column)
+                    else:
+                        form = None
+                        for item in reversed(items):
+                            form = obj.Cell(item, form)
+                        if self._source_map is not None:
+                            self._source_map.add(form, *start)
+                else:
+                    raise UnexpectedCharacter(match.group(), lineno, column)
+                if open_lists:
+                    open_lists[-1][0].append(form)
+                else:
+                    self.form_start = tuple(start)
+                    yield form
+        if open_lists:
+            raise IncompleteInput
+
+
+def read(
+    source: Union[str, TextIO], source_map: Optional[SourceMap] = None
+) -> obj.BaseObject:
+    """
+    Reads exactly one form from the source,
+    see `Reader` for the `source_map`.
+
+    Raises:
+        `IncompleteInput`:
+            If the source ends before the form is complete.
+        `UnexpectedCharacter`:
+            If the source contains an unexpected character
+            or more than one form.
+    """
+    reader = Reader(source, source_map)
+    forms = iter(reader)
+    try:
+        form = next(forms)
+    except StopIteration:
+        raise IncompleteInput
+    for extra in forms:
+        line, column = reader.form_start
+        char = "(" if extra is None or isinstance(extra, obj.Cell) else str(extra)[0]
+        raise UnexpectedCharacter(char, line, column)
+    return form
+
+
+def read_all(
+    source: Union[str, TextIO], source_map: Optional[SourceMap] = None
+) -> List[obj.BaseObject]:
+    """
+    Reads every form from the source.
+
+    Raises the same exceptions as `read`, except for
+    the error on more than one form.
+    """
+    return list(Reader(source, source_map))
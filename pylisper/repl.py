@@ -4,20 +4,18 @@ Can be run as module to start a pylispers repl.
 Contains `PylisperConsole` class which is a subclass
 of `code.InteractiveConsole`.
 """
+import argparse
 import code
 import readline
 import sys
 
-from rply.errors import LexingError
-
 import pylisper
-from pylisper.interpreter.compiler import ObjectCompiler
+from pylisper.interpreter.engines import DEFAULT_ENGINE, ENGINES
 from pylisper.interpreter.env import Env
-from pylisper.interpreter.evaluator import Evaluator
 from pylisper.interpreter.exceptions import EvaluationError
 from pylisper.interpreter.std_env import STD_ENV
-from pylisper.lexer import lexer
-from pylisper.parser import UnexpectedCharacter, parser
+from pylisper.printer import to_str
+from pylisper.reader import IncompleteInput, UnexpectedCharacter, read_all
 
 
 class PylisperConsole(code.InteractiveConsole):
@@ -30,7 +28,7 @@ class PylisperConsole(code.InteractiveConsole):
     without writing our own console.
     """
 
-    def __init__(self, env: Env = None):
+    def __init__(self, env: Env = None, engine: str = DEFAULT_ENGINE):
         """
         Creates new `PylisperConsole`.
 
@@ -38,19 +36,21 @@ class PylisperConsole(code.InteractiveConsole):
             `env`:
                 Optional environment to run code with.
                 If `None` then `STD_ENV` is used.
+            `engine`:
+                Name of the engine to evaluate code with.
+                See `ENGINES` for the available ones.
         """
         super().__init__()
         if env is None:
             env = Env(STD_ENV)
         self.env = env
-        self.eval = Evaluator(env)
-        self.comp = ObjectCompiler()
+        self.eval = ENGINES[engine](env)
         # TODO: setup autocompletion and a history file
         # TODO: for the readline
 
     def runcode(self, code):
         """
-        Runs compiled code using `Evaluator` class and prints its result
+        Runs compiled code using selected engine and prints its result
         as well as errors that could occur during evaluation.
         """
         try:
@@ -58,36 +58,26 @@ class PylisperConsole(code.InteractiveConsole):
         except EvaluationError as e:
             self.print_error(e)
         else:
-            if res is None:
-                res = "()"
-            elif res is True:
-                res = "#t"
-            elif res is False:
-                res = "#f"
-            self.write(res)
+            self.write(to_str(res))
 
     def runsource(self, source, ignored_filename="<input>", symbol="single"):
         """
         Evaluates input source.
 
-        Instead of the default implementation uses `ObjectCompiler`
-        to compile source to internal representation and then
-        evaluates them with `runcode` method.
+        Instead of the default implementation uses `read_all`
+        to read source into internal representation and then
+        evaluates every read form with `runcode` method.
         """
         try:
-            ast = parser.parse(lexer.lex(source))
-            code = ast.accept(self.comp)
-        except pylisper.parser.IncompleteInput:
+            forms = read_all(source)
+        except IncompleteInput:
             return True
         except UnexpectedCharacter as e:
             self.print_error(e)
             self.write(source.split("\n")[e.line - 1])
             return False
-        except LexingError as e:
-            # TODO: do something about lexing errors
-            self.print_error(e)
-            return False
-        self.runcode(code)
+        for form in forms:
+            self.runcode(form)
         return False
 
     def interact(self):
@@ -110,7 +100,15 @@ class PylisperConsole(code.InteractiveConsole):
 
 
 def main():
-    PylisperConsole().interact()
+    argparser = argparse.ArgumentParser(description="Pylisper repl")
+    argparser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default=DEFAULT_ENGINE,
+        help="engine to evaluate code with",
+    )
+    args = argparser.parse_args()
+    PylisperConsole(engine=args.engine).interact()
 
 
 if __name__ == "__main__":
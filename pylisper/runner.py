@@ -0,0 +1,246 @@
+"""
+Contains functions evaluating whole programs
+as well as the `pylisper` command line entry point.
+
+Program is a sequence of top level forms which
+are parsed at once and then evaluated in order
+with a single shared environment.
+
+Engines and everything used only by the command line
+are imported when needed to keep the import cheap.
+"""
+import sys
+import time
+from typing import Callable, List, Optional, TextIO, Union
+
+import pylisper.interpreter.objects as obj
+from pylisper.cache import read_file
+from pylisper.interpreter.engines import DEFAULT_ENGINE, ENGINES
+from pylisper.interpreter.env import Env
+from pylisper.interpreter.exceptions import EvaluationError
+from pylisper.interpreter.std_env import STD_ENV
+from pylisper.locations import SourceMap
+from pylisper.printer import to_str
+from pylisper.reader import IncompleteInput, UnexpectedCharacter, read_all
+
+
+def run_source(
+    source: Union[str, TextIO],
+    env: Optional[Env] = None,
+    engine: str = DEFAULT_ENGINE,
+):
+    """
+    Evaluates every top level form in the `source`
+    and returns value of the last one.
+
+    Args/Kwargs:
+        `source`:
+            Program to evaluate, either a string or a text stream.
+        `env`:
+            Optional environment to run program with.
+            If `None` then `STD_ENV` is used.
+        `engine`:
+            Name of the engine to evaluate program with.
+            See `ENGINES` for the available ones.
+
+    Raises:
+        `EvaluationError`:
+            In case of error during evaluation.
+        As well as any exception raised by `read_all`.
+    """
+    return _eval_all(read_all(source), env, engine)
+
+
+def run_file(
+    path: str,
+    env: Optional[Env] = None,
+    engine: str = DEFAULT_ENGINE,
+    use_cache: bool = True,
+):
+    """
+    Same as `run_source` but reads program from the file under `path`.
+
+    If `use_cache` is `True` the program is read through
+    the `.lispc` cache, see `pylisper.cache.read_file`.
+    """
+    return _eval_all(read_file(path, use_cache), env, engine)
+
+
+def _eval_all(
+    forms: List[obj.BaseObject],
+    env: Optional[Env],
+    engine: str,
+    source_map: Optional[SourceMap] = None,
+    make_evaluator: Optional[Callable] = None,
+):
+    """
+    Evaluates forms with the `engine`, or with an evaluator
+    created by `make_evaluator(env, source_map=source_map)`.
+    """
+    if env is None:
+        env = Env(STD_ENV)
+    if make_evaluator is None:
+        make_evaluator = ENGINES[engine]
+    evaluator = make_evaluator(env, source_map=source_map)
+    res = None
+    for form in forms:
+        res = evaluator.eval(form)
+    return res
+
+
+def _run(
+    path: str,
+    engine: str,
+    timing: bool,
+    quiet: bool,
+    use_cache: bool,
+    make_evaluator: Optional[Callable] = None,
+) -> bool:
+    """
+    Runs a single file for the command line reporting results
+    on stdout and errors on stderr, with their location if it
+    is known. Returns `True` on success.
+
+    Errors of the program never propagate, so that the
+    remaining files can be run.
+    """
+    source_map = SourceMap(path)
+    try:
+        start = time.perf_counter()
+        forms = read_file(path, use_cache, source_map)
+        compiled = time.perf_counter()
+        res = _eval_all(forms, None, engine, source_map, make_evaluator)
+        done = time.perf_counter()
+    except OSError as e:
+        print(f"{path}: {e.strerror}", file=sys.stderr)
+        return False
+    except UnicodeDecodeError as e:
+        print(f"{path}: not a UTF-8 file, {e.reason}", file=sys.stderr)
+        return False
+    except IncompleteInput:
+        print(f"{path}: unexpected end of file", file=sys.stderr)
+        return False
+    except UnexpectedCharacter as e:
+        print(f"{path}: {e}", file=sys.stderr)
+        return False
+    except EvaluationError as e:
+        print(f"{e.location or path}: {e}", file=sys.stderr)
+        return False
+    except (TypeError, RecursionError) as e:
+        # raised by builtins called with wrong arguments and by
+        # too deep recursion, other files can still be run
+        print(f"{path}: {e}", file=sys.stderr)
+        return False
+    if not quiet:
+        print(to_str(res))
+    if timing:
+        print(
+            f"{path}: parsed in {compiled - start:.4f}s,"
+            f" evaluated in {done - compiled:.4f}s",
+            file=sys.stderr,
+        )
+    return True
+
+
+def main(argv: Optional[List[str]] = None):
+    """
+    Entry point of the `pylisper` command.
+
+    `pylisper run` evaluates files and prints value
+    of the last form in each of them while `pylisper repl`
+    starts an interactive console. Exits with status `1` if
+    any of the files failed.
+
+    With `--profile` files are evaluated by the `ProfilingEvaluator`
+    and the report is printed to stderr, `--profile-output` also
+    writes stacks in the collapsed format to a file. With `--stats`
+    files are evaluated by the `InstrumentedEvaluator` and its
+    counters are printed to stderr as JSON.
+    """
+    import argparse
+    import functools
+
+    argparser = argparse.ArgumentParser(prog="pylisper")
+    commands = argparser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="evaluate files")
+    run.add_argument("files", nargs="+", metavar="file")
+    run.add_argument(
+        "--time", action="store_true", help="print timing information to stderr"
+    )
+    run.add_argument(
+        "--quiet", action="store_true", help="don't print value of the last form"
+    )
+    run.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="don't read nor write the compiled files cache",
+    )
+    run.add_argument(
+        "--profile",
+        action="store_true",
+        help="print time spent in each lambda to stderr, uses the tree engine",
+    )
+    run.add_argument(
+        "--profile-output",
+        metavar="path",
+        help="write profiled stacks in the collapsed (flamegraph) format to a file",
+    )
+    run.add_argument(
+        "--stats",
+        action="store_true",
+        help="print evaluation counters as JSON to stderr, uses the tree engine",
+    )
+    repl = commands.add_parser("repl", help="start an interactive console")
+    for cmd in (run, repl):
+        cmd.add_argument(
+            "--engine",
+            choices=ENGINES,
+            default=DEFAULT_ENGINE,
+            help="engine to evaluate code with",
+        )
+    args = argparser.parse_args(argv)
+    if args.command == "repl":
+        from pylisper.repl import PylisperConsole
+
+        PylisperConsole(engine=args.engine).interact()
+        return
+    profile = counters = make_evaluator = None
+    if args.profile or args.profile_output or args.stats:
+        if args.engine != "tree":
+            argparser.error(
+                "profiling and --stats are only supported by the tree engine"
+            )
+        if args.stats and (args.profile or args.profile_output):
+            argparser.error("--stats cannot be used together with profiling")
+    if args.profile or args.profile_output:
+        from pylisper.interpreter.profiler import Profile, ProfilingEvaluator
+
+        profile = Profile()
+        make_evaluator = functools.partial(ProfilingEvaluator, profile=profile)
+    elif args.stats:
+        from pylisper.interpreter.instrumentation import (Counters,
+                                                          InstrumentedEvaluator)
+
+        counters = Counters()
+        make_evaluator = functools.partial(InstrumentedEvaluator, counters=counters)
+    ok = True
+    for path in args.files:
+        ok = (
+            _run(
+                path,
+                args.engine,
+                args.time,
+                args.quiet,
+                not args.no_cache,
+                make_evaluator,
+            )
+            and ok
+        )
+    if counters is not None:
+        print(counters.to_json(), file=sys.stderr)
+    if profile is not None:
+        print(profile.report(), file=sys.stderr)
+        if args.profile_output:
+            with open(args.profile_output, "w") as f:
+                f.write(profile.collapsed())
+    sys.exit(0 if ok else 1)
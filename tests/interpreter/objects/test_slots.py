@@ -0,0 +1,27 @@
+import pytest
+
+import pylisper.interpreter.objects as obj
+from pylisper.interpreter.env import Env
+from pylisper.interpreter.evaluator import Evaluator
+from pylisper.interpreter.std_env import STD_ENV
+from pylisper.reader import read
+
+
+@pytest.mark.parametrize(
+    "make",
+    [
+        lambda: obj.Cell(1, None),
+        lambda: obj.Symbol("slots"),
+        lambda: Evaluator(Env(STD_ENV)).eval(read("(lambda (x) x)")),
+    ],
+)
+def test_objects_have_no_dict(make):
+    assert not hasattr(make(), "__dict__")
+
+
+def test_cell_value_is_alias_of_car():
+    cell = obj.Cell(1, None)
+    cell.value = 2
+    assert cell.car == 2
+    cell.car = 3
+    assert cell.value == 3
@@ -9,7 +9,7 @@ from pylisper.interpreter.compiler import ObjectCompiler
 @given(st.integers())
 def test_number_compilation(val):
     comp = ObjectCompiler()
-    assert ast.Number(val).accept(comp) == obj.Number(val)
+    assert ast.Number(val).accept(comp) == val
 
 
 @given(st.symbols())
@@ -30,5 +30,5 @@ def test_non_empty_list_compilation(val):
     comp = ObjectCompiler()
     node = ast.List([x for x in map(ast.Number, val)]).accept(comp)
     assert isinstance(node, obj.Cell)
-    comp_vals = [x.value for x in node]
+    comp_vals = list(node)
     assert comp_vals == val
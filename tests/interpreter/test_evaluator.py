@@ -1,3 +1,6 @@
+import gc
+import sys
+import weakref
 from unittest import mock
 
 import pytest
@@ -5,72 +8,85 @@ import utils.strategies as st
 from hypothesis import given
 
 import pylisper.interpreter.objects as obj
-from pylisper.interpreter.compiler import ObjectCompiler
+from pylisper.interpreter.engines import DEFAULT_ENGINE, ENGINES
 from pylisper.interpreter.env import Env
-from pylisper.interpreter.evaluator import Evaluator
 from pylisper.interpreter.exceptions import EvaluationError
+from pylisper.interpreter.resolver import GlobalRef
 from pylisper.interpreter.std_env import STD_ENV
-from pylisper.lexer import lexer
-from pylisper.parser import parser
+from pylisper.interpreter.vm import Closure
+from pylisper.printer import to_str
+from pylisper.reader import read
 
 # arbitrarily chosen
 RECURSION_LIMIT = 100
 
 
-def eval(source, init_env=None):
+def eval(source, init_env=None, engine=DEFAULT_ENGINE):
     if init_env is None:
         init_env = Env(STD_ENV)
-    evaluator = Evaluator(init_env)
-    comp = ObjectCompiler()
-    ast = parser.parse(lexer.lex(source))
-    code = ast.accept(comp)
-    return evaluator.eval(code)
+    evaluator = ENGINES[engine](init_env)
+    return evaluator.eval(read(source))
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @given(st.naturals())
-def test_number_evaluation(val):
-    assert eval(str(val)) == val
+def test_number_evaluation(engine, val):
+    assert eval(str(val), engine=engine) == val
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @given(st.symbols(allow_numbers=False))
-def test_unknown_symbol_evaluation(val):
+def test_unknown_symbol_evaluation(engine, val):
     with pytest.raises(EvaluationError):
-        eval(val)
+        eval(val, engine=engine)
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @given(st.symbols(allow_numbers=False), st.naturals())
-def test_symbol_definition(sym, val):
+def test_symbol_definition(engine, sym, val):
     env = Env()
-    eval(f"(define {sym} {val})", init_env=env)
+    eval(f"(define {sym} {val})", init_env=env, engine=engine)
     assert obj.Symbol(sym) in env
     assert env[obj.Symbol(sym)] == val
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @given(st.naturals(), st.naturals())
-def test_function_call(fst, snd):
+def test_function_call(engine, fst, snd):
     m = mock.Mock()
     env = Env({obj.Symbol("func"): m})
-    eval(f"(func {fst} {snd})", init_env=env)
+    eval(f"(func {fst} {snd})", init_env=env, engine=engine)
     m.assert_called_once_with(fst, snd)
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @given(st.symbols(allow_numbers=False), st.naturals())
-def test_symbol_evaluation(sym, val):
+def test_symbol_evaluation(engine, sym, val):
     env = Env()
-    eval(f"(define {sym} {val})", init_env=env)
-    assert eval(sym, init_env=env) == val
+    eval(f"(define {sym} {val})", init_env=env, engine=engine)
+    assert eval(sym, init_env=env, engine=engine) == val
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @given(st.naturals())
-def test_lambda_evaluation(val):
+def test_lambda_evaluation(engine, val):
     m = mock.Mock()
     env = Env({obj.Symbol("func"): m})
-    eval(f"((lambda (x) (func x)) {val})", init_env=env)
+    eval(f"((lambda (x) (func x)) {val})", init_env=env, engine=engine)
     m.assert_called_once_with(val)
 
 
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize(
+    "source", ["(lambda () 1)", "(lambda (x) (cons x (quote ())))"]
+)
+def test_lambda_printing(engine, source):
+    assert to_str(eval(source, engine=engine)) == source
+
+
+@pytest.mark.parametrize("engine", ENGINES)
 @given(st.naturals())
-def test_lambda_env_capture(val):
+def test_lambda_env_capture(engine, val):
     m = mock.Mock()
     env = Env({obj.Symbol("func"): m})
     eval(
@@ -80,14 +96,16 @@ def test_lambda_env_capture(val):
                 (lambda () (func x))))
         """,
         init_env=env,
+        engine=engine,
     )
-    eval(f"(define b (a {val}))", init_env=env)
-    eval("(b)", init_env=env)
+    eval(f"(define b (a {val}))", init_env=env, engine=engine)
+    eval("(b)", init_env=env, engine=engine)
     m.assert_called_once_with(val)
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @given(st.naturals(max_value=RECURSION_LIMIT))
-def test_recursive_function_call(val):
+def test_recursive_function_call(engine, val):
     m = mock.Mock()
     env = Env({obj.Symbol("func"): m, **STD_ENV})
     calls = [mock.call(x) for x in range(val, 0, -1)]
@@ -100,12 +118,84 @@ def test_recursive_function_call(val):
                     (#t (a (- acc 1) (func acc))))))
         """,
         init_env=env,
+        engine=engine,
     )
-    assert eval(f"(a {val} (func {val}))", init_env=env)
+    assert eval(f"(a {val} (func {val}))", init_env=env, engine=engine)
     m.assert_has_calls(calls)
 
 
-def test_against_env_reference_cycle():
+@pytest.mark.parametrize("engine", ENGINES)
+def test_tail_calls_run_in_constant_stack(engine):
+    env = Env(STD_ENV)
+    eval(
+        """
+        (begin
+            (define even?
+                (lambda (n) (cond ((= n 0) #t) (#t (odd? (- n 1))))))
+            (define odd?
+                (lambda (n) (cond ((= n 0) #f) (#t (even? (- n 1)))))))
+        """,
+        init_env=env,
+        engine=engine,
+    )
+    assert eval(f"(even? {sys.getrecursionlimit() * 5})", env, engine=engine)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_tail_calls_through_conditionals_run_in_constant_stack(engine):
+    env = Env(STD_ENV)
+    eval(
+        """
+        (begin
+            (define even?
+                (lambda (n) (or (= n 0) (and (> n 0) (odd? (- n 1))))))
+            (define odd?
+                (lambda (n) (if (= n 0) #f (unless (< n 0) (even? (- n 1)))))))
+        """,
+        init_env=env,
+        engine=engine,
+    )
+    assert eval(f"(even? {sys.getrecursionlimit() * 5})", env, engine=engine)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_conditionals_short_circuit(engine):
+    source = """
+    (let ((n 0))
+        (begin
+            (and #f (set! n (+ n 1)))
+            (or 1 (set! n (+ n 10)))
+            (if #t n (set! n (+ n 100)))
+            (when #f (set! n (+ n 1000)))
+            (unless 1 (set! n (+ n 10000)))
+            n))
+    """
+    assert eval(source, engine=engine) == 0
+
+
+@pytest.mark.parametrize("engine", ["vm", "stackless"])
+def test_deep_recursion_is_not_bounded_by_python_stack(engine):
+    size = sys.getrecursionlimit() * 20
+    items = None
+    for i in range(size):
+        items = obj.Cell.cons(i, items)
+    env = Env({obj.Symbol("items"): items, **STD_ENV})
+    eval(
+        """
+        (define len
+            (lambda (l)
+                (cond
+                    ((null? l) 0)
+                    (#t (+ 1 (len (cdr l)))))))
+        """,
+        init_env=env,
+        engine=engine,
+    )
+    assert eval("(len items)", env, engine=engine) == size
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_against_env_reference_cycle(engine):
     env = Env(STD_ENV)
     eval(
         """
@@ -116,8 +206,9 @@ def test_against_env_reference_cycle():
                     (#t (a (- acc 1))))))
     """,
         init_env=env,
+        engine=engine,
     )
-    assert eval("(a 10)", env)
+    assert eval("(a 10)", env, engine=engine)
     eval(
         """
         (define a
@@ -127,37 +218,42 @@ def test_against_env_reference_cycle():
                     (#t (a (- acc 1))))))
     """,
         init_env=env,
+        engine=engine,
     )
-    assert eval("(a 10)", env)
+    assert eval("(a 10)", env, engine=engine)
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @given(st.symbols(allow_numbers=False), st.naturals())
-def test_set_form_evaluation(sym, val):
+def test_set_form_evaluation(engine, sym, val):
     env = Env()
-    eval(f"(define {sym} (quote ()))", env)
-    eval(f"(set! {sym} {val})", env)
+    eval(f"(define {sym} (quote ()))", env, engine=engine)
+    eval(f"(set! {sym} {val})", env, engine=engine)
     assert env[obj.Symbol(sym)] == val
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @given(st.symbols(allow_numbers=False), st.naturals())
-def test_set_form_setting_value_in_outer_scope(sym, val):
+def test_set_form_setting_value_in_outer_scope(engine, sym, val):
     env = Env()
-    eval(f"(define {sym} (quote ()))", env)
+    eval(f"(define {sym} (quote ()))", env, engine=engine)
     eval(
         f"""
         (define a (lambda () (set! {sym} {val})))
     """,
         env,
+        engine=engine,
     )
-    eval("(a)", env)
+    eval("(a)", env, engine=engine)
     assert env[obj.Symbol(sym)] == val
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @given(st.symbols(allow_numbers=False), st.naturals(), st.naturals())
-def test_set_form_setting_value_in_inner_scope(sym, outer, inner):
+def test_set_form_setting_value_in_inner_scope(engine, sym, outer, inner):
     m = mock.Mock()
     env = Env({obj.Symbol("func"): m})
-    eval(f"(define {sym} {outer})", env)
+    eval(f"(define {sym} {outer})", env, engine=engine)
     eval(
         f"""
         (define a
@@ -167,25 +263,233 @@ def test_set_form_setting_value_in_inner_scope(sym, outer, inner):
                     (func {sym}))))
     """,
         env,
+        engine=engine,
     )
-    eval("(a (quote ()))", env)
+    eval("(a (quote ()))", env, engine=engine)
     m.assert_called_once_with(inner)
     assert env[obj.Symbol(sym)] == outer
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @given(st.lists(st.naturals(), min_size=1), st.naturals())
-def test_set_form_on_first_cell_in_list(init, val):
+def test_set_form_on_first_cell_in_list(engine, init, val):
     env = Env(STD_ENV)
     list_vals = " ".join(map(str, init))
-    eval(f"(define loc (quote ({list_vals})))", env)
-    eval(f"(set! (car loc) {val})", env)
+    eval(f"(define loc (quote ({list_vals})))", env, engine=engine)
+    eval(f"(set! (car loc) {val})", env, engine=engine)
     assert env[obj.Symbol("loc")].value == val
 
 
+@pytest.mark.parametrize("engine", ENGINES)
 @given(st.lists(st.naturals(), min_size=3), st.naturals())
-def test_set_form_on_some_cell_in_list(init, val):
+def test_set_form_on_some_cell_in_list(engine, init, val):
     env = Env(STD_ENV)
     list_vals = " ".join(map(str, init))
-    eval(f"(define loc (quote ({list_vals})))", env)
-    eval(f"(set! (car (cdr (cdr loc))) {val})", env)
+    eval(f"(define loc (quote ({list_vals})))", env, engine=engine)
+    eval(f"(set! (car (cdr (cdr loc))) {val})", env, engine=engine)
     assert env[obj.Symbol("loc")].cdr.cdr.value == val
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        "(quote (1 2 (3 4)))",
+        "(cond ((= 1 2) 1) ((= 2 2) (quote two)))",
+        "(cond (#f 1))",
+        "(begin (define x 1) (set! x (+ x 1)) x)",
+        "((lambda (x y) (- x y)) 10 3)",
+        "(((lambda (x) (lambda (y) (- x y))) 10) 2)",
+        "(begin (define l (quote (1 2))) (set! (car (cdr l)) 5) l)",
+        """
+        (begin
+            (define count
+                (lambda (acc n)
+                    (cond
+                        ((= n 0) acc)
+                        (#t (count (+ acc 1) (- n 1))))))
+            (count 0 50))
+        """,
+        """
+        (begin
+            (define make-counter
+                (lambda ()
+                    (begin
+                        (define n 0)
+                        (lambda () (begin (set! n (+ n 1)) n)))))
+            (define counter (make-counter))
+            (counter)
+            (counter))
+        """,
+        "(let ((x 1) (y 2)) (let* ((x (+ x y)) (y (* x 2))) (* x y)))",
+        """
+        (letrec
+            ((even? (lambda (n) (cond ((= n 0) #t) (#t (odd? (- n 1))))))
+             (odd? (lambda (n) (cond ((= n 0) #f) (#t (even? (- n 1)))))))
+            (even? 11))
+        """,
+        "(do ((i 0 (+ i 1)) (acc (quote ()) (cons i acc))) ((= i 5) acc))",
+        "(let loop ((i 5)) (cond ((= i 0) (quote ())) (#t (cons i (loop (- i 1))))))",
+        "(vector (if #t 1 2) (if (quote ()) 1 2) (if #f 1))",
+        "(vector (when #t 1 2) (when #f 1) (unless #f 1 2) (unless #t 1))",
+        "(vector (and) (or) (and 1 2) (and 1 #f 2) (or #f 2 3) (or #f (quote ())))",
+        "(let loop ((i 5)) (if (= i 0) (quote ()) (cons i (loop (- i 1)))))",
+    ],
+)
+def test_engines_agree(source):
+    results = {str(eval(source, engine=engine)) for engine in ENGINES}
+    assert len(results) == 1
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize(
+    "source, expected",
+    [
+        ("(+ (car (quote (1000))) 1000)", 2000),
+        ("(= (car (quote (1000))) 1000)", True),
+        ("(eq? (car (quote (1000))) 1000)", True),
+        ("(eq? 100000 (+ 99999 1))", True),
+        ("(eq? 1 #t)", False),
+        ("(atom? (car (quote (1))))", True),
+        ("(atom? #t)", False),
+    ],
+)
+def test_numbers_are_plain_integers(engine, source, expected):
+    res = eval(source, engine=engine)
+    assert type(res) is type(expected)
+    assert res == expected
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_closures_share_assigned_variables(engine):
+    env = Env(STD_ENV)
+    eval(
+        """
+        (define make-account
+            (lambda (balance)
+                (cons
+                    (lambda (n) (set! balance (+ balance n)))
+                    (cons (lambda () balance) (quote ())))))
+        """,
+        env,
+        engine=engine,
+    )
+    eval("(define account (make-account 10))", env, engine=engine)
+    eval("((car account) 5)", env, engine=engine)
+    assert eval("((car (cdr account)))", env, engine=engine) == 15
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_closures_do_not_retain_unused_variables(engine):
+    big = mock.Mock()
+    ref = weakref.ref(big)
+    env = Env({obj.Symbol("big"): big, **STD_ENV})
+    eval(
+        "(define f ((lambda (x y) (lambda () y)) big 1))",
+        env,
+        engine=engine,
+    )
+    del env[obj.Symbol("big")], big
+    gc.collect()
+    assert ref() is None
+    assert eval("(f)", env, engine=engine) == 1
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("count", range(5))
+def test_calls_with_any_number_of_arguments(engine, count):
+    params = " ".join(f"a{i}" for i in range(count))
+    source = f"""
+    ((lambda ({params})
+        (begin
+            (define x (quote ()))
+            (define f (lambda () x))
+            (set! x (cons (quote end) x))
+            (set! x (cons {count} x))
+            (f)))
+        {" ".join(map(str, range(count)))})
+    """
+    assert str(eval(source, engine=engine)) == f"({count} end)"
+    with pytest.raises(EvaluationError):
+        eval(f"((lambda ({params}) 1) {' 0' * (count + 1)})", engine=engine)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_global_calls_follow_redefinitions(engine):
+    env = Env(STD_ENV)
+    eval("(define g (lambda (n) (f n)))", env, engine=engine)
+    with pytest.raises(EvaluationError):
+        eval("(g 1)", env, engine=engine)
+    eval("(define f (lambda (n) (+ n 1)))", env, engine=engine)
+    assert eval("(g 1)", env, engine=engine) == 2
+    eval("(set! f (lambda (n) (* n 10)))", env, engine=engine)
+    assert eval("(g 1)", env, engine=engine) == 10
+    env[obj.Symbol("f")] = lambda n: n - 1
+    assert eval("(g 1)", env, engine=engine) == 0
+    del env[obj.Symbol("f")]
+    with pytest.raises(EvaluationError):
+        eval("(g 1)", env, engine=engine)
+
+
+def test_global_callees_are_not_evaluated():
+    env = Env(STD_ENV)
+    evaluator = ENGINES["tree"](env)
+    evaluator.eval(read("(define f (lambda (n) (+ n 1)))"))
+    evaluator.eval(read("(define g (lambda (n) (f (f n))))"))
+    func = evaluator.eval(read("(lambda () (g 1))"))
+    with mock.patch.object(Env, "lookup", side_effect=AssertionError):
+        with mock.patch.object(
+            evaluator, "_eval", wraps=evaluator._eval
+        ) as spy:
+            assert func() == 3
+    evaluated = [call.args[0] for call in spy.call_args_list]
+    assert evaluated
+    assert not any(isinstance(expr, GlobalRef) for expr in evaluated)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_loops_run_in_constant_stack(engine):
+    source = """
+    (define count
+        (lambda (n)
+            (let loop ((i 0) (acc 0))
+                (cond
+                    ((= i n) acc)
+                    (#t (loop (+ i 1) (+ acc 1)))))))
+    """
+    env = Env(STD_ENV)
+    eval(source, env, engine=engine)
+    assert eval("(count 10000)", env, engine=engine) == 10000
+    source = "(do ((i 0 (+ i 1)) (acc 0 (+ acc i))) ((= i 10000) acc))"
+    assert eval(source, env, engine=engine) == sum(range(10000))
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_loop_variables_are_bound_per_iteration(engine):
+    source = """
+    (map
+        (lambda (f) (f))
+        (do ((i 0 (+ i 1))
+             (acc (quote ()) (cons (lambda () (begin (set! i (+ i 10)) i)) acc)))
+            ((= i 3) acc)))
+    """
+    assert str(eval(source, engine=engine)) == "(12 11 10)"
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_let_does_not_create_lambdas(engine):
+    env = Env(STD_ENV)
+    eval(
+        """
+        (define f
+            (lambda (x)
+                (let* ((y (+ x 1)) (z (* y 2)))
+                    (do ((i 0 (+ i 1))) ((= i z) i)))))
+        """,
+        env,
+        engine=engine,
+    )
+    fail = mock.Mock(side_effect=AssertionError)
+    with mock.patch.object(obj.Lambda, "__init__", fail), mock.patch.object(
+        Closure, "__init__", fail
+    ):
+        assert eval("(f 2)", env, engine=engine) == 6
@@ -0,0 +1,138 @@
+import pytest
+
+from pylisper.interpreter.engines import ENGINES
+from pylisper.interpreter.env import Env
+from pylisper.interpreter.exceptions import InvalidFormError
+from pylisper.interpreter.expander import Expander
+from pylisper.interpreter.std_env import STD_ENV
+from pylisper.locations import SourceMap
+from pylisper.printer import to_str
+from pylisper.reader import read, read_all
+from pylisper.runner import run_source
+
+MACROS = """
+(define-syntax my-or
+    (syntax-rules ()
+        ((_) #f)
+        ((_ e) e)
+        ((_ e rest ...) (cond (e #t) (#t (my-or rest ...))))))
+(define-syntax for
+    (syntax-rules (in)
+        ((_ x in l body) (map (lambda (x) body) l))))
+(define-syntax pairs
+    (syntax-rules ()
+        ((_ (a b) ... last) (quote ((b a) ... last)))))
+"""
+
+
+def expander(source=MACROS):
+    res = Expander()
+    for form in read_all(source):
+        res.expand(form)
+    return res
+
+
+def expand(source):
+    return to_str(expander().expand(read(source)))
+
+
+@pytest.mark.parametrize(
+    "source, expected",
+    [
+        ("(my-or)", "#f"),
+        ("(my-or x y)", "(cond (x #t) (#t y))"),
+        ("(for x in l (+ x 1))", "(map (lambda (x) (+ x 1)) l)"),
+        ("(pairs (1 2) (3 4) 5)", "(quote ((2 1) (4 3) 5))"),
+        ("(pairs 5)", "(quote (5))"),
+        ("(lambda (my-or) (my-or 1))", "(lambda (my-or) 1)"),
+        ("(cond ((my-or) 1))", "(cond (#f 1))"),
+        ("(quote (my-or 1))", "(quote (my-or 1))"),
+    ],
+)
+def test_macros_are_expanded(source, expected):
+    assert expand(source) == expected
+
+
+def test_forms_without_macros_are_not_copied():
+    form = read("(lambda (x) (cond ((= x 1) (f x))))")
+    assert expander().expand(form) is form
+
+
+def test_definition_evaluates_to_empty_list():
+    res = Expander().expand(read("(define-syntax m (syntax-rules () ((_) 1)))"))
+    assert to_str(res) == "(quote ())"
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        "(for x l (+ x 1))",
+        "(for x in l)",
+        "(pairs (1 2) 3 4)",
+        "(lambda (x) (define-syntax m (syntax-rules () ((_) 1))))",
+        "(define-syntax m)",
+        "(define-syntax m (syntax-rules (1) ((_) 1)))",
+        "(define-syntax m (syntax-rules () (_ 1)))",
+        "(define-syntax (m) (syntax-rules () ((_) 1)))",
+    ],
+)
+def test_malformed_macros(source):
+    with pytest.raises(InvalidFormError):
+        expander().expand(read(source))
+
+
+@pytest.mark.parametrize(
+    "rule",
+    [
+        "((_ x y) (quote (x ...)))",
+        "((_ x ...) (quote x))",
+        "((_ x ...) (quote (1 ...)))",
+        "((_ (x ...) (y ...)) (quote ((x y) ...)))",
+    ],
+)
+def test_malformed_templates(rule):
+    exp = expander(f"(define-syntax m (syntax-rules () {rule}))")
+    with pytest.raises(InvalidFormError):
+        exp.expand(read("(m (1 2) (3))"))
+
+
+def test_expansion_keeps_location():
+    source_map = SourceMap()
+    forms = read_all(MACROS + "\n(my-or a b)", source_map=source_map)
+    exp = Expander(source_map)
+    for form in forms:
+        res = exp.expand(form)
+    assert source_map.get(res) == source_map.get(forms[-1])
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_macros_on_every_engine(engine):
+    source = (
+        MACROS
+        + """
+(define count 0)
+(define-syntax incr!
+    (syntax-rules ()
+        ((_ v) (set! v (+ v 1)))))
+(define f (lambda (x) (begin (incr! count) (my-or (= x 0) (= x 1) x))))
+(cons count (for x in (quote (0 1 2)) (f x)))
+"""
+    )
+    assert to_str(run_source(source, engine=engine)) == "(0 #t #t 2)"
+
+
+def test_lambda_body_is_expanded_once():
+    source = """
+(define-syntax twice (syntax-rules () ((_ e) (+ e e))))
+(define f (lambda (x) (twice x)))
+(define-syntax twice (syntax-rules () ((_ e) (* e e))))
+(cons (f 3) (cons (twice 3) (quote ())))
+"""
+    assert to_str(run_source(source)) == "(6 9)"
+
+
+def test_macros_are_kept_by_the_repl_environment():
+    env = Env(STD_ENV)
+    engine = ENGINES["tree"](env)
+    engine.eval(read("(define-syntax one (syntax-rules () ((_) 1)))"))
+    assert engine.eval(read("(+ (one) (one))")) == 2
@@ -0,0 +1,90 @@
+import json
+
+import pytest
+
+from pylisper.interpreter.env import Env
+from pylisper.interpreter.evaluator import Evaluator
+from pylisper.interpreter.instrumentation import Counters, InstrumentedEvaluator
+from pylisper.interpreter.std_env import STD_ENV
+from pylisper.reader import read_all
+from pylisper.runner import main
+
+PROGRAM = """
+(define build
+    (lambda (n acc)
+        (cond
+            ((= n 0) acc)
+            (#t (build (- n 1) (cons n acc))))))
+(define len
+    (lambda (l)
+        (cond
+            ((null? l) 0)
+            (#t (+ 1 (len (cdr l)))))))
+(len (build 5 (quote ())))
+"""
+
+
+def run(source, **kwargs):
+    evaluator = InstrumentedEvaluator(Env(STD_ENV), **kwargs)
+    res = None
+    for form in read_all(source):
+        res = evaluator.eval(form)
+    return res, evaluator.counters
+
+
+def test_counters():
+    res, counters = run(PROGRAM)
+    assert res == 5
+    stats = counters.as_dict()
+    assert stats["lambda_calls"] == 6 + 6
+    assert stats["cons_cells"] == 5
+    assert stats["special_forms"] == {"define": 2, "cond": 12, "quote": 1}
+    # tail calls of build don't nest, each len call does
+    assert stats["max_depth"] == 6
+    assert stats["eval_steps"] > stats["lambda_calls"]
+    assert json.loads(counters.to_json()) == stats
+
+
+def test_lambdas_called_by_builtins_are_counted():
+    res, counters = run("(define sq (lambda (x) (* x x))) (map sq (quote (1 2 3)))")
+    assert str(res) == "(1 4 9)"
+    assert counters.lambda_calls == 3
+    assert counters.max_depth == 1
+    # `(* x x)` of each call and its operands
+    assert counters.eval_steps >= 3 * 4
+
+
+def test_hooks():
+    evals, forms, calls = [], [], []
+    run(
+        "((lambda (x) (begin (quote 1) x)) 2)",
+        on_eval=evals.append,
+        on_special_form=lambda name, node: forms.append(name),
+        on_call=lambda func, args: calls.append(args),
+        optimize=False,
+    )
+    assert forms == ["begin", "quote"]
+    assert calls == [[2]]
+    assert len(evals) == 6
+
+
+def test_plain_evaluator_is_not_instrumented():
+    assert InstrumentedEvaluator._apply is not Evaluator._apply
+    assert "counters" not in dir(Evaluator(Env()))
+
+
+def test_stats_command(tmp_path, capsys):
+    path = tmp_path / "prog.lisp"
+    path.write_text(PROGRAM)
+    with pytest.raises(SystemExit) as exit:
+        main(["run", "--stats", "--quiet", str(path)])
+    assert exit.value.code == 0
+    stats = json.loads(capsys.readouterr().err)
+    assert stats["cons_cells"] == 5
+
+
+def test_shared_counters():
+    counters = Counters()
+    run("(cons 1 (quote ()))", counters=counters)
+    run("(cons 1 (quote ()))", counters=counters)
+    assert counters.cons_cells == 2
@@ -0,0 +1,114 @@
+import pytest
+
+from pylisper.interpreter.engines import ENGINES
+from pylisper.interpreter.env import Env
+from pylisper.interpreter.optimizer import Folded, Optimizer
+from pylisper.interpreter.resolver import Resolver
+from pylisper.interpreter.std_env import STD_ENV
+from pylisper.printer import to_str
+from pylisper.reader import read
+
+
+def optimize(source, env=None):
+    if env is None:
+        env = Env(STD_ENV)
+    return Optimizer().optimize(Resolver(env).resolve(read(source)))
+
+
+def body(source):
+    return optimize(f"(lambda (x) {source})").body
+
+
+def test_pure_calls_on_constants_are_folded():
+    res = body("(+ 1 (* 2 3) (car (quote (1))))")
+    assert str(res) == "(+ 1 (* 2 3) (car (quote (1))))"
+    assert not isinstance(res, Folded)
+    _, one, mul, car = res
+    assert isinstance(mul, Folded)
+    assert mul.value == 6
+    res = body("(< 1 (+ 1 1) (quote 3))")
+    assert isinstance(res, Folded)
+    assert res.value is True
+    assert len(res.guards) == 2
+
+
+@pytest.mark.parametrize("source", ["(+ x 1)", "(/ 1 0)", "(cons 1 (quote ()))"])
+def test_calls_are_not_folded(source):
+    assert not isinstance(body(source), Folded)
+
+
+def test_top_level_calls_are_not_folded():
+    assert not isinstance(optimize("(+ 1 2)"), Folded)
+
+
+@pytest.mark.parametrize(
+    "source, expected",
+    [
+        ("(cond (1 x) (x 1))", "x"),
+        ("(cond ((quote ()) 1) (x 2) (1 3) (x 4))", "(cond (x 2) (1 3))"),
+        ("(cond ((quote ()) 1))", "(quote ())"),
+        ("(cond (#f 1) (#t 2))", "(cond (#f 1) (#t 2))"),
+        ("(begin (begin x (quote 1)) (begin 2 x))", "(begin x x)"),
+        ("(begin (quote 1) x)", "x"),
+        ("(quote 5)", "5"),
+        ("(quote x)", "(quote x)"),
+        ("(cond (x))", "(cond (x))"),
+        ("(if 1 x (f))", "x"),
+        ("(if (quote ()) (f) x)", "x"),
+        ("(if (quote ()) x)", "(quote ())"),
+        ("(if #t x (f))", "(if #t x (f))"),
+        ("(when 1 x (quote 1))", "(begin x 1)"),
+        ("(unless 1 x)", "(quote ())"),
+        ("(and x)", "x"),
+        ("(or x (quote 1))", "(or x 1)"),
+    ],
+)
+def test_forms_are_simplified(source, expected):
+    assert to_str(body(source)) == expected
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_redefined_builtins_are_respected(engine):
+    evaluator = ENGINES[engine](Env(STD_ENV))
+    evaluator.eval(read("(define f (lambda (x) (+ x (* 2 3))))"))
+    assert evaluator.eval(read("(f 1)")) == 7
+    evaluator.eval(read("(set! * +)"))
+    assert evaluator.eval(read("(f 1)")) == 6
+    evaluator.eval(read("(define * (lambda (a b) 0))"))
+    assert evaluator.eval(read("(f 1)")) == 1
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize(
+    "source",
+    [
+        "(if #t 1 2)",
+        "((lambda () (if #t 1 2)))",
+        "((lambda () (cond (#f 1) (#t 2))))",
+        "((lambda () (not #t)))",
+    ],
+)
+def test_redefined_booleans_are_respected(engine, source):
+    results = []
+    for optimize in (True, False):
+        evaluator = ENGINES[engine](Env(STD_ENV), optimize=optimize)
+        evaluator.eval(read("(define #t #f)"))
+        evaluator.eval(read("(define #f (quote x))"))
+        results.append(to_str(evaluator.eval(read(source))))
+    assert results[0] == results[1]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_folded_booleans_are_guarded(engine):
+    assert isinstance(body("(not #t)"), Folded)
+    evaluator = ENGINES[engine](Env(STD_ENV))
+    evaluator.eval(read("(define f (lambda () (not #t)))"))
+    assert evaluator.eval(read("(f)")) is False
+    evaluator.eval(read("(set! #t #f)"))
+    assert evaluator.eval(read("(f)")) is True
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_optimizer_can_be_disabled(engine):
+    evaluator = ENGINES[engine](Env(STD_ENV), optimize=False)
+    assert evaluator.eval(read("((lambda () (cond (#t (+ 1 2)))))")) == 3
@@ -0,0 +1,107 @@
+import sys
+
+import pytest
+
+from pylisper.interpreter.env import Env
+from pylisper.interpreter.profiler import Profile, ProfilingEvaluator, label
+from pylisper.interpreter.std_env import STD_ENV
+from pylisper.reader import read_all
+from pylisper.runner import main
+
+PROGRAM = """
+(define fib
+    (lambda (n)
+        (cond
+            ((< n 2) n)
+            (#t (+ (fib (- n 1)) (fib (- n 2)))))))
+(define loop
+    (lambda (n)
+        (cond
+            ((= n 0) (+ 0 (fib 5)))
+            (#t (loop (- n 1))))))
+(loop 3)
+"""
+
+
+def profile(source):
+    evaluator = ProfilingEvaluator(Env(STD_ENV))
+    res = None
+    for form in read_all(source):
+        res = evaluator.eval(form)
+    return res, evaluator.profile
+
+
+def calls(profile):
+    return {label(t): stats.calls for t, stats in profile.stats.items()}
+
+
+def test_calls_are_counted_per_lambda():
+    res, prof = profile(PROGRAM)
+    assert res == 5
+    assert calls(prof) == {"loop": 4, "fib": 15}
+    for stats in prof.stats.values():
+        assert 0 <= stats.own <= stats.total
+
+
+def test_tail_calls_replace_caller():
+    _, prof = profile(PROGRAM)
+    stacks = {names for names in prof.stacks()}
+    assert ("loop", "fib", "fib") in stacks
+    assert ("loop", "loop") not in stacks
+
+
+def test_lambdas_called_by_builtins_are_recorded():
+    res, prof = profile(
+        """
+        (define sq (lambda (x) (* x x)))
+        (define squares (lambda (l) (map sq l)))
+        (map sq (quote (1 2 3)))
+        (squares (quote (4 5)))
+        """
+    )
+    assert str(res) == "(16 25)"
+    assert calls(prof) == {"sq": 5, "squares": 1}
+    stacks = {names for names in prof.stacks()}
+    assert ("squares", "sq") in stacks
+    assert ("squares",) in stacks
+
+
+def test_tail_recursion_is_not_bounded_by_profiling():
+    _, prof = profile(
+        f"""
+        (define count (lambda (n) (cond ((= n 0) 0) (#t (count (- n 1))))))
+        (count {sys.getrecursionlimit() * 2})
+        """
+    )
+    assert calls(prof) == {"count": sys.getrecursionlimit() * 2 + 1}
+
+
+def test_calls_are_closed_on_error():
+    prof = Profile()
+    evaluator = ProfilingEvaluator(Env(STD_ENV), profile=prof)
+    (form,) = read_all("((lambda (x) (car x)) 1)")
+    with pytest.raises(Exception):
+        evaluator.eval(form)
+    assert evaluator._calls == []
+    assert calls(prof) == {"<lambda>": 1}
+
+
+def test_collapsed_stacks():
+    _, prof = profile(PROGRAM)
+    for line in prof.collapsed().splitlines():
+        stack, micros = line.rsplit(" ", 1)
+        assert stack.split(";")[0] == "loop"
+        assert int(micros) > 0
+
+
+def test_profile_command(tmp_path, capsys):
+    path = tmp_path / "prog.lisp"
+    path.write_text(PROGRAM)
+    out = tmp_path / "stacks.txt"
+    with pytest.raises(SystemExit) as exit:
+        main(["run", "--profile-output", str(out), str(path)])
+    assert exit.value.code == 0
+    captured = capsys.readouterr()
+    assert captured.out == "5\n"
+    assert "fib" in captured.err
+    assert out.read_text().startswith("loop")
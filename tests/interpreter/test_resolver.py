@@ -0,0 +1,204 @@
+import pytest
+
+import pylisper.interpreter.objects as obj
+from pylisper.interpreter.env import UNBOUND, Env
+from pylisper.interpreter.exceptions import InvalidFormError
+from pylisper.interpreter.resolver import (CapturedRef, GlobalRef,
+                                           LambdaTemplate, LocalRef, Loop,
+                                           Recur, Resolver)
+from pylisper.reader import read
+
+
+def resolve(source, env=None):
+    if env is None:
+        env = Env()
+    return Resolver(env).resolve(read(source))
+
+
+def test_top_level_symbols_are_left_unresolved():
+    assert resolve("x") is obj.Symbol("x")
+
+
+def test_parameters_and_defines_get_slots():
+    template = resolve("(lambda (x y) (begin (define z x) y))")
+    assert isinstance(template, LambdaTemplate)
+    assert template.locals == (obj.Symbol("x"), obj.Symbol("y"), obj.Symbol("z"))
+    _, define, ret = template.body
+    _, target, val = define
+    assert [ref.slot for ref in (target, val, ret)] == [2, 0, 1]
+    assert template.boxed == ()
+    assert template.arity == 2
+    assert template.padding == (UNBOUND,)
+
+
+def test_closures_capture_only_free_variables():
+    template = resolve("(lambda (x y z) (lambda (w) (z w)))")
+    inner = template.body
+    func, arg = inner.body
+    assert isinstance(func, CapturedRef)
+    assert func.index == 0
+    assert isinstance(arg, LocalRef)
+    assert [(ref.symbol, ref.slot) for ref in inner.captures] == [
+        (obj.Symbol("z"), 2)
+    ]
+
+
+def test_captures_are_threaded_through_intermediate_lambdas():
+    template = resolve("(lambda (x) (lambda () (lambda () x)))")
+    middle = template.body
+    inner = middle.body
+    assert isinstance(middle.captures[0], LocalRef)
+    assert isinstance(inner.captures[0], CapturedRef)
+    assert isinstance(inner.body, CapturedRef)
+
+
+def test_captured_and_assigned_variables_are_boxed():
+    template = resolve(
+        "(lambda (x y) (begin (set! y 1) (define z 2) (lambda () (begin x y z))))"
+    )
+    assert template.boxed == (1, 2)
+    _, x, y, z = template.body.cdr.cdr.cdr.car.body
+    assert [ref.boxed for ref in (x, y, z)] == [False, True, True]
+
+
+def test_globals_are_bound_directly():
+    env = Env({obj.Symbol("g"): 1})
+    ref = resolve("(lambda () g)", env).body
+    assert isinstance(ref, GlobalRef)
+    assert ref.binding.value == 1
+    env[obj.Symbol("g")] = 2
+    assert ref.binding.value == 2
+
+
+def test_undefined_globals_get_bound_on_definition():
+    env = Env()
+    ref = resolve("(lambda () g)", env).body
+    assert ref.binding.value is UNBOUND
+    env[obj.Symbol("g")] = 1
+    assert ref.binding.value == 1
+
+
+def test_quoted_expressions_are_not_resolved():
+    template = resolve("(lambda (x) (quote x))")
+    assert template.body.cdr.car is obj.Symbol("x")
+
+
+@pytest.mark.parametrize("source", ["(lambda (1) x)", "(lambda x)", "(lambda x 1)"])
+def test_invalid_lambdas_are_rejected(source):
+    with pytest.raises(InvalidFormError):
+        resolve(source)
+
+
+def test_let_variables_get_slots_in_the_enclosing_frame():
+    template = resolve("(lambda (x) (let ((x (+ x 1)) (y x)) (let* ((x y)) x)))")
+    assert template.locals == tuple(obj.Symbol(name) for name in "xxyx")
+    _, bindings, body = template.body
+    (outer_x, init_x), (y, init_y) = bindings
+    assert (outer_x.slot, y.slot) == (1, 2)
+    # values are resolved before the variables are bound
+    assert init_y.slot == 0
+    _, ((inner_x, init),), ret = body
+    assert (inner_x.slot, init.slot, ret.slot) == (3, 2, 3)
+
+
+def test_top_level_let_is_resolved_in_a_lambda():
+    call = resolve("(let ((x 1)) x)")
+    func, *args = call
+    assert isinstance(func, LambdaTemplate)
+    assert args == []
+    assert func.locals == (obj.Symbol("x"),)
+
+
+def test_captured_letrec_variables_are_boxed_on_binding():
+    template = resolve("(lambda () (letrec ((f (lambda () (f)))) f))")
+    _, ((ref, func),), _ = template.body
+    assert ref.boxed
+    assert func.name == "f"
+    # boxes are created by letrec, not on call
+    assert template.boxed == ()
+
+
+def test_named_let_calling_itself_in_tail_position_is_a_loop():
+    template = resolve(
+        """
+        (lambda (n)
+            (let loop ((i 0) (acc 1))
+                (cond
+                    ((= i n) acc)
+                    (#t (let ((j (+ i 1))) (loop j (* acc j)))))))
+        """
+    )
+    loop = template.body
+    assert isinstance(loop, Loop)
+    assert [ref.slot for ref in loop.refs] == [1, 2]
+    _, _, (_, (_, _, recur)) = loop.body
+    assert isinstance(recur, Recur)
+    assert recur.loop is loop
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        "(if (= i 0) 0 (loop (- i 1)))",
+        "(when (> i 0) (f i) (loop (- i 1)))",
+        "(unless (= i 0) (loop (- i 1)))",
+        "(and (> i 0) (or (f i) (loop (- i 1))))",
+    ],
+)
+def test_loops_through_conditionals_are_detected(body):
+    loop = resolve(f"(lambda () (let loop ((i 1)) {body}))").body
+    assert isinstance(loop, Loop)
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        "(+ 1 (loop (- i 1)))",
+        "(if (loop (- i 1)) 1 2)",
+        "(and (loop (- i 1)) i)",
+        "(cond ((= i 0) loop) (#t (loop (- i 1))))",
+        "(begin (define x i) (loop x))",
+        "(loop i i)",
+        "((lambda () (loop i)))",
+    ],
+)
+def test_other_named_lets_are_bound_to_lambdas(body):
+    call = resolve(f"(lambda () (let loop ((i 1)) {body}))").body
+    (head, ((ref, func),), _), init = call
+    assert head is obj.Symbol("letrec")
+    assert isinstance(func, LambdaTemplate)
+    assert func.name == "loop"
+
+
+def test_do_is_a_loop():
+    loop = resolve("(lambda () (do ((i 0 (+ i 1)) (j 0)) ((= i j) j) (f i)))").body
+    assert isinstance(loop, Loop)
+    _, _, (_, (_, call, recur)) = loop.body
+    assert isinstance(recur, Recur)
+    assert [str(arg) for arg in recur.args] == ["(+ i 1)", "j"]
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        "(let ((x)) x)",
+        "(let ((x 1) (x 2)) x)",
+        "(letrec x 1)",
+        "(let ((1 2)) 1)",
+        "(let x)",
+        "(do ((i 0 1 2)) ((= i 1)))",
+        "(do ((i 0)) 1)",
+    ],
+)
+def test_invalid_binding_forms_are_rejected(source):
+    with pytest.raises(InvalidFormError):
+        resolve(source)
+
+
+@pytest.mark.parametrize(
+    "source",
+    ["(if)", "(if #t)", "(if #t 1 2 3)", "(when #t)", "(unless)"],
+)
+def test_invalid_conditionals_are_rejected(source):
+    with pytest.raises(InvalidFormError):
+        resolve(source)
@@ -0,0 +1,245 @@
+import array
+from unittest import mock
+
+import pytest
+import utils.strategies as st
+from hypothesis import given
+
+from pylisper.interpreter.engines import ENGINES
+from pylisper.interpreter.env import Env
+from pylisper.interpreter.exceptions import (EvalTypeError, EvaluationError,
+                                             LogicError)
+from pylisper.interpreter.std_env import STD_ENV
+from pylisper.printer import to_str
+from pylisper.reader import read
+
+
+def eval(source, engine):
+    return ENGINES[engine](Env(STD_ENV)).eval(read(source))
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize(
+    "source, expected",
+    [
+        ("(+)", "0"),
+        ("(+ 1 2 3)", "6"),
+        ("(- 5)", "-5"),
+        ("(- 10 1 2)", "7"),
+        ("(*)", "1"),
+        ("(* 2 3 4)", "24"),
+        ("(/ 12 2 3)", "2"),
+        ("(/ -1)", "-1"),
+        ("(< 1 2 3)", "#t"),
+        ("(< 1 3 2)", "#f"),
+        ("(> 3 2 1)", "#t"),
+        ("(<= 1 1 2)", "#t"),
+        ("(>= 3 3 4)", "#f"),
+        ("(= 2 2 2)", "#t"),
+        ("(= 2 2 3)", "#f"),
+        ("(quotient -7 2)", "-3"),
+        ("(remainder -7 2)", "-1"),
+        ("(remainder 7 -2)", "1"),
+        ("(min 3 1 2)", "1"),
+        ("(max 3 1 2)", "3"),
+        ("(sum (quote (1 2 3)))", "6"),
+        ("(sum (quote ()))", "0"),
+        ("(product (quote (2 3 4)))", "24"),
+        ("(range 4)", "(0 1 2 3)"),
+        ("(range 5 0 -2)", "(5 3 1)"),
+        ("(range 0)", "()"),
+        ("(iota 3)", "(0 1 2)"),
+        ("(iota 3 1 2)", "(1 3 5)"),
+    ],
+)
+def test_numeric_builtins(engine, source, expected):
+    assert to_str(eval(source, engine)) == expected
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize(
+    "source, expected",
+    [
+        ("(cons 1 (quote ()))", "(1)"),
+        ("(map (lambda (x) (* x x)) (range 4))", "(0 1 4 9)"),
+        ("(map + (range 3) (quote (10 20 30 40)))", "(10 21 32)"),
+        ("(filter (lambda (x) (> x 2)) (range 6))", "(3 4 5)"),
+        ("(foldl + 0 (range 101))", "5050"),
+        ("(foldl - 0 (quote (1 2 3)))", "-6"),
+        ("(foldl (lambda (acc x) (cons x acc)) (quote ()) (range 3))", "(2 1 0)"),
+        ("(foldr cons (quote ()) (range 3))", "(0 1 2)"),
+        ("(foldr - 0 (quote (1 2 3)))", "2"),
+        ("(length (quote ()))", "0"),
+        ("(length (range 7))", "7"),
+        ("(append (quote (1 2)) (quote ()) (quote (3 4)))", "(1 2 3 4)"),
+        ("(append)", "()"),
+        ("(reverse (range 4))", "(3 2 1 0)"),
+        ("(list-ref (range 10) 3)", "3"),
+        ("(assoc 2 (quote ((1 a) (2 b))))", "(2 b)"),
+        ("(assq (quote b) (quote ((a 1) (b 2))))", "(b 2)"),
+        ("(assq (quote c) (quote ((a 1))))", "#f"),
+        ("(member 3 (range 6))", "(3 4 5)"),
+        ("(member 7 (range 6))", "#f"),
+        ("(apply + 1 2 (quote (3 4)))", "10"),
+        ("(apply (lambda (x y) (- x y)) (quote (5 3)))", "2"),
+    ],
+)
+def test_list_builtins(engine, source, expected):
+    assert to_str(eval(source, engine)) == expected
+
+
+def test_append_shares_last_list():
+    env = Env(STD_ENV)
+    evaluator = ENGINES["tree"](env)
+    evaluator.eval(read("(define tail (quote (3)))"))
+    res = evaluator.eval(read("(append (quote (1 2)) tail)"))
+    assert res.cdr.cdr is env[read("tail")]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize(
+    "source, expected",
+    [
+        ("#(1 (a b))", "#(1 (a b))"),
+        ("(make-vector 2 (quote a))", "#(a a)"),
+        ("(vector 1 (quote b))", "#(1 b)"),
+        ("(vector-ref (vector 1 2 3) 1)", "2"),
+        ("(vector-length (make-vector 5))", "5"),
+        ("(begin (define v (vector 1 2)) (vector-set! v 0 3) v)", "#(3 2)"),
+        ("(begin (define v (vector 1 2)) (set! (vector-ref v 1) 3) v)", "#(1 3)"),
+        ("(hash-ref #hash((a 1) (2 b)) 2)", "b"),
+        ("(hash-ref (make-hash) (quote a) 0)", "0"),
+        ("(hash-count #hash((a 1) (b 2)))", "2"),
+        (
+            "(begin (define h (make-hash)) (hash-set! h (quote a) 1) h)",
+            "#hash((a 1))",
+        ),
+        (
+            "(begin (define h (make-hash)) (set! (hash-ref h 1) (quote x)) h)",
+            "#hash((1 x))",
+        ),
+        (
+            """
+            ((lambda (v i)
+                (begin (set! (vector-ref v i) (+ i 1)) v))
+             (make-vector 2 0) 1)
+            """,
+            "#(0 2)",
+        ),
+    ],
+)
+def test_vector_and_hash_builtins(engine, source, expected):
+    assert to_str(eval(source, engine)) == expected
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize(
+    "source, expected",
+    [
+        ("(array->list (make-array int64 3))", "(0 0 0)"),
+        ("(array->list (make-array float64 2 1))", "(1.0 1.0)"),
+        ("(list->array int64 (range 3))", "#<array int64 len=3>"),
+        ("(array->list (list->array int64 (range 3)))", "(0 1 2)"),
+        ("(array-ref (list->array int64 (range 3)) 2)", "2"),
+        ("(array-length (make-array float64 4))", "4"),
+        ("(array-sum (list->array int64 (range 101)))", "5050"),
+        ("(array-dot (list->array int64 (range 4)) (make-array int64 4 2))", "12"),
+        (
+            "(array->list (array-map+ (list->array int64 (range 3)) 10))",
+            "(10 11 12)",
+        ),
+        (
+            "(array-map+ (make-array int64 2 1) (make-array float64 2 2))",
+            "#<array float64 len=2>",
+        ),
+        (
+            "(array->list (array-slice (list->array int64 (range 5)) 1 3))",
+            "(1 2)",
+        ),
+        (
+            """
+            (begin
+                (define arr (list->array int64 (range 5)))
+                (define view (array-slice arr 2))
+                (array-set! view 0 20)
+                (set! (array-ref view 1) 30)
+                (array->list arr))
+            """,
+            "(0 1 20 30 4)",
+        ),
+    ],
+)
+def test_array_builtins(engine, source, expected):
+    assert to_str(eval(source, engine)) == expected
+
+
+@pytest.mark.parametrize("typecode, type", [("q", "int64"), ("d", "float64")])
+def test_array_load(tmp_path, typecode, type):
+    path = tmp_path / "series.bin"
+    with open(path, "wb") as f:
+        array.array(typecode, range(10)).tofile(f)
+    res = eval(f"(array-slice (array-load (quote {path}) {type}) 8)", "tree")
+    assert res.data.tolist() == [8, 9]
+    assert res.data.format == typecode
+    with pytest.raises(LogicError):
+        eval(f"(array-set! (array-load (quote {path})) 0 1)", "tree")
+
+
+def test_array_load_of_truncated_file_is_not_mapped(tmp_path):
+    path = tmp_path / "truncated.bin"
+    path.write_bytes(b"\0" * 12)
+    with mock.patch("mmap.mmap", side_effect=AssertionError):
+        with pytest.raises(LogicError):
+            eval(f"(array-load (quote {path}))", "tree")
+
+
+def test_array_load_empty_file(tmp_path):
+    path = tmp_path / "empty.bin"
+    path.write_bytes(b"")
+    assert eval(f"(array-length (array-load (quote {path})))", "tree") == 0
+
+
+@pytest.mark.parametrize(
+    "source, error",
+    [
+        ("(+ 1 (quote a))", EvalTypeError),
+        ("(-)", EvalTypeError),
+        ("(/)", EvalTypeError),
+        ("(min)", EvalTypeError),
+        ("(max)", EvalTypeError),
+        ("(< 1 (quote a))", EvalTypeError),
+        ("(/ 1 0)", LogicError),
+        ("(/ 3 2)", LogicError),
+        ("(quotient 1 0)", LogicError),
+        ("(sum 1)", EvalTypeError),
+        ("(range 0 1 0)", LogicError),
+        ("(iota -1)", EvalTypeError),
+        ("(map 1 (quote (1)))", EvalTypeError),
+        ("(length 1)", EvalTypeError),
+        ("(list-ref (range 3) 3)", LogicError),
+        ("(assoc 1 (quote (1 2)))", EvalTypeError),
+        ("(vector-ref (vector 1) 1)", LogicError),
+        ("(vector-ref (quote (1)) 0)", EvalTypeError),
+        ("(make-vector -1)", EvalTypeError),
+        ("(hash-ref (make-hash) 1)", LogicError),
+        ("(hash-set! (make-hash) (quote (1)) 1)", EvalTypeError),
+        ("(hash-count (vector))", EvalTypeError),
+        ("(make-array (quote int32) 1)", EvalTypeError),
+        ("(array-ref (make-array int64 1) 1)", LogicError),
+        ("(array-sum (vector 1))", EvalTypeError),
+        ("(array-dot (make-array int64 1) (make-array int64 2))", LogicError),
+        ("(array-map+ (make-array int64 1) (quote a))", EvalTypeError),
+        ("(array-set! (make-array int64 1) 0 (quote a))", EvalTypeError),
+        ("(array-load (quote /nonexistent/file))", EvaluationError),
+    ],
+)
+def test_builtins_errors(source, error):
+    with pytest.raises(error):
+        eval(source, "tree")
+
+
+@given(st.lists(st.integers()))
+def test_sum_matches_variadic_plus(vals):
+    lst = "(quote (" + " ".join(map(str, vals)) + "))"
+    args = " ".join(map(str, vals))
+    assert eval(f"(sum {lst})", "tree") == eval(f"(+ {args})", "tree") == sum(vals)
@@ -0,0 +1,67 @@
+import pytest
+
+import pylisper.interpreter.objects as obj
+from pylisper.interpreter.bytecode import CALL, TAIL_CALL, BytecodeCompiler
+from pylisper.interpreter.env import Env
+from pylisper.interpreter.exceptions import InvalidFormError
+from pylisper.interpreter.resolver import Resolver
+from pylisper.interpreter.std_env import STD_ENV
+from pylisper.interpreter.vm import VM
+from pylisper.reader import read
+
+
+def compile(source):
+    return read(source)
+
+
+def compile_bytecode(source):
+    return BytecodeCompiler().compile(Resolver(Env()).resolve(compile(source)))
+
+
+def ops(code):
+    return code.code[::2]
+
+
+def test_tail_call_emission():
+    code = compile_bytecode("(lambda (x) (f (g x)))")
+    body = code.consts[0]
+    assert CALL in ops(body)
+    assert ops(body).count(TAIL_CALL) == 1
+    assert TAIL_CALL not in ops(code)
+
+
+def test_define_names_lambda():
+    code = compile_bytecode("(define f (lambda () 1))")
+    assert code.consts[0].name == "f"
+
+
+@pytest.mark.parametrize(
+    "source",
+    ["(lambda (1) x)", "(lambda x)", "(cond (1 2 3))", "(begin)", "(set! 1 2)"],
+)
+def test_invalid_forms_are_rejected_on_compilation(source):
+    with pytest.raises(InvalidFormError):
+        compile_bytecode(source)
+
+
+def test_deep_recursion_does_not_use_python_stack():
+    env = Env(STD_ENV)
+    vm = VM(env)
+    vm.eval(
+        compile(
+            """
+            (define count
+                (lambda (n)
+                    (cond
+                        ((= n 0) 0)
+                        (#t (+ 1 (count (- n 1)))))))
+            """
+        )
+    )
+    assert vm.eval(compile("(count 5000)")) == 5000
+
+
+def test_closure_called_from_python():
+    env = Env(STD_ENV)
+    VM(env).eval(compile("(define add (lambda (x y) (+ x y)))"))
+    assert env[obj.Symbol("add")](1, 2) == 3
@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+from benchmarks.suite import WORKLOADS, Workload, compare, main, measure
+from pylisper.interpreter.engines import ENGINES
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("name", WORKLOADS)
+def test_workloads_evaluate_to_expected_value(name, engine):
+    workload = WORKLOADS[name]
+    if workload.engines and engine not in workload.engines:
+        pytest.skip(f"{name} doesn't run on {engine}")
+    res = measure(workload, engine, workload.quick_size, repeat=1)
+    assert res["time"] > 0
+    assert res["peak_memory"] > 0
+
+
+def test_unexpected_results_are_reported():
+    workload = Workload(lambda n: f"(+ {n} 1)", str, 1, 1)
+    with pytest.raises(ValueError):
+        measure(workload, "tree", 1, repeat=1)
+
+
+def test_compare_reports_regressions_over_threshold():
+    baseline = {"fib/tree": {"time": 1.0, "peak_memory": 100}}
+    results = {
+        "fib/tree": {"time": 1.05, "peak_memory": 150},
+        "fib/vm": {"time": 9.0, "peak_memory": 100},
+    }
+    assert compare(results, baseline, 0.1) == {"fib/tree": {"peak_memory": 1.5}}
+
+
+def test_saved_results_are_compared(tmp_path):
+    path = tmp_path / "results.json"
+    args = ["--quick", "--repeat", "1", "--workload", "fib", "--engine", "vm"]
+    main(args + ["--save", str(path)])
+    saved = json.loads(path.read_text())
+    assert set(saved["results"]) == {"fib/vm"}
+    saved["results"]["fib/vm"]["time"] = 1e-9
+    path.write_text(json.dumps(saved))
+    with pytest.raises(SystemExit) as exit:
+        main(args + ["--compare", str(path)])
+    assert exit.value.code == 1
@@ -0,0 +1,95 @@
+from unittest import mock
+
+import pytest
+import utils.strategies as st
+from hypothesis import given
+
+import pylisper.interpreter.objects as obj
+from pylisper.cache import cache_path, dumps, loads, read_file, source_hash
+from pylisper.printer import to_str
+from pylisper.reader import read_all
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        "",
+        "()",
+        "(define x (quote (1 -2 (a b) ())))\n(x x x)",
+        "#(1 #() (a #(b))) #hash((a #(1)) (2 #hash()))",
+    ],
+)
+def test_roundtrip(source):
+    forms = read_all(source)
+    assert list(map(to_str, loads(dumps(forms)))) == list(map(to_str, forms))
+
+
+def test_roundtrip_deep_nesting():
+    depth = 100_000
+    (res,) = loads(dumps(read_all("(" * depth + ")" * depth)))
+    for _ in range(depth - 2):
+        res = res.car
+    assert res.car is None
+
+
+@given(st.lists(st.one_of(st.symbols(allow_numbers=False), st.integers())))
+def test_roundtrip_atoms(atoms):
+    source = "(" + " ".join(map(str, atoms)) + ")"
+    (res,) = loads(dumps(read_all(source)))
+    assert to_str(res) == source
+
+
+def test_symbols_are_interned():
+    data = dumps(read_all("(a a b)"))
+    a1, a2, b = loads(data)[0]
+    assert a1 is a2 is obj.Symbol("a")
+    assert b is obj.Symbol("b")
+    assert data.count(b"a") == 1
+
+
+@pytest.mark.parametrize("data", [b"", b"garbage", dumps([])[:-1]])
+def test_invalid_data(data):
+    assert loads(data) is None
+
+
+def test_key_mismatch():
+    assert loads(dumps([], b"key"), b"other") is None
+
+
+def test_source_hash_depends_on_version():
+    with mock.patch("pylisper.__version__", "0.0.0"):
+        old = source_hash(b"(a)")
+    assert source_hash(b"(a)") != old
+
+
+def test_read_file_uses_cache(tmp_path):
+    path = tmp_path / "prog.lisp"
+    path.write_text("(a (b 1))")
+    assert to_str(read_file(str(path))[0]) == "(a (b 1))"
+    assert (tmp_path / "__lispcache__" / "prog.lispc").exists()
+    with mock.patch("pylisper.cache.read_all") as read_all_mock:
+        assert to_str(read_file(str(path))[0]) == "(a (b 1))"
+    read_all_mock.assert_not_called()
+
+
+def test_cache_is_invalidated_by_change(tmp_path):
+    path = tmp_path / "prog.lisp"
+    path.write_text("(a)")
+    read_file(str(path))
+    path.write_text("(b)")
+    assert to_str(read_file(str(path))[0]) == "(b)"
+
+
+def test_unwritable_cache_is_ignored(tmp_path):
+    path = tmp_path / "prog.lisp"
+    path.write_text("(a)")
+    (tmp_path / "__lispcache__").write_text("not a directory")
+    assert to_str(read_file(str(path))[0]) == "(a)"
+
+
+def test_read_file_without_cache(tmp_path):
+    path = tmp_path / "prog.lisp"
+    path.write_text("(a)")
+    read_file(str(path), use_cache=False)
+    assert not (tmp_path / "__lispcache__").exists()
+    assert cache_path(str(path)) == str(tmp_path / "__lispcache__" / "prog.lispc")
@@ -0,0 +1,101 @@
+import pytest
+
+import pylisper.interpreter.objects as obj
+from pylisper.cache import dumps, loads, read_file
+from pylisper.interpreter.compiler import ObjectCompiler
+from pylisper.interpreter.engines import ENGINES
+from pylisper.interpreter.env import Env
+from pylisper.interpreter.exceptions import EvaluationError
+from pylisper.interpreter.profiler import ProfilingEvaluator
+from pylisper.interpreter.std_env import STD_ENV
+from pylisper.lexer import lexer
+from pylisper.locations import Location, SourceMap
+from pylisper.parser import parser
+from pylisper.reader import read, read_all
+from pylisper.runner import main
+
+SOURCE = "(define f\n  (lambda (x)\n    (car x)))\n(f 1)\n"
+
+
+def positions(form, source_map):
+    res = []
+    todo = [form]
+    while todo:
+        form = todo.pop()
+        if isinstance(form, obj.Cell):
+            res.append((str(form), source_map.get(form)))
+            todo.extend(reversed(list(form)))
+    return res
+
+
+def test_reader_records_lists():
+    source_map = SourceMap("prog.lisp")
+    (define, call) = read_all(SOURCE, source_map)
+    assert positions(define, source_map) == [
+        ("(define f (lambda (x) (car x)))", Location(1, 1, "prog.lisp")),
+        ("(lambda (x) (car x))", Location(2, 3, "prog.lisp")),
+        ("(x)", Location(2, 11, "prog.lisp")),
+        ("(car x)", Location(3, 5, "prog.lisp")),
+    ]
+    assert str(source_map.get(call)) == "prog.lisp:4:1"
+
+
+def test_forms_are_not_recorded_without_map():
+    assert SourceMap().get(read("(a b)")) is None
+
+
+def test_object_compiler_records_lists():
+    source = "(define f\n  (lambda (x)\n    (car x)))"
+    source_map = SourceMap()
+    form = parser.parse(lexer.lex(source)).accept(ObjectCompiler(source_map))
+    expected = SourceMap()
+    assert positions(form, source_map) == positions(read(source, expected), expected)
+
+
+def test_cache_keeps_positions():
+    written = SourceMap()
+    forms = read_all(SOURCE, written)
+    source_map = SourceMap()
+    loaded = loads(dumps(forms, source_map=written), source_map=source_map)
+    for form, cached in zip(forms, loaded):
+        assert positions(cached, source_map) == positions(form, written)
+
+
+def test_read_file_caches_positions(tmp_path):
+    path = tmp_path / "prog.lisp"
+    path.write_text(SOURCE)
+    read_file(str(path))
+    source_map = SourceMap(str(path))
+    _, call = read_file(str(path), source_map=source_map)
+    assert source_map.get(call) == Location(4, 1, str(path))
+
+
+@pytest.mark.parametrize(
+    "engine, line, column",
+    [("tree", 3, 5), ("vm", 4, 1), ("stackless", 4, 1)],
+)
+def test_errors_get_location(engine, line, column):
+    source_map = SourceMap()
+    evaluator = ENGINES[engine](Env(STD_ENV), source_map=source_map)
+    define, call = read_all(SOURCE, source_map)
+    evaluator.eval(define)
+    with pytest.raises(EvaluationError) as e:
+        evaluator.eval(call)
+    assert e.value.location == Location(line, column)
+
+
+def test_lambdas_are_profiled_with_location():
+    source_map = SourceMap()
+    evaluator = ProfilingEvaluator(Env(STD_ENV), source_map=source_map)
+    define, _ = read_all(SOURCE, source_map)
+    evaluator.eval(define)
+    evaluator.eval(read("(f (quote (1)))"))
+    assert "f (2:3)" in evaluator.profile.report()
+
+
+def test_command_reports_error_location(tmp_path, capsys):
+    path = tmp_path / "prog.lisp"
+    path.write_text(SOURCE)
+    with pytest.raises(SystemExit):
+        main(["run", str(path)])
+    assert capsys.readouterr().err.startswith(f"{path}:3:5: ")
@@ -0,0 +1,117 @@
+import io
+
+import pytest
+import utils.strategies as st
+from hypothesis import given
+
+import pylisper.interpreter.objects as obj
+from pylisper.interpreter.compiler import ObjectCompiler
+from pylisper.lexer import lexer
+from pylisper.parser import parser
+from pylisper.printer import to_str
+from pylisper.reader import (IncompleteInput, Reader, UnexpectedCharacter,
+                             read, read_all)
+
+
+@given(st.naturals())
+def test_numbers(val):
+    res = read(str(val))
+    assert type(res) is int
+    assert res == val
+
+
+@given(st.symbols(allow_numbers=False))
+def test_symbols(val):
+    res = read(val)
+    assert isinstance(res, obj.Symbol)
+    assert str(res) == val
+
+
+@given(st.lists(st.naturals(), max_size=10))
+def test_lists(vals):
+    res = read("(" + " ".join(map(str, vals)) + ")")
+    assert list(res or []) == vals
+
+
+def test_nested_lists():
+    res = read("(a (b (c)) ())")
+    assert to_str(res) == "(a (b (c)) ())"
+
+
+@pytest.mark.parametrize(
+    "source",
+    ["#()", "#(1 a (b #(c)))", "#hash()", "#hash((a 1) (2 (b c)))"],
+)
+def test_vectors_and_hash_tables(source):
+    assert to_str(read(source)) == source
+
+
+def test_comments_are_skipped():
+    res = read_all(";; comment\n(a ;; another one\n b) ;; (c)")
+    assert [str(form) for form in res] == ["(a b)"]
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        "(define x (quote (1 2 3)))",
+        "(a\n  (b c)\n\t(d (e)))",
+        "((lambda (x y) (+ x y)) -1 +2)",
+        "12x",
+    ],
+)
+def test_same_as_parser(source):
+    expected = parser.parse(lexer.lex(source)).accept(ObjectCompiler())
+    assert str(read(source)) == str(expected)
+
+
+def test_reads_stream_lazily():
+    stream = io.StringIO("(a\n b)\n(c ")
+    forms = iter(Reader(stream))
+    assert str(next(forms)) == "(a b)"
+    with pytest.raises(IncompleteInput):
+        next(forms)
+
+
+def test_form_positions():
+    reader = Reader("a\n  (b\n c) d")
+    positions = [reader.form_start for _ in reader]
+    assert positions == [(1, 1), (2, 3), (3, 5)]
+
+
+@pytest.mark.parametrize("source", ["", "(", "(a (b)", ";; (a)"])
+def test_incomplete_input(source):
+    with pytest.raises(IncompleteInput):
+        read(source)
+
+
+@pytest.mark.parametrize(
+    "source, char, line, column",
+    [
+        (")", ")", 1, 1),
+        ("(a\n  b 'c)", "'", 2, 5),
+        ("(a \"b\")", '"', 1, 4),
+        ("a b", "b", 1, 3),
+        ("a\n(b)", "(", 2, 1),
+        ("#hash((a 1) b)", ")", 1, 14),
+        ("#hash((a))", ")", 1, 10),
+    ],
+)
+def test_unexpected_character(source, char, line, column):
+    with pytest.raises(UnexpectedCharacter) as e:
+        read(source)
+    assert (e.value.char, e.value.line, e.value.column) == (char, line, column)
+
+
+def test_deep_nesting_does_not_recurse():
+    depth = 100_000
+    res = read("(" * depth + ")" * depth)
+    for _ in range(depth - 2):
+        res = res.car
+    assert res.car is None
+
+
+def test_long_lists():
+    size = 100_000
+    res = read("(" + " 1" * size + ")")
+    assert sum(1 for _ in res) == size
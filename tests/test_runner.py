@@ -0,0 +1,76 @@
+import pytest
+
+import pylisper.interpreter.objects as obj
+from pylisper import run_file, run_source
+from pylisper.interpreter.env import Env
+from pylisper.interpreter.std_env import STD_ENV
+from pylisper.reader import IncompleteInput
+from pylisper.runner import main
+
+
+def test_forms_share_environment():
+    env = Env(STD_ENV)
+    res = run_source(
+        """
+        (define x 1)
+        (define add-x (lambda (y) (+ x y)))
+        (add-x 41)
+        """,
+        env,
+    )
+    assert res == 42
+    assert env[obj.Symbol("x")] == 1
+
+
+def test_empty_program():
+    assert run_source(";; nothing here") is None
+
+
+def test_incomplete_program():
+    with pytest.raises(IncompleteInput):
+        run_source("(define x 1) (define")
+
+
+def test_run_file(tmp_path):
+    path = tmp_path / "prog.lisp"
+    path.write_text("(define x 20)\n(+ x 22)\n")
+    assert run_file(str(path), engine="vm") == 42
+
+
+def test_main_exit_status(tmp_path, capsys):
+    good = tmp_path / "good.lisp"
+    good.write_text("(quote (1 #t))")
+    bad = tmp_path / "bad.lisp"
+    bad.write_text("(undefined-function)")
+    with pytest.raises(SystemExit) as exit:
+        main(["run", str(good)])
+    assert exit.value.code == 0
+    assert capsys.readouterr().out == "(1 #t)\n"
+    with pytest.raises(SystemExit) as exit:
+        main(["run", str(good), str(bad)])
+    assert exit.value.code == 1
+    assert "bad.lisp" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        b"(quote \xff)",
+        "(cons 1)",
+        "(define f (lambda (n) (+ 1 (f (- n 1))))) (f 100000)",
+    ],
+)
+def test_main_runs_files_after_a_failing_one(tmp_path, capsys, source):
+    bad = tmp_path / "bad.lisp"
+    if isinstance(source, bytes):
+        bad.write_bytes(source)
+    else:
+        bad.write_text(source)
+    good = tmp_path / "good.lisp"
+    good.write_text("(+ 1 2)")
+    with pytest.raises(SystemExit) as exit:
+        main(["run", "--no-cache", str(bad), str(good)])
+    assert exit.value.code == 1
+    out, err = capsys.readouterr()
+    assert out == "3\n"
+    assert err.startswith(f"{bad}: ")
@@ -0,0 +1,49 @@
+import subprocess
+import sys
+
+import pytest
+
+import pylisper
+import pylisper.lexer
+import pylisper.parser
+
+
+def loaded_modules(statement):
+    code = f"import sys; {statement}; print(' '.join(sys.modules))"
+    proc = subprocess.run(
+        [sys.executable, "-c", code],
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    return set(proc.stdout.split())
+
+
+def test_import_pylisper_is_lightweight():
+    modules = loaded_modules("import pylisper")
+    assert "rply" not in modules
+    assert "pylisper.runner" not in modules
+    assert "pylisper.interpreter" not in modules
+
+
+def test_runner_imports_engines_lazily():
+    modules = loaded_modules("import pylisper.runner")
+    assert "argparse" not in modules
+    assert "pylisper.interpreter.evaluator" not in modules
+    assert "pylisper.interpreter.vm" not in modules
+    assert "pylisper.interpreter.stackless" not in modules
+    assert "pylisper.interpreter.profiler" not in modules
+    assert "pylisper.interpreter.instrumentation" not in modules
+
+
+@pytest.mark.parametrize("module", ["pylisper.lexer", "pylisper.parser"])
+def test_lexer_and_parser_are_built_lazily(module):
+    assert "rply" not in loaded_modules(f"import {module}")
+
+
+def test_lazy_attributes():
+    assert pylisper.run_source("(+ 1 2)") == 3
+    assert pylisper.parser.parser is pylisper.parser.parser
+    assert pylisper.lexer.lexer is pylisper.lexer.lexer
+    with pytest.raises(AttributeError):
+        pylisper.parser.missing